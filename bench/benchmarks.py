@@ -0,0 +1,369 @@
+"""
+Benchmarks of the ingestion, cleaning and forecasting hot paths.
+
+    python bench/benchmarks.py                                  # bundled data + 1x, 10x, 100x synthetic
+    python bench/benchmarks.py --scales 1 10 --output bench/results.json
+    python bench/benchmarks.py --compare bench/results.json     # ratios against an earlier run
+
+Every case records the best wall time of --repeat runs and its peak memory, and the results are
+written as JSON. With --compare the ratios to an earlier result file are printed and the exit code is
+1 when a case got slower than --threshold times its old time.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+
+from cache import ResultCache  # noqa: E402
+from process import (EARNINGS_SCHEMA, clean_currency_column, correct_hours_array,  # noqa: E402
+                     process_hours_columns, read_data)
+from regression import batch_forecast, polynomial_regression_forecast  # noqa: E402
+from synthetic import learn_profile, write_synthetic  # noqa: E402
+
+EARNINGS_FOLDER = os.path.join(ROOT, 'data', 'earning')
+EARNINGS_FILE = 'earnings.csv'
+EARNINGS_YEARS = list(range(2011, 2025))
+ENCODING = 'ISO-8859-1'
+TARGET_COL = ['REGULAR', 'RETRO', 'OTHER', 'OVERTIME', 'INJURED', 'DETAIL', 'QUINN_EDUCATION', 'TOTAL_GROSS']
+DROP_COL = ['_ID']
+
+# Years written at each scale: an old ($33065.38) and a new ("161,306.48") currency format
+SYNTHETIC_YEARS = [2011, 2024]
+# Rows of one synthetic Details workbook at 1x; writing and parsing xlsx is ~100x slower than csv
+DETAILS_ROWS = 2_000
+DETAILS_HEADER = ['Emp. ID', 'Employee', 'Rank', 'Location', 'Detail\nDate', 'Start\nTime', 'End \nTime',
+                  'Hours\nWorked', 'Hours\nPaid', 'Type']
+# Series forecast per call of batch_forecast at 1x (about the number of departments in the earnings data)
+DEPARTMENTS = 450
+
+
+# Write synthetic yearly files with `scale` times the rows of the bundled ones, in their formats
+def write_scaled_earnings(folder, scale, years=SYNTHETIC_YEARS, seed=0):
+    """
+    folder: str: Folder to write {year}_earnings.csv to; years already there are kept.
+    scale: float: Rows written relative to the bundled file of the same year.
+    years: list: Years to write.
+    seed: int: Seed of the generator (synthetic.write_synthetic).
+    """
+    missing = [year for year in years if not os.path.exists(os.path.join(folder, f"{year}_{EARNINGS_FILE}"))]
+    if missing:
+        profile = learn_profile(EARNINGS_FOLDER, EARNINGS_FILE, missing, ENCODING)
+        write_synthetic(profile, folder, EARNINGS_FILE, scale=scale, encoding=ENCODING, seed=seed)
+
+
+# Write a synthetic {year}_Details.xlsx with the police detail layout
+def write_details_workbook(folder, scale, year=2020, seed=0):
+    """
+    folder: str: Folder to write the workbook to; a workbook already there is kept.
+    scale: float: Rows written relative to DETAILS_ROWS.
+    year: int: Year in the file name and the detail dates.
+    seed: int: Seed of the generated values.
+    """
+    import openpyxl
+
+    path = os.path.join(folder, f"{year}_Details.xlsx")
+    if os.path.exists(path):
+        return path
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n = int(DETAILS_ROWS * scale)
+    start = rng.choice([700, 800, 830, 1500, 2300], n)
+    hours = rng.choice([4.0, 8.0, 800.0, 1230.0, 2400.0, 30.0], n)
+    days = rng.integers(0, 365, n)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(DETAILS_HEADER)
+    for i in range(n):
+        sheet.append([int(100000 + i % 3000), f"Employee,{i % 3000}", 'Ptl', 'DISTRICT 02',
+                      datetime.datetime(year, 1, 1) + datetime.timedelta(days=int(days[i])),
+                      int(start[i]), int(start[i]) + 400, float(hours[i]), float(hours[i]), 'Detail'])
+    workbook.save(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+# Time a case and trace its peak memory
+def measure(fn, repeat=3):
+    """
+    fn: callable: The case; returns the number of rows it processed.
+    repeat: int: Timed runs; the best one is kept.
+
+    Returns {'seconds', 'runs', 'peak_mb', 'rss_growth_mb', 'rows'}. Memory is measured in separate
+    runs: peak_mb is what tracemalloc saw (Python and NumPy allocations, not pyarrow's buffers behind
+    pandas strings), and rss_growth_mb is how far the resident memory of a forked copy of this
+    process rose above its size at the fork while running the case. That counts everything and does
+    not depend on what earlier cases left loaded. It is None where fork or /proc/self/clear_refs is
+    not available.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = fn()
+        runs.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(runs), 'runs': runs, 'peak_mb': peak / 2**20, 'rss_growth_mb': _forked_rss_growth(fn),
+            'rows': int(rows)}
+
+
+def _forked_rss_growth(fn):
+    if not hasattr(os, 'fork') or not os.path.exists('/proc/self/clear_refs'):
+        return None
+    sys.stdout.flush()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_end)
+            # A fork inherits the parent's peak (ru_maxrss), so reset the child's own peak to its
+            # current size (Linux 4.0+) and measure from there
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            start = _proc_status_mb('VmRSS')
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+            os.write(write_end, repr(_proc_status_mb('VmHWM') - start).encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        growth = f.read()
+    os.waitpid(pid, 0)
+    return float(growth) if growth else None
+
+
+def _proc_status_mb(field):
+    with open('/proc/self/status') as f:
+        line = next(line for line in f if line.startswith(field + ':'))
+    return int(line.split()[1]) / 2**10
+
+
+# Cases importing a module in a fresh interpreter, so nothing is cached from earlier cases
+def import_cases(modules=('process', 'regression')):
+    """
+    modules: list: Modules of code/ to import. Each case's time includes starting the interpreter.
+    """
+    def run_import(module):
+        def case():
+            subprocess.run([sys.executable, '-c', f"import {module}"], cwd=os.path.join(ROOT, 'code'), check=True)
+            return 1
+        return case
+    return {f'import_{module}': run_import(module) for module in modules}
+
+
+# Cases reading and cleaning the bundled yearly files
+def bundled_cases(cache_dir):
+    def read_all(**kwargs):
+        def case():
+            dfs = read_data(EARNINGS_FOLDER, EARNINGS_FILE, EARNINGS_YEARS, ENCODING, TARGET_COL, DROP_COL, **kwargs)
+            return sum(len(df) for df in dfs)
+        return case
+
+    # Fill the cache once so the cached case measures warm reads only
+    with contextlib.redirect_stdout(io.StringIO()):
+        read_data(EARNINGS_FOLDER, EARNINGS_FILE, EARNINGS_YEARS, ENCODING, TARGET_COL, DROP_COL, cache_dir=cache_dir)
+    return {
+        'read_data_csv[bundled]': read_all(),
+        'read_data_csv_schema[bundled]': read_all(schema=EARNINGS_SCHEMA),
+        'read_data_csv_cached[bundled]': read_all(cache_dir=cache_dir),
+    }
+
+
+# Cases at one scale of synthetic data
+def scaled_cases(data_dir, scale, xlsx=True):
+    folder = os.path.join(data_dir, f"earning_{scale:g}x")
+    write_scaled_earnings(folder, scale)
+    tag = f"[{scale:g}x]"
+
+    def read_csv(**kwargs):
+        def case():
+            dfs = read_data(folder, EARNINGS_FILE, SYNTHETIC_YEARS, ENCODING, TARGET_COL, DROP_COL, **kwargs)
+            return sum(len(df) for df in dfs)
+        return case
+
+    raw = pd.concat([pd.read_csv(os.path.join(folder, f"{year}_{EARNINGS_FILE}"), encoding=ENCODING,
+                                 usecols=TARGET_COL, dtype=str) for year in SYNTHETIC_YEARS], ignore_index=True)
+
+    def clean():
+        for col in TARGET_COL:
+            clean_currency_column(raw[col], as_float=True)
+        return len(raw)
+
+    rng = np.random.default_rng(0)
+    hours = rng.choice([4.0, 7.5, 830.0, 1230.0, 2400.0, 30.0, np.nan], len(raw))
+    details = [pd.DataFrame({'Hours Worked': part, 'Hours Paid': part}) for part in np.array_split(hours, 10)]
+
+    def hours_array():
+        correct_hours_array(hours)
+        return len(hours)
+
+    def hours_columns():
+        process_hours_columns(details, ['Hours Worked', 'Hours Paid'])
+        return len(hours)
+
+    years = np.arange(2011, 2025)
+    series = {f"Department {i}": pd.DataFrame({'YEAR': years, 'OVERTIME': 1e6 + 1e5 * rng.standard_normal(len(years))})
+              for i in range(int(DEPARTMENTS * scale))}
+    first = next(iter(series.values()))
+
+    def forecast_one():
+        # Uncached, so every call fits (comparable with the results from before fits were memoized)
+        for _ in range(100):
+            polynomial_regression_forecast(first, 'YEAR', 'OVERTIME', headless=True, cache=False)
+        return 100 * len(years)
+
+    def forecast_one_cached():
+        # One fit, then 99 hits of a fresh in-memory cache
+        cache = ResultCache()
+        for _ in range(100):
+            polynomial_regression_forecast(first, 'YEAR', 'OVERTIME', headless=True, cache=cache)
+        return 100 * len(years)
+
+    def forecast_batch():
+        batch_forecast(series)
+        return len(series) * len(years)
+
+    def forecast_batch_bootstrap():
+        batch_forecast(series, intervals='bootstrap')
+        return len(series) * len(years)
+
+    cases = {
+        f'read_data_csv{tag}': read_csv(),
+        f'read_data_csv_schema{tag}': read_csv(schema=EARNINGS_SCHEMA),
+        f'clean_currency_column{tag}': clean,
+        f'correct_hours_array{tag}': hours_array,
+        f'process_hours_columns{tag}': hours_columns,
+        f'polynomial_regression_forecast_x100{tag}': forecast_one,
+        f'polynomial_regression_forecast_cached_x100{tag}': forecast_one_cached,
+        f'batch_forecast{tag}': forecast_batch,
+        f'batch_forecast_bootstrap{tag}': forecast_batch_bootstrap,
+    }
+    if xlsx:
+        details_folder = os.path.join(data_dir, f"details_{scale:g}x")
+        write_details_workbook(details_folder, scale)
+
+        def read_xlsx():
+            dfs = read_data(details_folder, 'Details.xlsx', [2020], None, [], [], file_type='xlsx')
+            return sum(len(df) for df in dfs)
+        cases[f'read_data_xlsx{tag}'] = read_xlsx
+    return cases
+
+
+# Run the benchmarks and return the result document
+def run_benchmarks(scales=(1, 10, 100), xlsx_scales=(1, 10), data_dir=None, repeat=3, bundled=True, select=None):
+    """
+    scales: list: Sizes of the synthetic data relative to the bundled files.
+    xlsx_scales: list: Scales at which the Excel case runs as well.
+    data_dir: str: Folder for the synthetic files, reused between runs. None uses a temporary folder.
+    repeat: int: Timed runs per case.
+    bundled: bool: Include the cases on the bundled data.
+    select: str: Only run cases whose name contains this text.
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix='payroll_bench_')
+    results = {}
+
+    def run(cases):
+        for name, case in cases.items():
+            if select and select not in name:
+                continue
+            results[name] = measure(case, repeat)
+            rss = results[name]['rss_growth_mb']
+            print(f"{name:<48} {results[name]['seconds']:9.3f}s {results[name]['peak_mb']:9.1f} MB traced"
+                  + (f" {rss:9.1f} MB RSS growth" if rss is not None else ''))
+
+    run(import_cases())
+    if bundled:
+        run(bundled_cases(os.path.join(data_dir, 'cache')))
+    for scale in scales:
+        run(scaled_cases(data_dir, scale, xlsx=scale in xlsx_scales))
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+# Compare a result document to an earlier one; returns the names of the cases that got slower
+def compare(current, baseline, threshold=1.25):
+    """
+    current, baseline: dict: Documents returned by run_benchmarks (or loaded from their JSON).
+    threshold: float: Time ratio above which a case counts as a regression.
+    """
+    regressions = []
+    print(f"\n{'case':<48} {'before':>9} {'after':>9} {'ratio':>7}")
+    # Memory is reported alongside but only time decides a regression
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:<48} {'-':>9} {result['seconds']:8.3f}s {'new':>7}")
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = ' slower' if ratio > threshold else ''
+        print(f"{name:<48} {old['seconds']:8.3f}s {result['seconds']:8.3f}s {ratio:6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='*', default=[1, 10, 100])
+    parser.add_argument('--xlsx-scales', type=float, nargs='*', default=[1, 10])
+    parser.add_argument('--data-dir', help='folder for the synthetic files (kept, so later runs reuse them)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-bundled', action='store_true', help='skip the cases on the bundled data')
+    parser.add_argument('-k', dest='select', help='only run cases whose name contains this text')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'bench', 'results.json'))
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    # Read the baseline first: --compare and --output may be the same file
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    document = run_benchmarks(args.scales, args.xlsx_scales, args.data_dir, args.repeat,
+                              not args.no_bundled, args.select)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if baseline is not None and compare(document, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
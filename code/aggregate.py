@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import cache_key, derived_key, load_cached, store_cached
+from instrument import stage
+from process import read_data_chunks
+
+# Pay components of the yearly earnings files
+PAY_COLUMNS = ['REGULAR', 'RETRO', 'OTHER', 'OVERTIME', 'INJURED', 'DETAIL', 'QUINN_EDUCATION', 'TOTAL_GROSS']
+
+
+# Fold cleaned chunks into per-group sums, counts and means without keeping the chunks around
+def aggregate_chunks(chunks, by=('DEPARTMENT_NAME', 'YEAR'), columns=PAY_COLUMNS) -> pd.DataFrame:
+    """
+    chunks: iterable: Cleaned DataFrames, e.g. process.read_data_chunks(...) or the list read_data returns.
+    by: list: Columns to group on.
+    columns: list: Numeric columns to aggregate; columns missing from a chunk are skipped for that chunk.
+
+    Returns a DataFrame indexed by `by` with a (column, 'sum' | 'count' | 'mean') column for every
+    aggregated column. Only the running totals are kept, so memory grows with the number of groups,
+    not with the number of rows read.
+    """
+    by = list(by)
+    totals = None
+
+    for chunk in chunks:
+        cols = [col for col in columns if col in chunk.columns]
+        part = chunk.groupby(by, observed=True, sort=False)[cols].agg(['sum', 'count'])
+        # Category levels differ from chunk to chunk; plain values align across chunks
+        part.index = pd.MultiIndex.from_arrays(
+            [_plain_values(part.index.get_level_values(i)) for i in range(part.index.nlevels)], names=by)
+        totals = part if totals is None else totals.add(part, fill_value=0)
+
+    if totals is None:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[]] * len(by), names=by))
+    return _stats(totals, columns)
+
+
+# Merge aggregates of disjoint pieces of the data (e.g. one per year) into the aggregate of all of it
+def combine_aggregates(parts, by=('DEPARTMENT_NAME', 'YEAR'), columns=PAY_COLUMNS) -> pd.DataFrame:
+    """
+    parts: list: Results of aggregate_chunks with the same `by`.
+    by, columns: Same as aggregate_chunks.
+
+    Sums and counts are added and means recomputed from them, so the result equals aggregate_chunks
+    over all the pieces' rows.
+    """
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[]] * len(by), names=list(by)))
+    totals = pd.concat([part[[col for col in part.columns if col[1] in ('sum', 'count')]] for part in parts])
+    totals = totals.groupby(level=list(range(totals.index.nlevels)), sort=False).sum()
+    return _stats(totals, columns)
+
+
+def _stats(totals, columns):
+    stats = {}
+    for col in [col for col in columns if col in totals.columns.get_level_values(0)]:
+        count = totals[(col, 'count')].fillna(0).astype('int64')
+        total = totals[(col, 'sum')].fillna(0.0)
+        stats[(col, 'sum')] = total
+        stats[(col, 'count')] = count
+        stats[(col, 'mean')] = total.where(count > 0) / count.where(count > 0)
+    return pd.DataFrame(stats).sort_index()
+
+
+def _plain_values(level):
+    if isinstance(level.dtype, pd.CategoricalDtype):
+        return level.astype(level.categories.dtype)
+    return level
+
+
+# Department x year x pay-component cube (sum, count, mean) from cleaned earnings data
+def build_cube(data, by=('DEPARTMENT_NAME', 'YEAR'), columns=PAY_COLUMNS) -> pd.DataFrame:
+    """
+    data: DataFrame, list or iterable: Cleaned earnings (one frame, the list read_data returns or chunks).
+    by: list: Grouping columns, the department column first and the year column last.
+    columns: list: Pay components to aggregate.
+
+    Every frame is grouped once; no concatenated copy of the rows is made.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = [data]
+    return aggregate_chunks(data, by=by, columns=columns)
+
+
+# Read the yearly files and build their cube, reusing the cached cube while no source file changed
+def load_cube(folder_path, file_name, years, encoding, target_col, drop_col, cache_dir=None, schema=None,
+              by=('DEPARTMENT_NAME', 'YEAR'), columns=PAY_COLUMNS, chunksize=100_000) -> pd.DataFrame:
+    """
+    folder_path, file_name, years, encoding, target_col, drop_col, schema: Same as process.read_data.
+    cache_dir: str: Folder where the cube is cached. None always rebuilds it. Every year's part of
+        the cube is cached next to it, so when a year file is added or changed only that year is
+        read again and the cube is merged from the parts (combine_aggregates).
+    by, columns: Same as build_cube.
+    chunksize: int: Rows per chunk while building, which bounds peak memory.
+    """
+    years = list(years)
+    name = os.path.join(folder_path, f"cube_{file_name}")
+    if not cache_dir:
+        with stage('load_cube', path=name, years=len(years)) as info:
+            chunks = read_data_chunks(folder_path, file_name, years, encoding, target_col, drop_col,
+                                      chunksize=chunksize, schema=schema)
+            cube = build_cube(chunks, by=by, columns=columns)
+            info['rows'] = len(cube)
+        return cube
+
+    params = dict(encoding=encoding, target_col=list(target_col), drop_col=list(drop_col or []), schema=schema,
+                  by=list(by), columns=list(columns))
+    with stage('load_cube', path=name, years=len(years)) as info:
+        paths = [os.path.join(folder_path, f"{year}_{file_name}") for year in years]
+        inputs = [cache_key(path) if os.path.exists(path) else path for path in paths]
+        key = derived_key(name, inputs, **params)
+        cube = load_cached(cache_dir, name, key)
+        info['cache_hit'] = cube is not None
+        if cube is not None:
+            print("Read cached cube for:", name)
+            info['rows'] = len(cube)
+            return cube
+
+        parts, failed = [], False
+        for year, path in zip(years, paths):
+            if not os.path.exists(path):
+                print(f"File for year {year} does not exist.")
+                continue
+            with stage('cube_year', year=year, path=path) as year_info:
+                part_key = cache_key(path, cube_part=True, year=year, **params)
+                part = load_cached(cache_dir, path, part_key)
+                year_info['cache_hit'] = part is not None
+                if part is None:
+                    chunks = read_data_chunks(folder_path, file_name, [year], encoding, target_col, drop_col,
+                                              chunksize=chunksize, schema=schema, errors='raise')
+                    try:
+                        part = build_cube(chunks, by=by, columns=columns)
+                    except Exception as e:
+                        # Neither the partial year nor the cube is cached, so the year is read again next time
+                        print(f"Error processing {path}: {e}")
+                        year_info['error'] = str(e)
+                        failed = True
+                        continue
+                    store_cached(cache_dir, path, part_key, part)
+                year_info['rows'] = len(part)
+            parts.append(part)
+        cube = combine_aggregates(parts, by=by, columns=columns)
+        info['rows'] = len(cube)
+        if not failed:
+            store_cached(cache_dir, name, key, cube)
+    return cube
+
+
+# One department's yearly values out of the cube, in the YEAR + columns layout run_overtime_forecast expects
+def department_frame(cube, department, stat='sum') -> pd.DataFrame:
+    """
+    cube: pd.DataFrame: Result of build_cube or load_cube.
+    department: str: Value of the first grouping level.
+    stat: str: 'sum', 'count' or 'mean'.
+
+    Returns None when the department is not in the cube.
+    """
+    try:
+        values = cube.loc[department]
+    except KeyError:
+        return None
+    return _stat_frame(values, stat)
+
+
+# Split the cube into the {department: DataFrame} dict the notebooks used to build by hand
+def department_frames(cube, stat='sum', departments=None) -> dict:
+    """
+    cube: pd.DataFrame: Result of build_cube or load_cube.
+    stat: str: 'sum', 'count' or 'mean'.
+    departments: list: Departments to include, all of them by default.
+    """
+    flat = _stat_frame(cube, stat)
+    dept_col = flat.columns[0]
+    # The cube is sorted by department, so each department is one contiguous block of rows
+    starts = np.flatnonzero(flat[dept_col].ne(flat[dept_col].shift()).to_numpy())
+    bounds = zip(starts, np.append(starts[1:], len(flat)))
+    wanted = None if departments is None else set(departments)
+    frames = {}
+    for start, stop in bounds:
+        dept = flat[dept_col].iat[start]
+        if wanted is None or dept in wanted:
+            frames[dept] = flat.iloc[start:stop, 1:].reset_index(drop=True)
+    return frames
+
+
+def _stat_frame(values, stat):
+    return values.xs(stat, axis=1, level=1).rename_axis(None, axis=1).reset_index()
@@ -0,0 +1,203 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Text columns of the adopted operating budget file and the names they are loaded under
+BUDGET_TEXT_COLUMNS = {'Cabinet': 'CABINET', 'Dept': 'DEPT', 'Program': 'PROGRAM', 'Expense Category': 'EXPENSE_CATEGORY'}
+
+# Amount columns are named 'FY22 Actual Expense', 'FY24 Appropriation', 'FY25 Budget', ...
+AMOUNT_COLUMN = re.compile(r'^FY(\d{2})\s+(.+)$')
+
+# Words of department names that differ between the earnings and budget files, e.g. 'Dpt', 'Offc', 'Cntr'
+NAME_ABBREVIATIONS = {
+    'DEPT': 'DEPARTMENT', 'DPT': 'DEPARTMENT', 'OFF': 'OFFICE', 'OFFC': 'OFFICE', 'OFC': 'OFFICE',
+    'CNTR': 'CENTER', 'COMM': 'COMMISSION', 'DISABIL': 'DISABILITIES', 'W': 'WITH', 'ECO': 'ECONOMIC',
+    'OPP': 'OPPORTUNITY', 'INCL': 'INCLUSION', 'PRES': 'PRESERVATION', 'PART': 'PARTICIPATORY',
+    'PROT': 'PROTECTIONS', 'MANGMNT': 'MANAGEMENT', 'INTERGVERNMTL': 'INTERGOVERNMENTAL', 'RELATION': 'RELATIONS',
+    'AD': 'ADVANCEMENT', 'VETS': 'VETERANS', 'COMMUNICA': 'COMMUNICATIONS', 'SVC': 'SERVICES', 'SERVS': 'SERVICES',
+}
+# Words that do not tell departments apart ('Boston Police Department' is the budget's 'Police Department')
+NAME_STOP_WORDS = {'BOSTON', 'CITY', 'DEPARTMENT', 'OF', 'THE', 'FOR', 'AND', 'ASD'}
+
+# Earnings department names whose budget line has a different name (renamed or merged departments)
+DEPARTMENT_ALIASES = {
+    'Boston Public Library': 'Library Department',
+    'Parks Department': 'Parks and Recreation',
+    'Office of Housing': "Mayor's Office of Housing",
+    'Neighborhood Development': "Mayor's Office of Housing",
+    'DND Neighborhood Development': "Mayor's Office of Housing",
+    "Veterans' Services": 'Boston VETS',
+    'Treasury-Treasury Division': 'Treasury Division',
+    'Treasury-Collecting Division': 'Collecting Division',
+    'Election Dept-Listing Board': 'Listing Board',
+    'Human Rights Commission': 'Human Right Commission',
+    'Immigrant Advancement': 'Office for Immigrant Advancement',
+    'Office of New Bostonians': 'Office for Immigrant Advancement',
+    'Human Services': 'Office of Human Services',
+    'Offc of Language and Communica': 'Office of Language & Communications Access',
+    'OPAT': 'Office of Police Accountability & Transparency',
+    'Office of RRE': 'Office of Resiliency & Racial Equity',
+    'ASD Office of Budget Mangmnt': 'Budget Management',
+    'Workers Compensation Service': "Workers' Compensation Fund",
+    'Labor Relations': 'Office of Labor Relations',
+    'Elderly Commission': 'Age Strong',
+    'Transportation-Parking Clerk': 'Transportation Department',
+    'Traffic Division': 'Transportation Department',
+    'Ofc of Strts, Trnsp & Sani': 'Office of Streets',
+    'Emergency Preparedness': 'Emergency Management',
+    'Innovation Department': 'Department of Innovation and Technology',
+    'Arts & Cultural Development': 'Office of Arts & Culture',
+    'Supplier & Workforce Diversity': 'Supplier Diversity',
+    'Youth Engagement & Employment': 'Youth Employment and Opportunity',
+    'Licensing Board': 'Consumer Affairs & Licensing',
+    "Women's Commission": "Women's Advancement",
+    'Office of Admin & Finance': 'Office of Finance',
+    'Administration and Finance': 'Office of Finance',
+    'Office of Finance & Budget': 'Office of Finance',
+}
+# Earnings departments matched by pattern when neither their name nor an alias is in the budget: every
+# school is its own department in the earnings files but part of one budget line
+DEPARTMENT_PATTERNS = [
+    (re.compile(r'Elementary|K-\d|\d-\d+\b|\bHigh\b|Academy|\bEEC\b|\bELC\b|\bEES\b|\bBPS\b|Middle|School|Montessori|'
+                r'Pilot|Early Ed|Charter|Inclusion|Upper|Latin|Horace Mann|\bUP\b', re.IGNORECASE),
+     'Boston Public Schools'),
+]
+
+
+# Read the adopted operating budget into one row per budget line and fiscal year
+def load_budget(path) -> pd.DataFrame:
+    """
+    path: str: Path of the budget CSV, e.g. data/budget/fy25-adopted-operating-budget.csv.
+
+    Returns the columns CABINET, DEPT, PROGRAM, EXPENSE_CATEGORY (categoricals), FISCAL_YEAR (FY25 is
+    2025, the year ending June 2025), KIND ('actual expense', 'appropriation' or 'budget', from the
+    column name) and AMOUNT (float, NaN where the file has no number).
+    """
+    raw = pd.read_csv(path, dtype=str)
+    amounts = {col: AMOUNT_COLUMN.match(col) for col in raw.columns}
+    amounts = {col: match for col, match in amounts.items() if match}
+    text = raw[list(BUDGET_TEXT_COLUMNS)].rename(columns=BUDGET_TEXT_COLUMNS).astype('category')
+
+    parts = []
+    for col, match in amounts.items():
+        part = text.copy()
+        part['FISCAL_YEAR'] = np.int16(2000 + int(match.group(1)))
+        part['KIND'] = match.group(2).strip().lower()
+        part['AMOUNT'] = pd.to_numeric(raw[col].str.replace(',', '', regex=False), errors='coerce')
+        parts.append(part)
+    budget = pd.concat(parts, ignore_index=True)
+    budget['KIND'] = budget['KIND'].astype('category')
+    return budget
+
+
+# Normalized form of a department name, the same for the spellings of both files
+def department_key(name) -> str:
+    """
+    name: str: Department name as written in either file.
+
+    'Boston Police Department', 'Police Department' and 'POLICE DEPT' all give 'POLICE'.
+    """
+    # 'ofWorkforce' -> 'of Workforce' before upper-casing loses the word boundary
+    name = re.sub(r'([a-z])([A-Z])', r'\1 \2', str(name)).upper().replace("'", '')
+    words = [NAME_ABBREVIATIONS.get(word, word) for word in re.findall(r'[A-Z0-9+]+', name)]
+    return ' '.join(word for word in words if word not in NAME_STOP_WORDS)
+
+
+# Precompute the lookup from normalized department names to budget departments
+def department_index(departments, aliases=DEPARTMENT_ALIASES) -> dict:
+    """
+    departments: list: Budget department names (the DEPT column of load_budget).
+    aliases: dict: {earnings name: budget name} for names that do not normalize to the same key.
+
+    Returns {department_key: budget department}. Aliases pointing at departments that are not in
+    `departments` are left out.
+    """
+    departments = list(dict.fromkeys(departments))
+    index = {department_key(dept): dept for dept in departments}
+    present = set(departments)
+    index.update({department_key(name): dept for name, dept in aliases.items() if dept in present})
+    return index
+
+
+# Budget department of every earnings department name
+def match_departments(names, index, patterns=DEPARTMENT_PATTERNS) -> pd.Series:
+    """
+    names: array-like: Earnings department names; repeats are fine, each distinct name is matched once.
+    index: dict: Result of department_index.
+    patterns: list: (compiled regex, budget department) tried in order for names not in the index;
+        patterns whose department is not in the index are skipped.
+
+    Returns the budget department of each name (NaN when there is none), aligned with `names`.
+    """
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+    targets = set(index.values())
+    patterns = [(pattern, dept) for pattern, dept in patterns if dept in targets]
+    matched = []
+    for name in uniques:
+        dept = index.get(department_key(name))
+        if dept is None:
+            dept = next((dept for pattern, dept in patterns if pattern.search(str(name))), None)
+        matched.append(dept)
+    matched = np.array(matched + [None], dtype=object)
+    # factorize codes missing names as -1, which picks the trailing None
+    result = pd.Series(matched[codes], index=getattr(names, 'index', None))
+    return result.where(result.notna(), np.nan)
+
+
+# Budget, actual and forecast spending per budget department and fiscal year in one table
+def budget_vs_actual(cube, budget, forecasts=None, column='TOTAL_GROSS', categories=('Personnel Services',),
+                     index=None) -> pd.DataFrame:
+    """
+    cube: pd.DataFrame: Department x year aggregates (aggregate.build_cube or load_cube).
+    budget: pd.DataFrame: Result of load_budget.
+    forecasts: pd.DataFrame: regression.batch_forecast table of the same cube and column; the best
+        model's forecasts of the departments that reach the latest year fill FORECAST. None leaves
+        FORECAST empty.
+    column: str: Pay component of the cube compared with the budget.
+    categories: list: Expense categories of the budget summed as BUDGET. None uses every category.
+    index: dict: department_index to match with. None builds it from the budget's departments.
+
+    Returns one row per budget department and fiscal year with DEPT, YEAR, KIND, BUDGET, ACTUAL (the
+    matched earnings departments' sum of `column` in that calendar year), FORECAST, DEPARTMENTS
+    (number of earnings departments matched), ACTUAL_TO_BUDGET and FORECAST_TO_BUDGET. Earnings
+    departments that match no budget line are left out; see match_departments for which.
+    """
+    if categories is not None:
+        budget = budget[budget['EXPENSE_CATEGORY'].isin(list(categories))]
+    table = budget.groupby(['DEPT', 'FISCAL_YEAR'], observed=True).agg(
+        KIND=('KIND', 'first'), BUDGET=('AMOUNT', 'sum')).reset_index()
+    table = table.rename(columns={'FISCAL_YEAR': 'YEAR'})
+    table['DEPT'] = table['DEPT'].astype(str)
+    table['YEAR'] = table['YEAR'].astype('int64')
+    table['KIND'] = table['KIND'].astype(str)
+    if index is None:
+        index = department_index(budget['DEPT'].astype(str).unique())
+
+    actual = cube[(column, 'sum')].rename('ACTUAL').reset_index()
+    dept_col, year_col = actual.columns[0], actual.columns[1]
+    actual['DEPT'] = match_departments(actual[dept_col], index)
+    actual = actual.dropna(subset=['DEPT']).groupby(['DEPT', year_col]).agg(
+        ACTUAL=('ACTUAL', 'sum'), DEPARTMENTS=(dept_col, 'nunique')).reset_index()
+    actual = actual.rename(columns={year_col: 'YEAR'}).astype({'YEAR': 'int64'})
+    table = table.merge(actual, on=['DEPT', 'YEAR'], how='left')
+
+    if forecasts is not None and len(forecasts):
+        # Departments that stopped reporting earlier (closed schools, renamed offices) are not forecast
+        best = forecasts[forecasts['is_best'] & (forecasts['last_year'] == forecasts['last_year'].max())]
+        steps = [col for col in best.columns if col.startswith('forecast_')]
+        future = best.melt(id_vars=['department', 'last_year'], value_vars=steps, var_name='step', value_name='FORECAST')
+        future['YEAR'] = future['last_year'] + future['step'].str.removeprefix('forecast_').astype('int64')
+        future['DEPT'] = match_departments(future['department'], index)
+        future = future.dropna(subset=['DEPT']).groupby(['DEPT', 'YEAR'])['FORECAST'].sum().reset_index()
+        table = table.merge(future, on=['DEPT', 'YEAR'], how='left')
+    else:
+        table['FORECAST'] = np.nan
+
+    table['DEPARTMENTS'] = table['DEPARTMENTS'].fillna(0).astype('int64')
+    budget_amount = table['BUDGET'].where(table['BUDGET'] != 0)
+    table['ACTUAL_TO_BUDGET'] = table['ACTUAL'] / budget_amount
+    table['FORECAST_TO_BUDGET'] = table['FORECAST'] / budget_amount
+    columns = ['DEPT', 'YEAR', 'KIND', 'BUDGET', 'ACTUAL', 'FORECAST', 'DEPARTMENTS', 'ACTUAL_TO_BUDGET',
+               'FORECAST_TO_BUDGET']
+    return table[columns].sort_values(['DEPT', 'YEAR']).reset_index(drop=True)
@@ -0,0 +1,200 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Bump when the cleaning logic changes so old cache files stop matching
+CACHE_VERSION = 2
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def _digest(payload) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+# Build the cache key of a cleaned file from its source file and the arguments used to clean it
+def cache_key(path, **params) -> str:
+    """
+    path: str: Path of the source file.
+    params: Arguments that change the cleaned result (target_col, drop_col, encoding, ...).
+
+    The key has three parts: which file, which version of it (mtime and size) and which arguments,
+    so a changed source only invalidates its own entries.
+    """
+    stat = os.stat(path)
+    source = _digest(os.path.abspath(path))
+    version = _digest([stat.st_mtime_ns, stat.st_size])
+    settings = _digest([CACHE_VERSION, params])
+    return f"{source}.{version}.{settings}"
+
+
+# Build a cache key for data derived from several inputs (e.g. an aggregate over all yearly files)
+def derived_key(name, input_keys, **params) -> str:
+    """
+    name: str: Name of the derived data; entries with the same name replace each other.
+    input_keys: list: Keys of everything it was built from (e.g. cache_key of each source file).
+    params: Arguments used to build it.
+    """
+    return f"{_digest(name)}.{_digest(list(input_keys))}.{_digest([CACHE_VERSION, params])}"
+
+
+def _entry_path(cache_dir, path, key, ext):
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{key}.{ext}")
+
+
+# Load a cleaned frame from the cache, returns None on a miss
+def load_cached(cache_dir, path, key):
+    """
+    cache_dir: str: Folder holding the cache files.
+    path: str: Path of the source file (or name of the derived data).
+    key: str: Key returned by cache_key or derived_key.
+    """
+    parquet_path = _entry_path(cache_dir, path, key, 'parquet')
+    if HAS_PYARROW and os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    pickle_path = _entry_path(cache_dir, path, key, 'pkl')
+    if os.path.exists(pickle_path):
+        return pd.read_pickle(pickle_path)
+    return None
+
+
+# Store a cleaned frame in the cache and drop the entries of older versions of the same source
+def store_cached(cache_dir, path, key, df):
+    """
+    cache_dir: str: Folder holding the cache files.
+    path: str: Path of the source file (or name of the derived data).
+    key: str: Key returned by cache_key or derived_key.
+    df: pd.DataFrame: Cleaned data to store.
+
+    Frames are stored as Parquet; frames Parquet cannot hold (mixed-type object columns from Excel)
+    or installs without pyarrow fall back to pickle.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    target = None
+    if HAS_PYARROW:
+        target = _entry_path(cache_dir, path, key, 'parquet')
+        try:
+            df.to_parquet(target + '.tmp')
+        except Exception:
+            target = None
+    if target is None:
+        target = _entry_path(cache_dir, path, key, 'pkl')
+        df.to_pickle(target + '.tmp')
+    # Write then rename so a concurrent reader never sees a half-written file
+    os.replace(target + '.tmp', target)
+
+    source, version, _ = key.split('.')
+    pattern = os.path.join(cache_dir, f"{glob.escape(os.path.basename(path))}.{source}.*")
+    for old in glob.glob(pattern):
+        if f".{source}.{version}." not in os.path.basename(old):
+            os.remove(old)
+    return target
+
+
+# Build the key of a computed result from the arrays it was computed from and its other arguments
+def content_key(*arrays, **params) -> str:
+    """
+    arrays: array-like: Inputs of the computation; dtype, shape and contents are hashed, so equal data
+        gives equal keys wherever it came from.
+    params: Other arguments that change the result (degrees, horizon, ...).
+    """
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        if array.dtype.hasobject:
+            digest.update(json.dumps(array.tolist(), default=str).encode())
+        else:
+            digest.update(array.tobytes())
+    digest.update(json.dumps([CACHE_VERSION, params], sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:20]
+
+
+class ResultCache:
+    """
+    Least-recently-used cache of computed results keyed by content_key. At most maxsize results are
+    kept in memory, the least recently used one is dropped first. With cache_dir every result is also
+    pickled to <cache_dir>/<name>.<key>.pkl, so later sessions and other processes find it; a result
+    found there is brought back into memory. Safe to share between threads.
+    """
+
+    def __init__(self, maxsize=256, cache_dir=None, name='result'):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """The result stored under key, or default when there is none in memory or on disk."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a result (not None) in memory and, with cache_dir, on disk."""
+        self._remember(key, value)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+
+    def clear(self):
+        """Forget the results held in memory; the files in cache_dir are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{self.name}.{key}.pkl")
@@ -0,0 +1,242 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Fields that tell apart people who share a name, and how much agreeing on each counts when linking a row
+# to last year's people of that name; a row that agrees on none of them starts a new person
+LINK_WEIGHTS = {'DEPARTMENT_NAME': 4, 'TITLE': 2, 'POSTAL': 1}
+
+
+class EmployeeIndex:
+    """
+    Integer IDs of the people in the concatenated yearly earnings (see build_employee_index): row i of
+    that frame belongs to employee ids[i], and no employee has two rows in the same year. Rows are
+    also kept grouped by year (rows[offsets[k]:offsets[k + 1]] are the rows of years[k]) and by
+    employee (rows_by_employee[starts[e]:starts[e + 1]], oldest year first), so per-year and
+    per-employee queries are slices of arrays instead of groupbys on NAME.
+    """
+
+    def __init__(self, ids, year_codes, years, names):
+        self.ids = ids
+        self.year_codes = year_codes
+        self.years = np.asarray(years)
+        self.names = np.asarray(names, dtype=object)
+        self.rows = np.argsort(year_codes, kind='stable')
+        self.offsets = np.searchsorted(year_codes[self.rows], np.arange(len(self.years) + 1))
+        self.rows_by_employee = np.lexsort((year_codes, ids))
+        self.starts = np.searchsorted(ids[self.rows_by_employee], np.arange(len(self.names) + 1))
+
+    def __len__(self):
+        return len(self.names)
+
+    def year_rows(self, year) -> np.ndarray:
+        """Row positions of one year."""
+        k = np.searchsorted(self.years, year)
+        if k == len(self.years) or self.years[k] != year:
+            return np.empty(0, dtype=self.rows.dtype)
+        return self.rows[self.offsets[k]:self.offsets[k + 1]]
+
+    def employee_rows(self, employee) -> np.ndarray:
+        """Row positions of one employee, oldest year first."""
+        return self.rows_by_employee[self.starts[employee]:self.starts[employee + 1]]
+
+    def find(self, name) -> list:
+        """IDs of the employees called `name` (spelling differences name_key ignores are fine)."""
+        key = name_key([name])[0]
+        return np.flatnonzero(self.names == key).tolist()
+
+    def matrix(self, values, fill=np.nan) -> np.ndarray:
+        """Employees x years array of a column of the earnings rows; `fill` where an employee has no row."""
+        values = np.asarray(values, dtype='float64')
+        table = np.full((len(self.names), len(self.years)), fill, dtype='float64')
+        table[self.ids, self.year_codes] = values
+        return table
+
+    def history(self, employee, values) -> pd.Series:
+        """One employee's `values` by year."""
+        rows = self.employee_rows(employee)
+        return pd.Series(np.asarray(values)[rows], index=pd.Index(self.years[self.year_codes[rows]], name='YEAR'))
+
+    def counts(self, mask=None) -> np.ndarray:
+        """Employees per year, or employees whose row is True in `mask`."""
+        weights = None if mask is None else np.asarray(mask, dtype='float64')
+        return np.bincount(self.year_codes, weights=weights, minlength=len(self.years)).astype('int64')
+
+
+# Normalized NAME: 'Adams,Ann E.', 'ADAMS, ANN E' and 'Adams,Ann  E' all give 'ADAMS,ANN E'
+def name_key(names) -> np.ndarray:
+    """
+    names: array-like: NAME values.
+    """
+    # Each distinct spelling is normalized once; a name is on about six rows
+    codes, uniques = pd.factorize(pd.Series(names))
+    keys = pd.Series(list(uniques) + [''], dtype=object).astype(str).str.upper()
+    keys = keys.str.replace(r'[^A-Z,]+', ' ', regex=True).str.replace(r'\s*,\s*', ',', regex=True)
+    # Missing names are coded -1, which picks the trailing ''
+    return keys.str.strip().to_numpy(dtype=object)[codes]
+
+
+# Five digit ZIP code: '02118-3126', '2118' and '02118' all give '02118'
+def postal_key(postal) -> np.ndarray:
+    """
+    postal: array-like: POSTAL values; missing ones stay missing.
+    """
+    digits = pd.Series(postal, dtype=object).astype('str').str.extract(r'^\s*(\d{1,5})', expand=False)
+    return digits.str.zfill(5).to_numpy(dtype=object)
+
+
+# Give every person in the concatenated yearly earnings an integer ID that follows them across years
+def build_employee_index(earnings, weights=LINK_WEIGHTS) -> EmployeeIndex:
+    """
+    earnings: pd.DataFrame: Rows of every year with NAME and YEAR (pipeline.load_earnings' 'earnings'),
+        plus the columns of `weights` that it has.
+    weights: dict: {column: weight} used to tell apart people with the same name, see LINK_WEIGHTS.
+
+    A name that is on at most one row per year is followed from year to year, and its rows stay one
+    person as long as each row agrees with the one before on at least one of `weights`; a row that
+    agrees on none (a namesake who joined after the other left) starts a new person. Names on
+    several rows of some year (common names, two jobs) are linked year by year: each row goes to the
+    unclaimed person of that name whose latest row agrees most on `weights`, or starts a new person
+    when none agrees.
+    """
+    keys = name_key(earnings['NAME'])
+    year_codes, years = pd.factorize(earnings['YEAR'].to_numpy(), sort=True)
+    name_codes, names = pd.factorize(keys)
+    n_years = len(years)
+    columns = [col for col in weights if col in earnings.columns]
+
+    per_year = np.bincount(name_codes.astype('int64') * n_years + year_codes, minlength=len(names) * n_years)
+    shared = per_year.reshape(len(names), n_years).max(axis=1) > 1
+    ids = np.empty(len(keys), dtype='int64')
+
+    # Unambiguous names: each name's rows in year order, a new person wherever nothing agrees
+    rows = np.flatnonzero(~shared[name_codes])
+    rows = rows[np.lexsort((year_codes[rows], name_codes[rows]))]
+    starts = np.ones(len(rows), dtype=bool)
+    if len(rows) > 1:
+        same_name = name_codes[rows[1:]] == name_codes[rows[:-1]]
+        score = np.zeros(len(rows) - 1, dtype='int64')
+        for col in columns:
+            codes = _field_codes(earnings[col], col)[rows]
+            score += weights[col] * ((codes[1:] == codes[:-1]) & (codes[1:] >= 0))
+        starts[1:] = ~same_name | (score == 0)
+    ids[rows] = np.cumsum(starts) - 1
+    employee_names = list(names[name_codes[rows[starts]]])
+
+    rows = np.flatnonzero(shared[name_codes])
+    if len(rows):
+        fields = {col: earnings[col].iloc[rows].to_numpy(dtype=object) for col in columns}
+        if 'POSTAL' in fields:
+            fields['POSTAL'] = postal_key(fields['POSTAL'])
+        linked, employee_names = _link_shared(names[name_codes[rows]], year_codes[rows], fields,
+                                              {col: weights[col] for col in columns}, employee_names)
+        ids[rows] = linked
+
+    return EmployeeIndex(ids.astype('int32'), year_codes.astype('int16'), years, employee_names)
+
+
+def _field_codes(values, col):
+    # Integer code per row of a linking field, -1 where missing; POSTAL compared by its ZIP code
+    codes, uniques = pd.factorize(values)
+    if col == 'POSTAL':
+        # Spellings without digits are coded -1 too, and the trailing -1 keeps missing rows missing
+        zips = pd.factorize(postal_key(np.asarray(uniques, dtype=object)))[0]
+        codes = np.append(zips, -1)[codes]
+    return codes
+
+
+def _link_shared(names, year_codes, fields, weights, employee_names):
+    # Only the few thousand rows of shared names get here, so plain Python is fine
+    ids = np.empty(len(names), dtype='int64')
+    latest = {}  # name -> [(employee, row of their latest year)]
+    codes = pd.factorize(names)[0]
+    # Year by year, the rows of each name together, in their original order
+    order = np.lexsort((np.arange(len(names)), codes, year_codes))
+    bounds = np.flatnonzero(np.diff(codes[order]) | np.diff(year_codes[order])) + 1
+    for group in np.split(order, bounds):
+        people = latest.setdefault(names[group[0]], [])
+        pairs = []
+        for row in group:
+            for slot, (employee, last) in enumerate(people):
+                score = sum(weight for col, weight in weights.items()
+                            if not pd.isna(fields[col][row]) and fields[col][row] == fields[col][last])
+                if score:
+                    pairs.append((-score, row, slot))
+        claimed, done = set(), {}
+        for _, row, slot in sorted(pairs):
+            if row not in done and slot not in claimed:
+                done[row] = slot
+                claimed.add(slot)
+        for row in group:
+            if row in done:
+                employee = people[done[row]][0]
+                people[done[row]] = (employee, row)
+            else:
+                employee = len(employee_names)
+                employee_names.append(names[row])
+                people.append((employee, row))
+            ids[row] = employee
+    return ids, employee_names
+
+
+# Share of a department's employees with injury pay each year, and how many of them had it before (q2_4)
+def injury_prevalence(earnings, index, department='POLICE') -> pd.DataFrame:
+    """
+    earnings: pd.DataFrame: The frame `index` was built from.
+    index: EmployeeIndex: Result of build_employee_index.
+    department: str: Employees whose DEPARTMENT_NAME contains this (any case) are counted.
+
+    Returns YEAR, EMPLOYEES (with a gross pay), INJURED (INJURED above zero; the 2011-2013 files
+    write $0.00 for none), INJURED_PERCENTAGE, REPEAT (injured in the year before too) and
+    RETURNING (injured in any earlier year).
+    """
+    member = earnings['DEPARTMENT_NAME'].astype(str).str.upper().str.contains(department.upper(), regex=False)
+    member = member.to_numpy() & earnings['TOTAL_GROSS'].notna().to_numpy()
+    injured = member & (earnings['INJURED'].fillna(0).to_numpy() > 0)
+
+    flags = index.matrix(injured, fill=0) > 0
+    before = np.zeros_like(flags)
+    before[:, 1:] = np.logical_or.accumulate(flags, axis=1)[:, :-1]
+    previous = np.zeros_like(flags)
+    previous[:, 1:] = flags[:, :-1]
+
+    table = pd.DataFrame({
+        'YEAR': index.years,
+        'EMPLOYEES': index.counts(member),
+        'INJURED': flags.sum(axis=0),
+        'REPEAT': (flags & previous).sum(axis=0),
+        'RETURNING': (flags & before).sum(axis=0),
+    })
+    table['INJURED_PERCENTAGE'] = table['INJURED'] / table['EMPLOYEES'].where(table['EMPLOYEES'] != 0) * 100
+    return table[['YEAR', 'EMPLOYEES', 'INJURED', 'INJURED_PERCENTAGE', 'REPEAT', 'RETURNING']]
+
+
+# Year-over-year pay change of the employees on the payroll in both years (q2_4)
+def pay_growth(earnings, index, column='TOTAL_GROSS', department=None) -> pd.DataFrame:
+    """
+    earnings: pd.DataFrame: The frame `index` was built from.
+    index: EmployeeIndex: Result of build_employee_index.
+    column: str: Pay component compared.
+    department: str: Only employees whose DEPARTMENT_NAME contains this (any case) in both years. None
+        uses everyone.
+
+    Returns YEAR, EMPLOYEES (in both the year and the one before, with positive pay the year before),
+    MEDIAN_GROWTH and MEAN_GROWTH (percent).
+    """
+    values = earnings[column].to_numpy(dtype='float64')
+    if department is not None:
+        member = earnings['DEPARTMENT_NAME'].astype(str).str.upper().str.contains(department.upper(), regex=False)
+        values = np.where(member.to_numpy(), values, np.nan)
+    pay = index.matrix(values)
+    last, this = pay[:, :-1], pay[:, 1:]
+    both = ~np.isnan(last) & ~np.isnan(this) & (last > 0)
+    growth = np.where(both, (this - np.where(both, last, 1)) / np.where(both, last, 1) * 100, np.nan)
+
+    with warnings.catch_warnings():
+        # Years nobody is in both of are NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(growth, axis=0)
+        mean = np.nanmean(growth, axis=0)
+    return pd.DataFrame({'YEAR': index.years[1:], 'EMPLOYEES': both.sum(axis=0), 'MEDIAN_GROWTH': median,
+                         'MEAN_GROWTH': mean})
@@ -0,0 +1,168 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profilers currently collecting; stages are recorded into every one of them
+_active = []
+_lock = threading.Lock()
+
+
+class Profiler:
+    """
+    Collects one record per pipeline stage while active (see profile). Each record is a dict with
+    name, start and seconds (time.perf_counter based), rows, bytes, cache_hit, memory, pid, thread and
+    args (stage specific, e.g. year and path). Memory is in MB:
+    - process_max_rss_mb: peak resident memory of the process over its whole life up to the end of
+      the stage (ru_maxrss), not the stage's own peak
+    - rss_start_mb, rss_delta_mb: resident memory when the stage started and how much it grew (or
+      shrank) by the end; stages running at the same time in other threads count too. None where
+      /proc is not available
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = []
+        self.start = time.perf_counter()
+
+    def add(self, record):
+        with _lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def totals(self) -> dict:
+        """Per stage name: count, seconds, rows, bytes and cache hits summed over its records."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0,
+                                                       'cache_hits': 0})
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            total['rows'] += record['rows'] or 0
+            total['bytes'] += record['bytes'] or 0
+            total['cache_hits'] += bool(record['cache_hit'])
+        return totals
+
+    def to_json(self, path=None) -> dict:
+        """Records (start relative to the profiler's start) and totals; written to path when given."""
+        document = {
+            'stages': [{**record, 'start': record['start'] - self.start} for record in self.records],
+            'totals': self.totals(),
+            'process_max_rss_mb': _max_rss_mb(),
+        }
+        if path:
+            with open(path, 'w') as f:
+                json.dump(document, f, indent=2, default=str)
+        return document
+
+    def to_chrome_trace(self, path=None) -> dict:
+        """Trace Event Format, for chrome://tracing or ui.perfetto.dev; written to path when given."""
+        events = []
+        for record in self.records:
+            args = {key: record[key] for key in ('rows', 'bytes', 'cache_hit', 'process_max_rss_mb', 'rss_delta_mb')
+                    if record[key] is not None}
+            events.append({
+                'name': record['name'],
+                'cat': 'pipeline',
+                'ph': 'X',
+                'ts': (record['start'] - self.start) * 1e6,
+                'dur': record['seconds'] * 1e6,
+                'pid': record['pid'],
+                'tid': record['thread'],
+                'args': {**record['args'], **args},
+            })
+        document = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if path:
+            with open(path, 'w') as f:
+                json.dump(document, f, default=str)
+        return document
+
+
+# Collect stage timings of everything run inside the block
+@contextlib.contextmanager
+def profile(callback=None):
+    """
+    callback: callable: Called with each stage record as soon as the stage ends.
+
+    Yields the Profiler. Stages run in thread pools are recorded too, and read_data's process pool
+    workers send their records back with their results.
+    """
+    profiler = Profiler(callback)
+    with _lock:
+        _active.append(profiler)
+    try:
+        yield profiler
+    finally:
+        with _lock:
+            _active.remove(profiler)
+
+
+# Time a stage of the pipeline; fill in rows, bytes or cache_hit on the yielded record
+@contextlib.contextmanager
+def stage(name, **args):
+    """
+    name: str: Stage name, e.g. 'read_data' or 'forecast'.
+    args: Details stored with the record (year, path, department, ...).
+
+    Does nothing beyond filling a throwaway dict when no profiler is active.
+    """
+    record = new_record(name, **args)
+    if not _active:
+        yield record
+        return
+    try:
+        yield record
+    finally:
+        submit(finish(record))
+
+
+# Start a stage record by hand, for code that cannot use the stage context manager (pool workers)
+def new_record(name, **args) -> dict:
+    return {'name': name, 'start': time.perf_counter(), 'seconds': None, 'rows': None, 'bytes': None,
+            'cache_hit': None, 'process_max_rss_mb': None, 'rss_start_mb': _rss_mb() if _active else None,
+            'rss_delta_mb': None,
+            'pid': os.getpid(), 'thread': threading.get_ident(), 'args': args}
+
+
+# Close a stage record started with new_record
+def finish(record) -> dict:
+    record['seconds'] = time.perf_counter() - record['start']
+    record['process_max_rss_mb'] = _max_rss_mb()
+    if record['rss_start_mb'] is not None:
+        record['rss_delta_mb'] = _rss_mb() - record['rss_start_mb']
+    return record
+
+
+# Add a finished record (e.g. one returned by a pool worker) to the active profilers
+def submit(record):
+    for profiler in list(_active):
+        profiler.add(record)
+
+
+# Whether any profiler is collecting
+def active() -> bool:
+    return bool(_active)
+
+
+def _rss_mb():
+    # Current resident memory; /proc/self/statm counts pages
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / 2**20 if os.uname().sysname == 'Darwin' else rss / 2**10
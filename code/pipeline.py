@@ -0,0 +1,397 @@
+"""
+Batch run of the notebook analyses from the command line, without Jupyter.
+
+    python code/pipeline.py                                   # every analysis, CSV tables in ./output
+    python code/pipeline.py --format csv parquet --figures    # Parquet copies and forecast plots too
+    python code/pipeline.py --analyses forecasts --figures html png svg
+    python code/pipeline.py --analyses forecasts --departments "Boston Police Department"
+
+The earnings files are read once, the analyses then run side by side in a thread pool on the loaded
+data, and every table is written as CSV and/or Parquet with a summary.json listing what was written.
+Forecasts are also stored as forecast records (regression.forecast_record), which
+regression.plot_forecast_record draws later without refitting; --figures renders them right away in a
+process pool (regression.export_forecast_figures).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from aggregate import PAY_COLUMNS, aggregate_chunks
+from budget import budget_vs_actual, department_index, load_budget, match_departments
+from cache import ResultCache
+from employees import build_employee_index, injury_prevalence, pay_growth
+from instrument import profile, stage
+from process import EARNINGS_SCHEMA, compact_frame, memory_report, process_hours_columns, read_data
+from regression import batch_forecast, export_forecast_figures, run_overtime_forecast
+from workbook import list_workbooks, read_sheet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+YEARS = list(range(2011, 2025))
+ENCODING = 'ISO-8859-1'
+BUDGET_FILE = os.path.join('budget', 'fy25-adopted-operating-budget.csv')
+BUDGET_COLUMNS = ['FY22 Actual Expense', 'FY23 Actual Expense', 'FY24 Appropriation', 'FY25 Budget']
+# Header of the hours column in the Overtime *_Details.xlsx workbooks, and its one-line spelling
+HOURS_COLUMNS = ['Hours\nWorked', 'Hours Worked']
+
+
+# Yearly totals, counts and means of every pay component per department (q1, q3_5)
+def department_pay(data, options) -> dict:
+    table = data['cube'].copy()
+    table.columns = [f"{col}_{stat.upper()}" for col, stat in table.columns]
+    return {'department_pay': table.reset_index()}
+
+
+# Top departments of every year by total gross pay (q1) and by overtime pay (q3_5)
+def top_departments(data, options) -> dict:
+    sums = _department_sums(data['cube'])
+    return {
+        'top_gross': _top(sums, 'TOTAL_GROSS', 10),
+        'top_overtime': _top(sums, 'OVERTIME', options['top_overtime']),
+    }
+
+
+# Police against everyone else: average gross pay, injury pay and BPD overtime by postal code (q1, q2_4)
+def police_pay(data, options) -> dict:
+    earnings = data['earnings'].dropna(subset=['TOTAL_GROSS'])
+    police = earnings['DEPARTMENT_NAME'].astype(str).str.upper().str.contains('POLICE', regex=False).to_numpy()
+    averages = pd.DataFrame({
+        'BPD_AVG_GROSS': earnings[police].groupby('YEAR')['TOTAL_GROSS'].mean(),
+        'NON_BPD_AVG_GROSS': earnings[~police].groupby('YEAR')['TOTAL_GROSS'].mean(),
+    }).rename_axis('YEAR').reset_index()
+
+    bpd = earnings[police]
+    injured = bpd.dropna(subset=['INJURED'])
+    # Rows with no gross pay have no meaningful share
+    ratio = injured['INJURED'] / injured['TOTAL_GROSS'].where(injured['TOTAL_GROSS'] != 0)
+    injury = pd.DataFrame({
+        'INJURED_RATIO': ratio.groupby(injured['YEAR']).mean(),
+        'INJURED_COUNT': injured.groupby('YEAR').size(),
+        'COUNT': bpd.groupby('YEAR')['TOTAL_GROSS'].count(),
+    }).rename_axis('YEAR')
+    injury['INJURED_COUNT'] = injury['INJURED_COUNT'].fillna(0).astype('int64')
+    injury['INJURED_PERCENTAGE'] = injury['INJURED_COUNT'] / injury['COUNT'] * 100
+
+    tables = {'police_average_gross': averages, 'police_injury_pay': injury.reset_index()}
+    if 'POSTAL' in earnings.columns and len(bpd):
+        latest = earnings[(earnings['YEAR'] == earnings['YEAR'].max()) &
+                          (earnings['DEPARTMENT_NAME'].astype(str) == 'Boston Police Department').to_numpy()]
+        postal = latest.groupby('POSTAL', observed=True)[['OVERTIME', 'TOTAL_GROSS']].sum().reset_index()
+        postal['OVERTIME_RATIO'] = postal['OVERTIME'] / postal['TOTAL_GROSS'].where(postal['TOTAL_GROSS'] != 0)
+        postal.insert(0, 'YEAR', latest['YEAR'].max())
+        tables['police_postal_overtime'] = postal
+    return tables
+
+
+# Police officers followed across years: injury pay prevalence and repeats, and pay growth of the same people (q2_4)
+def police_employees(data, options) -> dict:
+    index = build_employee_index(data['earnings'])
+    return {
+        'police_injury_prevalence': injury_prevalence(data['earnings'], index, 'POLICE'),
+        'police_pay_growth': pay_growth(data['earnings'], index, 'TOTAL_GROSS', department='POLICE'),
+    }
+
+
+# Overtime forecasts of the departments in the overtime top list every year, or of the ones asked for (q3_5)
+def overtime_forecasts(data, options) -> dict:
+    cube = data['cube']
+    departments = options['departments'] or consistent_departments(cube, 'OVERTIME', options['top_overtime'])
+    records, rows = {}, []
+    for department in departments:
+        results = run_overtime_forecast(department, cube, forecast_years=options['forecast_years'],
+                                        test_degrees=options['degrees'], headless=True,
+                                        cache=options['forecast_cache'])
+        if results is None:
+            print(f"[Error] Department '{department}' not found.")
+            continue
+        record = results['record']
+        records[department] = record
+        band = record['intervals']['bootstrap']
+        for year, value, lower, upper in zip(record['future_years'], record['future_predictions'], band['lower'],
+                                             band['upper']):
+            rows.append({'DEPARTMENT_NAME': department, 'YEAR': year, 'OVERTIME_FORECAST': value,
+                         'LOWER': lower, 'UPPER': upper, 'DEGREE': record['best_degree'],
+                         'EQUATION': record['equation']})
+    columns = ['DEPARTMENT_NAME', 'YEAR', 'OVERTIME_FORECAST', 'LOWER', 'UPPER', 'DEGREE', 'EQUATION']
+    return {'overtime_forecasts': pd.DataFrame(rows, columns=columns), 'forecast_records': records}
+
+
+# Overtime forecasts of every department with bootstrap prediction intervals; with a cache only departments
+# whose yearly totals changed are refitted
+def department_forecasts(data, options) -> dict:
+    table = batch_forecast(data['cube'], forecast_years=options['forecast_years'], test_degrees=options['degrees'],
+                           cache_dir=options['cache_dir'], intervals='bootstrap')
+    return {'department_forecasts': table}
+
+
+# Fiscal-year budget per expense category (q1)
+def budget_by_category(data, options) -> dict:
+    budget = pd.read_csv(os.path.join(options['data_dir'], BUDGET_FILE))
+    budget[BUDGET_COLUMNS] = budget[BUDGET_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    return {'budget_by_category': budget.groupby('Expense Category')[BUDGET_COLUMNS].sum().reset_index()}
+
+
+# Personnel budget against actual and forecast gross pay of every budget department (q1, q3_5)
+def budget_comparison(data, options) -> dict:
+    budget = load_budget(os.path.join(options['data_dir'], BUDGET_FILE))
+    index = department_index(budget['DEPT'].astype(str).unique())
+    forecasts = batch_forecast(data['cube'], forecast_years=options['forecast_years'],
+                               test_degrees=options['degrees'], y_column='TOTAL_GROSS', cache_dir=options['cache_dir'])
+    departments = data['cube'].index.get_level_values(0).unique()
+    matches = pd.DataFrame({'DEPARTMENT_NAME': departments, 'DEPT': match_departments(departments, index).to_numpy()})
+    return {
+        'budget_vs_actual': budget_vs_actual(data['cube'], budget, forecasts, index=index),
+        'budget_department_matches': matches,
+    }
+
+
+# Overtime hours per year from the Overtime *_Details.xlsx workbooks (q3_5)
+def overtime_hours(data, options) -> dict:
+    folder = os.path.join(options['data_dir'], 'Overtime')
+    paths = [path for path in list_workbooks(folder, '*_Details.xlsx') if re.match(r'\d{4}_', os.path.basename(path))] \
+        if os.path.isdir(folder) else []
+    frames = process_hours_columns([read_sheet(path, cache_dir=options['cache_dir']) for path in paths],
+                                   HOURS_COLUMNS)
+    rows = []
+    for path, df in zip(paths, frames):
+        col = next((col for col in HOURS_COLUMNS if col in df.columns), None)
+        hours = df[col] if col else pd.Series(dtype='float64')
+        rows.append({'YEAR': int(os.path.basename(path)[:4]), 'ROWS': len(df), 'ENTRIES': int(hours.count()),
+                     'HOURS_WORKED': hours.sum(), 'AVG_HOURS': hours.mean()})
+    return {'overtime_hours': pd.DataFrame(rows, columns=['YEAR', 'ROWS', 'ENTRIES', 'HOURS_WORKED', 'AVG_HOURS'])}
+
+
+# Analyses by name, in output order; all but budget and hours work on the loaded earnings data
+ANALYSES = {
+    'department_pay': department_pay,
+    'top_departments': top_departments,
+    'police_pay': police_pay,
+    'police_employees': police_employees,
+    'forecasts': overtime_forecasts,
+    'department_forecasts': department_forecasts,
+    'budget': budget_by_category,
+    'budget_vs_actual': budget_comparison,
+    'hours': overtime_hours,
+}
+EARNINGS_ANALYSES = {'department_pay', 'top_departments', 'police_pay', 'police_employees', 'forecasts',
+                     'department_forecasts', 'budget_vs_actual'}
+
+
+# Departments that make the top list of a pay column in every year of the cube
+def consistent_departments(cube, column='OVERTIME', n=5) -> list:
+    """
+    cube: pd.DataFrame: Result of aggregate.build_cube or load_cube.
+    column: str: Pay column to rank by (its yearly sum).
+    n: int: Size of the yearly top list.
+
+    Returns the department names ordered by their total over all years, largest first.
+    """
+    sums = _department_sums(cube)
+    top = _top(sums, column, n)
+    years = top['YEAR'].nunique()
+    counts = top.groupby('DEPARTMENT_NAME').size()
+    common = counts[counts == years].index
+    totals = sums.groupby(level='DEPARTMENT_NAME')[column].sum()
+    return totals[common].sort_values(ascending=False).index.tolist()
+
+
+# Read and clean the yearly earnings files once, and build the department x year cube from them
+def load_earnings(data_dir, years=YEARS, workers=None, cache_dir=None, float_dtype='float64') -> dict:
+    """
+    data_dir: str: Folder holding earning/<year>_earnings.csv.
+    years: list: Years to read.
+    workers, cache_dir: Same as process.read_data.
+    float_dtype: str: Dtype of the pay columns of 'earnings', see process.compact_frame.
+
+    Returns {'earnings': every row of every year in one compacted DataFrame (process.compact_frame),
+    'cube': aggregate cube, 'memory': process.memory_report of the yearly frames against 'earnings'}.
+    """
+    dfs = read_data(os.path.join(data_dir, 'earning'), 'earnings.csv', years, ENCODING, PAY_COLUMNS, ['_ID'],
+                    workers=workers, cache_dir=cache_dir, schema=EARNINGS_SCHEMA)
+    if not dfs:
+        raise FileNotFoundError(f"No earnings files for {list(years)} in {os.path.join(data_dir, 'earning')}")
+    cube = aggregate_chunks(dfs)
+    earnings = compact_frame(dfs, float_dtype)
+    return {'earnings': earnings, 'cube': cube, 'memory': memory_report(dfs, earnings)}
+
+
+# Run the analyses and write their tables, forecast records and summary to the output folder
+def run_pipeline(data_dir=os.path.join(ROOT, 'data'), output=os.path.join(ROOT, 'output'), analyses=None,
+                 years=YEARS, formats=('csv',), workers=None, cache_dir=None, forecast_years=2,
+                 degrees=(2, 3, 4), departments=None, top_overtime=5, figures=False,
+                 figure_formats=('html',), float_dtype='float64') -> dict:
+    """
+    data_dir: str: Folder holding earning/, budget/ and Overtime/.
+    output: str: Folder for the results; created if missing.
+    analyses: list: Names from ANALYSES. None runs all of them.
+    years: list: Years of earnings data to read.
+    formats: list: Table formats, 'csv' and/or 'parquet'. Forecast records are always JSON.
+    workers: int: Analyses run at the same time; also passed to read_data. None uses one per CPU.
+    cache_dir: str: Cache folder for read_data, the workbooks and department_forecasts; with it a run
+        after a new year file was published only parses and refits what that year changed.
+    forecast_years, degrees: Forecast horizon and candidate degrees, as in run_overtime_forecast.
+    departments: list: Departments to forecast. None forecasts those in the overtime top list every year.
+    top_overtime: int: Size of the yearly overtime top list.
+    figures: bool: Also plot every forecast to output/figures.
+    figure_formats: list: 'html', 'png' and/or 'svg', see regression.export_forecast_figures.
+    float_dtype: str: 'float32' keeps the earnings pay columns in half the memory, see process.compact_frame.
+
+    Returns the summary also written to output/summary.json. A failing analysis is reported there
+    and printed; the others still run.
+    """
+    analyses = list(ANALYSES) if analyses is None else list(analyses)
+    unknown = [name for name in analyses if name not in ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses {unknown}; choose from {list(ANALYSES)}")
+    workers = workers or os.cpu_count() or 1
+    options = {'data_dir': data_dir, 'cache_dir': cache_dir, 'forecast_years': forecast_years,
+               'degrees': list(degrees), 'departments': departments, 'top_overtime': top_overtime,
+               'forecast_cache': ResultCache(cache_dir=cache_dir, name='forecast') if cache_dir else None}
+    os.makedirs(output, exist_ok=True)
+    summary = {'years': list(years), 'analyses': {}, 'errors': {}, 'outputs': {}, 'figures': []}
+
+    start = time.perf_counter()
+    data, records = {}, {}
+    if EARNINGS_ANALYSES.intersection(analyses):
+        data = load_earnings(data_dir, years, workers, cache_dir, float_dtype)
+        summary['rows'] = len(data['earnings'])
+        total = data['memory'].iloc[-1]
+        summary['earnings_memory_mb'] = {'before': round(float(total['BEFORE_MB']), 2),
+                                         'after': round(float(total['AFTER_MB']), 2)}
+    summary['load_seconds'] = time.perf_counter() - start
+
+    # The analyses only read the loaded data, so they can share it from threads
+    with ThreadPoolExecutor(max_workers=min(workers, len(analyses)) or 1) as executor:
+        futures = {name: executor.submit(_run_analysis, name, data, options) for name in analyses}
+        for name, future in futures.items():
+            outputs, seconds, error = future.result()
+            summary['analyses'][name] = {'seconds': seconds, 'outputs': sorted(outputs)}
+            if error:
+                print(f"[Error] Analysis '{name}' failed: {error}")
+                summary['errors'][name] = error
+            summary['outputs'].update(write_outputs(outputs, output, formats))
+            records.update(outputs.get('forecast_records', {}))
+
+    # Rendered once the thread pool is done, so no figure process is forked while analyses run
+    if figures and records:
+        summary['figures'] = write_forecast_figures(records, os.path.join(output, 'figures'), figure_formats, workers)
+
+    summary['seconds'] = time.perf_counter() - start
+    with open(os.path.join(output, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+# Write DataFrames as tables in each format and everything else as JSON
+def write_outputs(outputs, folder, formats=('csv',)) -> dict:
+    """
+    outputs: dict: {name: DataFrame or JSON-serializable value}.
+    folder: str: Output folder.
+    formats: list: 'csv' and/or 'parquet'.
+
+    Returns {name: [paths written]}.
+    """
+    unknown = set(formats) - {'csv', 'parquet'}
+    if unknown:
+        raise ValueError(f"Unknown table formats {sorted(unknown)}; use 'csv' or 'parquet'")
+    written = {}
+    for name, value in outputs.items():
+        if isinstance(value, pd.DataFrame):
+            paths = [os.path.join(folder, f"{name}.{fmt}") for fmt in formats]
+            for path, fmt in zip(paths, formats):
+                if fmt == 'csv':
+                    value.to_csv(path, index=False)
+                else:
+                    value.to_parquet(path, index=False)
+        else:
+            paths = [os.path.join(folder, f"{name}.json")]
+            with open(paths[0], 'w') as f:
+                # Strict JSON: a NaN or inf that got this far is a bug, not something to write
+                json.dump(value, f, indent=2, allow_nan=False)
+        written[name] = paths
+    return written
+
+
+# Plot of every forecast record, drawn from the record without refitting
+def write_forecast_figures(records, folder, formats=('html',), workers=None) -> list:
+    """
+    records: dict: {department: forecast record}, as in forecast_records.json.
+    folder: str: Output folder; created if missing.
+    formats: list: 'html', 'png' and/or 'svg'.
+    workers: int: Rendering processes. None uses one per CPU.
+
+    Returns the paths written, not counting the plotly.min.js the HTML files share.
+    """
+    written = export_forecast_figures(records, folder, formats, workers, y_label='Overtime Pay',
+                                      title="Overtime Pay for {name} ({first}–{last})")
+    return [path for paths in written.values() for path in paths]
+
+
+def _run_analysis(name, data, options):
+    start = time.perf_counter()
+    with stage('analysis', analysis=name):
+        try:
+            return ANALYSES[name](data, options), time.perf_counter() - start, None
+        except Exception as e:
+            return {}, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def _department_sums(cube):
+    return pd.DataFrame({col: cube[(col, 'sum')] for col in ('TOTAL_GROSS', 'OVERTIME')
+                         if (col, 'sum') in cube.columns})
+
+
+def _top(sums, column, n):
+    top = sums.sort_values(column, ascending=False, kind='stable').groupby(level='YEAR', sort=True).head(n)
+    top = top.reset_index().sort_values(['YEAR', column], ascending=[True, False], kind='stable')
+    top.insert(1, 'RANK', top.groupby('YEAR').cumcount().to_numpy() + 1)
+    return top[['YEAR', 'RANK', 'DEPARTMENT_NAME'] + list(sums.columns)].reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--output', default=os.path.join(ROOT, 'output'))
+    parser.add_argument('--analyses', nargs='+', choices=list(ANALYSES), help='default: all of them')
+    parser.add_argument('--years', type=int, nargs='+', default=YEARS)
+    parser.add_argument('--format', dest='formats', nargs='+', choices=['csv', 'parquet'], default=['csv'])
+    parser.add_argument('--workers', type=int, help='default: one per CPU')
+    parser.add_argument('--cache-dir', default=os.path.join(ROOT, 'cache'),
+                        help='cleaned data kept between runs (default: ./cache)')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--forecast-years', type=int, default=2)
+    parser.add_argument('--degrees', type=int, nargs='+', default=[2, 3, 4])
+    parser.add_argument('--departments', nargs='+', help='default: the overtime top 5 of every year')
+    parser.add_argument('--figures', nargs='*', choices=['html', 'png', 'svg'],
+                        help='plot the forecasts to output/figures (default format: html)')
+    parser.add_argument('--float32', action='store_true',
+                        help='keep the earnings pay columns as float32 (half the memory, cents rounded above $100k)')
+    parser.add_argument('--profile', action='store_true', help='write stage timings (profile.json, trace.json)')
+    args = parser.parse_args(argv)
+
+    kwargs = dict(data_dir=args.data_dir, output=args.output, analyses=args.analyses, years=args.years,
+                  formats=args.formats, workers=args.workers, cache_dir=None if args.no_cache else args.cache_dir,
+                  forecast_years=args.forecast_years, degrees=args.degrees, departments=args.departments,
+                  figures=args.figures is not None, figure_formats=args.figures or ['html'],
+                  float_dtype='float32' if args.float32 else 'float64')
+    if args.profile:
+        with profile() as profiler:
+            summary = run_pipeline(**kwargs)
+        profiler.to_json(os.path.join(args.output, 'profile.json'))
+        profiler.to_chrome_trace(os.path.join(args.output, 'trace.json'))
+    else:
+        summary = run_pipeline(**kwargs)
+
+    written = sum(len(paths) for paths in summary['outputs'].values()) + len(summary['figures'])
+    print(f"\nWrote {written} files to {args.output} "
+          f"in {summary['seconds']:.1f}s")
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
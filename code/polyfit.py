@@ -0,0 +1,423 @@
+import numpy as np
+from numpy.polynomial import polynomial as P
+
+
+def axis_transform(x):
+    """
+    Center and scale of the fitting axis t = (x - center) / scale, which maps x onto [-1, 1].
+    """
+    x = np.asarray(x, dtype=float)
+    center = (x.max() + x.min()) / 2
+    scale = (x.max() - x.min()) / 2
+    return center, scale if scale > 0 else 1.0
+
+
+def vandermonde(x, degree, center, scale):
+    """
+    Design matrix [1, t, t^2, ..., t^degree] on the centered and scaled axis.
+    """
+    t = (np.asarray(x, dtype=float) - center) / scale
+    return np.vander(t, degree + 1, increasing=True)
+
+
+def to_raw_coefficients(coef, center, scale):
+    """
+    Turn coefficients of t = (x - center) / scale (lowest power first) into coefficients of x.
+    """
+    coef = np.asarray(coef, dtype=float)
+    # Horner's scheme in polynomial arithmetic: ((c_d t + c_(d-1)) t + ...) with t = (x - center) / scale
+    shift = np.array([-center / scale, 1 / scale])
+    raw = coef[-1:]
+    for c in coef[-2::-1]:
+        raw = P.polyadd(P.polymul(raw, shift), [c])
+    return np.pad(raw, (0, len(coef) - len(raw)))
+
+
+def fit_polynomials(x, Y, degrees, forecast_x=(), basis='scaled'):
+    """
+    Least-squares polynomial fits of every degree in `degrees` for one or many series sharing x.
+
+    Parameters:
+    -----------
+    x : array-like, shape (n,)
+        The years (x values) shared by all series
+    Y : array-like, shape (n,) or (n, m)
+        One series per column
+    degrees : list
+        Polynomial degrees to fit
+    forecast_x : array-like
+        x values to predict after fitting
+    basis : str, default='scaled'
+        'scaled' fits on t = (x - center) / scale, which maps x onto [-1, 1]; 'raw' fits on x itself
+        (center 0, scale 1), which for years is badly conditioned and only kept for comparison
+
+    Returns:
+    --------
+    dict
+        - 'center', 'scale': The axis transform t = (x - center) / scale
+        - 'coef': {degree: coefficients on t, lowest power first, shape (degree + 1, m)}
+        - 'fitted': {degree: in-sample predictions, shape (n, m)}
+        - 'forecast': {degree: predictions at forecast_x, shape (len(forecast_x), m)}
+        - 'mse', 'r2': {degree: array of shape (m,)}, r2 follows sklearn's r2_score
+        - 'condition_number': {degree: 2-norm condition number of that degree's design matrix}
+
+    One QR factorization of the highest-degree design matrix is shared by every degree: the leading
+    columns of Q and R are the factorization of each lower degree, and every series is solved in the
+    same matrix product.
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    single = Y.ndim == 1
+    if single:
+        Y = Y[:, None]
+    n = len(x)
+    if basis == 'scaled':
+        center, scale = axis_transform(x)
+    elif basis == 'raw':
+        center, scale = 0.0, 1.0
+    else:
+        raise ValueError(f"Unknown basis '{basis}', expected 'scaled' or 'raw'")
+    max_degree = max(degrees)
+
+    V = vandermonde(x, max_degree, center, scale)
+    V_future = vandermonde(forecast_x, max_degree, center, scale)
+    Q, R = np.linalg.qr(V)
+    QtY = Q.T @ Y
+
+    residual_ss_total = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    exact_tol = n * (1e-10 * np.abs(Y).max(axis=0, initial=0.0)) ** 2
+    result = {'center': center, 'scale': scale, 'coef': {}, 'fitted': {}, 'forecast': {}, 'mse': {}, 'r2': {},
+              'condition_number': {}}
+    for degree in degrees:
+        k = degree + 1
+        if k <= n and _full_rank(V, R, k):
+            coef = np.linalg.solve(R[:k, :k], QtY[:k])
+            # Q has orthonormal columns, so R's leading block has the design matrix's condition number
+            result['condition_number'][degree] = float(np.linalg.cond(R[:k, :k]))
+        else:
+            result['condition_number'][degree] = float(np.linalg.cond(V[:, :k]))
+            # More coefficients than distinct points (e.g. a repeated year): minimum-norm least squares
+            coef = np.linalg.lstsq(V[:, :k], Y, rcond=None)[0]
+        fitted = V[:, :k] @ coef
+        residual_ss = ((Y - fitted) ** 2).sum(axis=0)
+
+        # A constant series scores 1.0 when fitted exactly (up to rounding) and 0.0 otherwise
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r2 = np.where(residual_ss_total > 0, 1 - residual_ss / residual_ss_total,
+                          np.where(residual_ss > exact_tol, 0.0, 1.0))
+
+        result['coef'][degree] = coef
+        result['fitted'][degree] = fitted
+        result['forecast'][degree] = V_future[:, :k] @ coef
+        result['mse'][degree] = residual_ss / n
+        result['r2'][degree] = r2
+
+    if single:
+        for name in ('coef', 'fitted', 'forecast', 'mse', 'r2'):
+            result[name] = {degree: value[..., 0] for degree, value in result[name].items()}
+    return result
+
+
+class PolynomialFit:
+    """
+    A fitted polynomial on the centered and scaled axis; predict_x evaluates it at years. coef_ and
+    intercept_ keep the layout of the sklearn LinearRegression over PolynomialFeatures it replaced.
+    """
+
+    def __init__(self, coef, center, scale):
+        self.coef = np.asarray(coef, dtype=float)
+        self.center = center
+        self.scale = scale
+
+    @property
+    def degree(self):
+        return len(self.coef) - 1
+
+    def predict_x(self, x):
+        """Predict at raw x values (e.g. years)."""
+        return P.polyval((np.asarray(x, dtype=float) - self.center) / self.scale, self.coef)
+
+    @property
+    def raw_coef(self):
+        """Coefficients of raw x, lowest power first."""
+        return to_raw_coefficients(self.coef, self.center, self.scale)
+
+    def coefficients(self):
+        """Coefficients in both bases, lowest power first, plus the axis transform between them."""
+        return {
+            'scaled': self.coef.tolist(),
+            'raw': self.raw_coef.tolist(),
+            'center': float(self.center),
+            'scale': float(self.scale)
+        }
+
+    def equation(self, basis='raw'):
+        """
+        The polynomial as text; 'raw' is in x (years) as polynomial_regression_forecast always printed it,
+        'scaled' is in t = (x - center) / scale with coefficients that round-trip exactly.
+        """
+        if basis == 'raw':
+            coef = self.raw_coef
+            equation = f"y = {coef[0]:.2e}"
+            for i, c in enumerate(coef[1:], 1):
+                equation += f" + {c:.2e}x^{i}"
+            return equation
+        coef = self.coef.tolist()
+        equation = f"y = {coef[0]!r}"
+        for i, c in enumerate(coef[1:], 1):
+            equation += f" + {c!r}t^{i}"
+        return equation + f", t = (x - {float(self.center)!r}) / {float(self.scale)!r}"
+
+    @property
+    def coef_(self):
+        # Same layout as LinearRegression on PolynomialFeatures: 0 for the bias column
+        return np.concatenate([[0.0], self.raw_coef[1:]])
+
+    @property
+    def intercept_(self):
+        return self.raw_coef[0]
+
+
+def prediction_intervals(x, Y, degrees, forecast_x, level=0.95, method='analytic', n_boot=2000, seed=0,
+                         basis='scaled'):
+    """
+    Prediction intervals of every degree's forecasts at forecast_x, for one or many series sharing x.
+
+    Parameters:
+    -----------
+    x : array-like, shape (n,)
+        The years (x values) shared by all series
+    Y : array-like, shape (n,) or (n, m)
+        One series per column
+    degrees : list
+        Polynomial degrees to fit
+    forecast_x : array-like, shape (h,)
+        x values the intervals are for
+    level : float, default=0.95
+        Probability that a new value falls inside its interval
+    method : str, default='analytic'
+        'analytic' is the least-squares interval with Student-t quantiles, which assumes normal
+        errors; 'bootstrap' resamples the leverage-adjusted residuals n_boot times instead
+    n_boot : int, default=2000
+        Number of bootstrap resamples
+    seed : int, default=0
+        Seed of the resampling, so that the same series always gets the same interval
+    basis : str, default='scaled'
+        Fitting axis, see fit_polynomials
+
+    Returns:
+    --------
+    dict
+        - 'level', 'method': The arguments used
+        - 'lower', 'upper': {degree: interval bounds, shape (h, m)}, NaN for degrees with no
+          residual degrees of freedom (degree + 1 >= n)
+
+    Every resample of every series is refitted in one matrix product: the forecast of a least-squares
+    fit is linear in the values, so a resample's forecast error is G @ residuals with
+    G = V_future R^-1 Q^T shared by all of them.
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    single = Y.ndim == 1
+    if single:
+        Y = Y[:, None]
+    n, m = Y.shape
+    if basis == 'scaled':
+        center, scale = axis_transform(x)
+    elif basis == 'raw':
+        center, scale = 0.0, 1.0
+    else:
+        raise ValueError(f"Unknown basis '{basis}', expected 'scaled' or 'raw'")
+    if method not in ('analytic', 'bootstrap'):
+        raise ValueError(f"Unknown method '{method}', expected 'analytic' or 'bootstrap'")
+    alpha = 1 - level
+
+    V = vandermonde(x, max(degrees), center, scale)
+    V_future = vandermonde(forecast_x, max(degrees), center, scale)
+    Q, R = np.linalg.qr(V)
+    h = len(V_future)
+    if method == 'bootstrap':
+        rng = np.random.default_rng(seed)
+        # The same draws serve every degree and series; each interval only depends on its own draws
+        draws = rng.integers(0, n, size=(n, n_boot))
+        future_draws = rng.integers(0, n, size=(h, n_boot))
+
+    result = {'level': level, 'method': method, 'lower': {}, 'upper': {}}
+    for degree in degrees:
+        k = degree + 1
+        if k >= n or not _full_rank(V, R, k):
+            result['lower'][degree] = result['upper'][degree] = np.full((h, m), np.nan)
+            continue
+        Qk, Rk = Q[:, :k], R[:k, :k]
+        forecast = V_future[:, :k] @ np.linalg.solve(Rk, Qk.T @ Y)
+        residual = Y - Qk @ (Qk.T @ Y)
+        if method == 'analytic':
+            from scipy.special import stdtrit
+
+            # Var(new value - forecast) = s^2 (1 + v (V^T V)^-1 v^T), and (V^T V)^-1 = R^-1 R^-T
+            spread = np.sqrt((np.linalg.solve(Rk.T, V_future[:, :k].T) ** 2).sum(axis=0) + 1)
+            s = np.sqrt((residual ** 2).sum(axis=0) / (n - k))
+            half = stdtrit(n - k, 1 - alpha / 2) * spread[:, None] * s[None, :]
+            lower, upper = forecast - half, forecast + half
+        else:
+            # Residuals rescaled by their leverage so they have the spread of the errors, then centered
+            leverage = (Qk ** 2).sum(axis=1)
+            adjusted = residual / np.sqrt(np.maximum(1 - leverage, 1e-10))[:, None]
+            adjusted = adjusted - adjusted.mean(axis=0)
+            G = V_future[:, :k] @ np.linalg.solve(Rk, Qk.T)
+            lower, upper = np.empty((h, m)), np.empty((h, m))
+            # Bounded blocks of series keep the (n, n_boot, series) resamples small
+            step = max(1, 2_000_000 // (n * n_boot))
+            for start in range(0, m, step):
+                block = adjusted[:, start:start + step]
+                resampled = block[draws].reshape(n, -1)
+                # Refitted forecast minus a new value drawn around the original forecast
+                errors = (G @ resampled).reshape(h, n_boot, -1) - block[future_draws]
+                low, high = np.quantile(errors, [alpha / 2, 1 - alpha / 2], axis=1)
+                lower[:, start:start + step] = forecast[:, start:start + step] - high
+                upper[:, start:start + step] = forecast[:, start:start + step] - low
+        result['lower'][degree] = lower
+        result['upper'][degree] = upper
+
+    if single:
+        for name in ('lower', 'upper'):
+            result[name] = {degree: value[..., 0] for degree, value in result[name].items()}
+    return result
+
+
+def cross_validate(x, Y, degrees, method='loo', min_train=None, horizon=1, basis='scaled'):
+    """
+    Out-of-sample prediction errors of every degree in `degrees`, without refitting once per fold.
+
+    Parameters:
+    -----------
+    x : array-like, shape (n,)
+        The years (x values) shared by all series, in time order
+    Y : array-like, shape (n,) or (n, m)
+        One series per column
+    degrees : list
+        Polynomial degrees to score
+    method : str, default='loo'
+        'loo' leaves each point out in turn; 'rolling' fits on the first t points and predicts the
+        point `horizon` steps later, for every origin t from min_train on
+    min_train : int, default=None
+        Smallest training window of the 'rolling' method, max(degrees) + 2 when not given, so every
+        degree is scored on the same folds
+    horizon : int, default=1
+        Steps ahead predicted by the 'rolling' method
+    basis : str, default='scaled'
+        Fitting axis, see fit_polynomials
+
+    Returns:
+    --------
+    dict
+        - 'method': The method used
+        - 'held_out': x value predicted in each fold, shape (n_folds,)
+        - 'errors': {degree: actual minus predicted value per fold, shape (n_folds, m)}
+        - 'cv_mse': {degree: mean squared fold error, shape (m,)}, inf where a degree cannot be
+          scored (too few points for its coefficients)
+
+    Leave-one-out errors come from the PRESS identity e_i / (1 - h_ii), where h_ii is the leverage of
+    point i; rolling-origin errors come from recursive least-squares updates of a single fit on the
+    first window. Both are shared across all series, like the QR in fit_polynomials.
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    single = Y.ndim == 1
+    if single:
+        Y = Y[:, None]
+    n, m = Y.shape
+    if basis == 'scaled':
+        center, scale = axis_transform(x)
+    elif basis == 'raw':
+        center, scale = 0.0, 1.0
+    else:
+        raise ValueError(f"Unknown basis '{basis}', expected 'scaled' or 'raw'")
+    V = vandermonde(x, max(degrees), center, scale)
+
+    if method == 'loo':
+        folds = np.arange(n)
+        Q, R = np.linalg.qr(V)
+    elif method == 'rolling':
+        if min_train is None:
+            min_train = max(degrees) + 2
+        folds = np.arange(min_train + horizon - 1, n)
+    else:
+        raise ValueError(f"Unknown method '{method}', expected 'loo' or 'rolling'")
+
+    result = {'method': method, 'held_out': x[folds], 'errors': {}, 'cv_mse': {}}
+    for degree in degrees:
+        k = degree + 1
+        errors = np.full((len(folds), m), np.nan)
+        if method == 'loo' and k < n and _full_rank(V, R, k):
+            Qk = Q[:, :k]
+            leverage = (Qk ** 2).sum(axis=1)
+            residual = Y - Qk @ (Qk.T @ Y)
+            # A leverage of 1 means the point is interpolated whatever its value: no held-out error
+            valid = 1 - leverage > 1e-10
+            errors[valid] = residual[valid] / (1 - leverage[valid])[:, None]
+        elif method == 'rolling' and len(folds) and k <= min_train:
+            errors = _rolling_errors(V[:, :k], Y, min_train, horizon)
+        result['errors'][degree] = errors
+        with np.errstate(invalid='ignore'):
+            cv_mse = (errors ** 2).mean(axis=0) if len(folds) else np.full(m, np.nan)
+        result['cv_mse'][degree] = np.where(np.isnan(cv_mse), np.inf, cv_mse)
+
+    if single:
+        for name in ('errors', 'cv_mse'):
+            result[name] = {degree: value[..., 0] for degree, value in result[name].items()}
+    return result
+
+
+def _rolling_errors(X, Y, min_train, horizon):
+    # One least-squares fit on the first window, then a rank-one update per added point
+    Q, R = np.linalg.qr(X[:min_train])
+    if not _full_rank(X[:min_train], R, X.shape[1]):
+        return np.full((len(X) - horizon + 1 - min_train, Y.shape[1]), np.nan)
+    coef = np.linalg.solve(R, Q.T @ Y[:min_train])
+    R_inv = np.linalg.inv(R)
+    P = R_inv @ R_inv.T
+    errors = []
+    for t in range(min_train, len(X) - horizon + 1):
+        target = t + horizon - 1
+        errors.append(Y[target] - X[target] @ coef)
+        row = X[t]
+        Pr = P @ row
+        gain = Pr / (1 + row @ Pr)
+        coef = coef + np.outer(gain, Y[t] - row @ coef)
+        P = P - np.outer(gain, Pr)
+    return np.array(errors)
+
+
+def _full_rank(V, R, k):
+    # R's first k columns are usable when each column of V adds something the earlier ones do not; a
+    # repeated year leaves fewer distinct points than coefficients and a (near) zero on R's diagonal
+    norms = np.linalg.norm(V[:, :k], axis=0)
+    return bool((np.abs(np.diag(R)[:k]) > len(V) * np.finfo(float).eps * norms).all())
+
+
+def select_degree(degrees, r2, cv_mse=None, tol=0.0):
+    """
+    Index into `degrees` of the best degree for each series.
+
+    r2 and cv_mse are {degree: value or array of shape (m,)}. Without cv_mse the highest R² wins;
+    with it the lowest cross-validated error wins, the first listed degree breaking ties (errors
+    within `tol` of the lowest, e.g. exact fits that differ only by rounding), and series no degree
+    could be scored on fall back to R².
+    """
+    by_r2 = np.argmax(np.vstack([np.atleast_1d(r2[degree]) for degree in degrees]), axis=0)
+    if cv_mse is None:
+        return by_r2
+    scores = np.vstack([np.atleast_1d(cv_mse[degree]) for degree in degrees])
+    finite = np.isfinite(scores)
+    with np.errstate(invalid='ignore'):
+        lowest = np.where(finite, scores, np.inf).min(axis=0)
+        near = scores <= lowest * (1 + 1e-9) + tol
+    by_cv = np.argmax(near & finite, axis=0)
+    return np.where(finite.any(axis=0), by_cv, by_r2)
+
+
+def rounding_tolerance(Y):
+    """Squared error below which a fit of Y counts as exact, per series."""
+    Y = np.asarray(Y, dtype=float)
+    return (1e-10 * np.abs(Y).max(axis=0, initial=0.0)) ** 2
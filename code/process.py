@@ -1,9 +1,57 @@
 import pandas as pd
 import numpy as np
+import itertools
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache import cache_key, load_cached, store_cached
+from instrument import finish, new_record, stage, submit
+from workbook import read_sheet
+
+# Columns of the yearly earnings files and the dtype each one is read with. Currency columns are read
+# as plain Python strings (no guessing, no Arrow round trip) since clean_currency_column replaces them
+# right away; POSTAL stays a string to keep leading zeros and ZIP+4 suffixes.
+EARNINGS_SCHEMA = {
+    'columns': {
+        '_ID': 'Int64',
+        'NAME': 'str',
+        'DEPARTMENT_NAME': 'category',
+        'TITLE': 'category',
+        'REGULAR': 'object',
+        'RETRO': 'object',
+        'OTHER': 'object',
+        'OVERTIME': 'object',
+        'INJURED': 'object',
+        'DETAIL': 'object',
+        'QUINN_EDUCATION': 'object',
+        'TOTAL_GROSS': 'object',
+        'POSTAL': 'str',
+    },
+    # Header spellings used by other exports of the same report, matched after strip().upper()
+    'aliases': {
+        'ID': '_ID',
+        'DEPARTMENT': 'DEPARTMENT_NAME',
+        'DEPARTMENT NAME': 'DEPARTMENT_NAME',
+        'QUINN/EDUCATION INCENTIVE': 'QUINN_EDUCATION',
+        'QUINN / EDUCATION INCENTIVE': 'QUINN_EDUCATION',
+        'TOTAL EARNINGS': 'TOTAL_GROSS',
+        'TOTAL GROSS': 'TOTAL_GROSS',
+        'ZIP': 'POSTAL',
+        'ZIP CODE': 'POSTAL',
+    },
+    # Per-year header overrides on top of 'aliases', e.g. {2025: {'aliases': {'GROSS': 'TOTAL_GROSS'}}}.
+    # The bundled 2011-2024 files all use the names above in varying order (2011-2013 add _ID).
+    'years': {},
+}
+
+# Text columns that compact_frame stores as categoricals with one dictionary shared by every year
+COMPACT_CATEGORIES = ['NAME', 'DEPARTMENT_NAME', 'TITLE', 'POSTAL']
+
 
 # Function to read data from multiple CSV files
-def read_data(folder_path, file_name, years, encoding, target_col, drop_col, file_type='csv') -> pd.DataFrame:
+def read_data(folder_path, file_name, years, encoding, target_col, drop_col, file_type='csv',
+              workers=None, cache_dir=None, schema=None, chunksize=None, compact=False) -> pd.DataFrame:
     """
     folder_path: str: Path to the folder containing the CSV files.
     file_name: str: Base name of the CSV files (without year).
@@ -11,38 +59,285 @@ def read_data(folder_path, file_name, years, encoding, target_col, drop_col, fil
     encoding: str: Encoding of the CSV files.
     target_col: list: List of columns to clean.
     drop_col: list: List of columns to drop.
+    file_type: str: 'csv' or 'xlsx'. Workbooks are read from their first sheet (workbook.read_sheet).
+    workers: int: Number of years to load at the same time (a thread pool for csv, a process pool
+        for xlsx, whose parsing holds the GIL). None or 1 loads the years one after another.
+    cache_dir: str: Folder for cached cleaned years. A year is only parsed again when its file
+        (path, mtime, size) or the cleaning arguments changed, and a workbook is only converted
+        again when the file changed. None disables the cache.
+    schema: dict: Column schema such as EARNINGS_SCHEMA. Only the schema's columns that are not in
+        drop_col are parsed, with pinned dtypes, and headers are renamed to the schema's names.
+        None reads every column and lets pandas guess the types.
+    chunksize: int: Return a generator of cleaned chunks of at most this many rows instead of a list
+        (see read_data_chunks). workers, cache_dir and compact do not apply in this mode.
+    compact: bool: Return all years as one frame made by compact_frame instead of a list of frames.
+
+    Inside instrument.profile() the call is recorded as a 'read_data' stage and every year as a
+    'read_year' stage (rows, bytes of the file, cache_hit).
     """
+    if chunksize:
+        return read_data_chunks(folder_path, file_name, years, encoding, target_col, drop_col,
+                                chunksize=chunksize, file_type=file_type, schema=schema)
+
+    years = list(years)
     file_paths = [os.path.join(folder_path, f"{year}_{file_name}") for year in years]
+    jobs = [(year, path, encoding, target_col, drop_col, file_type, cache_dir, schema)
+            for year, path in zip(years, file_paths)]
     dfs = []
 
-    for year, path in zip(years, file_paths):
-        if os.path.exists(path):
-            try:
-                if file_type == 'csv':
-                    df = pd.read_csv(path, encoding=encoding)
-                elif file_type == 'xlsx':
-                    df = pd.read_excel(path)
-                df['YEAR'] = year
-                print("Read data from:", path)
-
-                for col in target_col:
-                    if col in df.columns:
-                        df[col] = df[col].apply(clean_currency)
-                    else:
-                        print(f"Warning: Column '{col}' not found in {year} data.")
-
-                if drop_col:
-                    for col in drop_col:
-                        if col in df.columns:
-                            df = df.drop(col, axis=1)
+    with stage('read_data', file_type=file_type, years=len(years), workers=workers) as info:
+        if workers and workers > 1 and len(jobs) > 1:
+            executor_cls = ProcessPoolExecutor if file_type == 'xlsx' else ThreadPoolExecutor
+            with executor_cls(max_workers=min(workers, len(jobs))) as executor:
+                # map() yields in submission order, so the list stays in `years` order
+                results = list(executor.map(_load_year, *zip(*jobs)))
+        else:
+            results = (_load_year(*job) for job in jobs)
 
+        for df, messages, year_info in results:
+            # Pool workers cannot see the caller's profilers, so every year is recorded here
+            submit(year_info)
+            for message in messages:
+                print(message)
+            if df is not None:
                 dfs.append(df)
-            except Exception as e:
-                print(f"Error processing {path}: {e}")
-        else:
-            print(f"File for year {year} does not exist.")
+        info['rows'] = sum(len(df) for df in dfs)
     print("Successfully read data from all files.")
-    return dfs
+    return compact_frame(dfs) if compact else dfs
+
+
+# Generator version of read_data: only one cleaned chunk is held in memory at a time
+def read_data_chunks(folder_path, file_name, years, encoding, target_col, drop_col, chunksize=100_000,
+                     file_type='csv', schema=None, errors='print'):
+    """
+    folder_path, file_name, years, encoding, target_col, drop_col, file_type, schema: Same as read_data.
+    chunksize: int: Maximum number of rows per yielded DataFrame.
+    errors: str: 'print' reports a file that fails to parse and goes on with the next year (its chunks
+        before the error are already yielded); 'raise' raises the error instead.
+
+    Yields cleaned DataFrames with a YEAR column, year by year in `years` order. Excel files cannot be
+    parsed in pieces and are yielded whole. Feed the chunks to aggregate.aggregate_chunks (or any
+    other running aggregate) to keep peak memory flat however many years are read. Under
+    instrument.profile() every chunk is recorded as a 'read_chunk' stage (parse and clean time, rows).
+    """
+    for year in years:
+        path = os.path.join(folder_path, f"{year}_{file_name}")
+        if not os.path.exists(path):
+            print(f"File for year {year} does not exist.")
+            continue
+
+        reader = None
+        try:
+            if file_type == 'csv':
+                read_kwargs, rename = _csv_options(path, year, encoding, drop_col, schema)
+                reader = pd.read_csv(path, chunksize=chunksize, **read_kwargs)
+            elif file_type == 'xlsx':
+                reader, rename = [read_sheet(path)], {}
+            print("Read data from:", path)
+
+            chunks = iter(reader)
+            for i in itertools.count():
+                # Timed by hand: a stage block would also count the time the consumer holds the chunk
+                info = new_record('read_chunk', year=year, path=path, chunk=i)
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                messages = []
+                chunk = _clean_frame(chunk.rename(columns=rename), year, target_col, drop_col, messages)
+                info['rows'] = len(chunk)
+                submit(finish(info))
+                # Warnings are the same for every chunk of a file, report them once
+                if i == 0:
+                    for message in messages:
+                        print(message)
+                yield chunk
+        except Exception as e:
+            if errors == 'raise':
+                raise
+            print(f"Error processing {path}: {e}")
+        finally:
+            if hasattr(reader, 'close'):
+                reader.close()
+
+
+# Concatenate the yearly frames of read_data into one frame that takes little memory
+def compact_frame(dfs, float_dtype='float64', categories=COMPACT_CATEGORIES) -> pd.DataFrame:
+    """
+    dfs: list: Frames of read_data (one per year), or a single DataFrame.
+    float_dtype: str: Dtype of the numeric columns, missing values as NaN. 'float64' keeps every cent;
+        'float32' halves them again but keeps about 7 significant digits (cents are rounded from
+        $100,000 up).
+    categories: list: Text columns stored as categoricals. Each gets one sorted dictionary shared by
+        every year, so a department or title is stored once, not once per row or per year.
+
+    YEAR becomes int16; other columns are concatenated as they are. Columns missing from some years
+    are NaN there. Compare the memory with memory_report.
+    """
+    if isinstance(dfs, pd.DataFrame):
+        dfs = [dfs]
+    columns = list(dict.fromkeys(col for df in dfs for col in df.columns))
+    lengths = [len(df) for df in dfs]
+    compact = {}
+    for col in columns:
+        parts = [df[col] if col in df.columns else pd.Series(np.nan, index=df.index) for df in dfs]
+        if col in categories:
+            # Text in every year, e.g. POSTAL that a year without a schema parsed as int64
+            parts = [_as_text(part, col) for part in parts]
+            # One dictionary of every year's values; each year's codes are taken against it
+            values = [part.cat.categories if isinstance(part.dtype, pd.CategoricalDtype) else part.dropna().unique()
+                      for part in parts]
+            dtype = pd.CategoricalDtype(pd.Index(np.concatenate([np.asarray(v, dtype=object) for v in values]))
+                                        .unique().sort_values())
+            codes = np.concatenate([pd.Categorical(part, dtype=dtype).codes for part in parts])
+            compact[col] = pd.Categorical.from_codes(codes, dtype=dtype)
+        elif col == 'YEAR':
+            compact[col] = np.concatenate([part.to_numpy() for part in parts]).astype('int16')
+        elif all(pd.api.types.is_numeric_dtype(part.dtype) or part.isna().all() for part in parts):
+            compact[col] = np.concatenate([part.to_numpy(dtype=float_dtype, na_value=np.nan) for part in parts])
+        else:
+            compact[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(compact, index=pd.RangeIndex(sum(lengths)))
+
+
+# Memory of every column before and after compact_frame, in megabytes
+def memory_report(before, after) -> pd.DataFrame:
+    """
+    before: list or DataFrame: The frames as read (their memory is summed per column).
+    after: DataFrame: The compacted frame.
+
+    Returns COLUMN, BEFORE_MB, AFTER_MB, BEFORE_DTYPE and AFTER_DTYPE, with a TOTAL row last. Text
+    is measured deeply, i.e. including the strings themselves.
+    """
+    if isinstance(before, pd.DataFrame):
+        before = [before]
+    used = pd.concat([df.memory_usage(index=False, deep=True) for df in before], axis=1).sum(axis=1)
+    dtypes = {col: df[col].dtype for df in reversed(before) for col in df.columns}
+    report = pd.DataFrame({
+        'COLUMN': after.columns,
+        'BEFORE_MB': [used.get(col, 0) / 2**20 for col in after.columns],
+        'AFTER_MB': after.memory_usage(index=False, deep=True).reindex(after.columns).to_numpy() / 2**20,
+        'BEFORE_DTYPE': [_dtype_name(dtypes.get(col)) for col in after.columns],
+        'AFTER_DTYPE': [_dtype_name(after[col].dtype) for col in after.columns],
+    })
+    total = {'COLUMN': 'TOTAL', 'BEFORE_MB': report['BEFORE_MB'].sum(), 'AFTER_MB': report['AFTER_MB'].sum(),
+             'BEFORE_DTYPE': '', 'AFTER_DTYPE': ''}
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+def _as_text(part, col):
+    values = part.cat.categories if isinstance(part.dtype, pd.CategoricalDtype) else part.dropna()
+    if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+        return part
+    # Through object, so each value keeps its own spelling (a categorical with NaN would give '7.0' for 7)
+    return part.astype(object).map(lambda value: _number_text(value, col)).where(part.notna())
+
+
+def _number_text(value, col):
+    # Whole numbers as integers (2131.0 of a column with NaN is 2131); a POSTAL number lost its leading
+    # zeros, so it is padded back to the five digits of employees.postal_key
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and float(value).is_integer():
+        return str(int(value)).zfill(5 if col == 'POSTAL' else 0)
+    return str(value)
+
+
+def _dtype_name(dtype):
+    return 'category' if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+
+
+# Read and clean one yearly file; messages and the stage record are returned instead of printed or
+# recorded so pooled workers don't interleave and their timings reach the caller's profilers
+def _load_year(year, path, encoding, target_col, drop_col, file_type, cache_dir=None, schema=None):
+    messages = []
+    info = new_record('read_year', year=year, path=path)
+    if not os.path.exists(path):
+        messages.append(f"File for year {year} does not exist.")
+        return None, messages, finish(info)
+    info['bytes'] = os.path.getsize(path)
+
+    start = time.perf_counter()
+    if cache_dir:
+        key = cache_key(path, year=year, encoding=encoding, target_col=list(target_col),
+                        drop_col=list(drop_col or []), file_type=file_type, schema=schema)
+        df = load_cached(cache_dir, path, key)
+        if df is not None:
+            messages.append(f"Read cached data for: {path} ({time.perf_counter() - start:.2f}s)")
+            info.update(rows=len(df), cache_hit=True)
+            return df, messages, finish(info)
+        info['cache_hit'] = False
+
+    try:
+        if file_type == 'csv':
+            read_kwargs, rename = _csv_options(path, year, encoding, drop_col, schema)
+            df = pd.read_csv(path, **read_kwargs).rename(columns=rename)
+        elif file_type == 'xlsx':
+            df = read_sheet(path, cache_dir=cache_dir)
+        df = _clean_frame(df, year, target_col, drop_col, messages)
+    except Exception as e:
+        messages.append(f"Error processing {path}: {e}")
+        return None, messages, finish(info)
+
+    if cache_dir:
+        try:
+            store_cached(cache_dir, path, key, df)
+        except Exception as e:
+            messages.append(f"Warning: Could not cache {path}: {e}")
+
+    messages.insert(0, f"Read data from: {path} ({time.perf_counter() - start:.2f}s)")
+    info['rows'] = len(df)
+    return df, messages, finish(info)
+
+
+# read_csv arguments for one yearly file, plus the renames that map its header onto the schema
+def _csv_options(path, year, encoding, drop_col, schema):
+    if not schema:
+        return {'encoding': encoding}, {}
+    header = pd.read_csv(path, encoding=encoding, nrows=0).columns
+    usecols, dtype, rename = resolve_schema(schema, year, header, drop_col)
+    return {'encoding': encoding, 'usecols': usecols, 'dtype': dtype}, rename
+
+
+# Add YEAR, clean the currency columns and drop the unwanted ones; warnings are appended to messages
+def _clean_frame(df, year, target_col, drop_col, messages):
+    df['YEAR'] = year
+
+    for col in target_col:
+        if col in df.columns:
+            df[col] = clean_currency_column(df[col], as_float=True)
+        else:
+            messages.append(f"Warning: Column '{col}' not found in {year} data.")
+
+    if drop_col:
+        for col in drop_col:
+            if col in df.columns:
+                df = df.drop(col, axis=1)
+    return df
+
+
+# Work out which raw columns of one year's file to read, their dtypes and their schema names
+def resolve_schema(schema, year, header, drop_col=None):
+    """
+    schema: dict: Column schema such as EARNINGS_SCHEMA.
+    year: int: Year of the file, used to pick per-year aliases.
+    header: list: Column names as they appear in the file.
+    drop_col: list: Schema columns that should not be read at all.
+
+    Returns (usecols, dtype, rename) ready for pd.read_csv and DataFrame.rename.
+    """
+    columns = schema['columns']
+    aliases = {**schema.get('aliases', {}), **schema.get('years', {}).get(year, {}).get('aliases', {})}
+    drop = set(drop_col or [])
+    usecols, dtype, rename = [], {}, {}
+
+    for raw in header:
+        key = str(raw).strip().upper()
+        name = raw if raw in columns else aliases.get(key, key if key in columns else None)
+        if name is None or name in drop or name in rename.values():
+            continue
+        usecols.append(raw)
+        dtype[raw] = columns[name]
+        if raw != name:
+            rename[raw] = name
+    return usecols, dtype, rename
 
 
 # Remove symbols in currency values and convert to float
@@ -55,6 +350,57 @@ def clean_currency(val):
     return val
 
 
+# Vectorized clean_currency: clean a whole column at once instead of one Python call per cell
+_CURRENCY_SYMBOLS = str.maketrans('', '', '$,()')
+_CELL_SEP = '\x00'
+
+
+def clean_currency_column(series, as_float=False) -> pd.Series:
+    """
+    series: pd.Series: Column holding currency strings such as '$1,000.00' or '(100)'.
+    as_float: bool: Return a float64 column with NaN instead of an object column holding None.
+
+    Every cell gets the value clean_currency would give it: strings lose '$', ',', '(' and ')',
+    '-' and '0.00' become None, the rest are parsed as floats; non-string cells are kept.
+    """
+    if series.dtype != object and not isinstance(series.dtype, pd.StringDtype):
+        # Already numeric, nothing to strip
+        return series.astype('float64') if as_float else series.copy()
+
+    values = series.to_numpy(dtype=object)
+    if isinstance(series.dtype, pd.StringDtype) or pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        is_str = ~pd.isna(values)
+    else:
+        is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+
+    # Strip the symbols from every string cell in one translate() call over the joined column
+    cells = values[is_str]
+    joined = _CELL_SEP.join(cells)
+    if joined.count(_CELL_SEP) == max(len(cells) - 1, 0):
+        stripped = joined.translate(_CURRENCY_SYMBOLS).split(_CELL_SEP) if len(cells) else []
+    else:
+        stripped = [cell.translate(_CURRENCY_SYMBOLS) for cell in cells]
+    stripped = np.strings.strip(np.array(stripped, dtype=np.dtypes.StringDType()))
+
+    is_null = (stripped == '-') | (stripped == '0.00')
+    parsed = stripped[~is_null].astype('float64')
+    str_idx = np.flatnonzero(is_str)
+
+    if as_float:
+        out = np.full(len(values), np.nan)
+        if not is_str.all():
+            # pd.NA (StringDtype's missing value) does not convert to float itself
+            rest = values[~is_str]
+            out[~is_str] = np.where(pd.isna(rest), np.nan, rest).astype('float64')
+        out[str_idx[~is_null]] = parsed
+        return pd.Series(out, index=series.index, name=series.name)
+
+    out = values.copy()
+    out[str_idx[is_null]] = None
+    out[str_idx[~is_null]] = parsed
+    return pd.Series(out, index=series.index, name=series.name, dtype=object)
+
+
 def correct_hours_worked(val):
     """
     Correct 'Hours Worked' smartly for float64 columns:
@@ -78,18 +424,51 @@ def correct_hours_worked(val):
 
 
 
+# Vectorized correct_hours_worked: apply the real-hours / HHMM split with masks on a whole block
+def correct_hours_array(values) -> np.ndarray:
+    """
+    values: array-like: Hours values, 1-D (one column) or 2-D (several columns side by side).
+
+    Returns a float64 array of the same shape holding what correct_hours_worked gives for each
+    value, with NaN where it gives None.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        hours = values.astype('float64')
+    else:
+        # Strings never pass correct_hours_worked's comparisons, so they become NaN like None does
+        flat = values.astype(object).ravel()
+        is_str = np.fromiter((isinstance(v, str) for v in flat), dtype=bool, count=flat.size)
+        flat = np.where(is_str, np.nan, flat)
+        hours = pd.to_numeric(pd.Series(flat), errors='coerce').to_numpy('float64').reshape(values.shape)
+
+    out = np.full(hours.shape, np.nan)
+    with np.errstate(invalid='ignore'):
+        finite = np.isfinite(hours)
+        real = finite & (hours >= 0) & (hours < 24)
+        hhmm_val = np.trunc(hours)
+        hhmm = finite & ~real & (hhmm_val >= 100) & (hhmm_val <= 2400)
+    out[real] = hours[real]
+    out[hhmm] = hhmm_val[hhmm] // 100 + (hhmm_val[hhmm] % 100) / 60
+    return out
+
+
 def process_hours_columns(dfs, hours_worked_col="Hours Worked"):
     """
     Process a list of DataFrames to fix 'Hours Worked' and 'Hours Paid' columns.
+    hours_worked_col: str or list: Hours column(s) to correct; several columns are converted in one pass.
     """
+    hours_cols = [hours_worked_col] if isinstance(hours_worked_col, str) else list(hours_worked_col)
     processed_dfs = []
 
-    for df in dfs:
-        # Convert 'Hours Worked' if the column exists
-        if hours_worked_col in df.columns:
-            df[hours_worked_col] = df[hours_worked_col].apply(correct_hours_worked)
-        
-        
-        processed_dfs.append(df)
+    with stage('process_hours_columns', columns=hours_cols) as info:
+        for df in dfs:
+            # Convert the hours columns that exist in this DataFrame
+            cols = [col for col in hours_cols if col in df.columns]
+            if cols:
+                df[cols] = correct_hours_array(df[cols].to_numpy())
+
+            processed_dfs.append(df)
+        info['rows'] = sum(len(df) for df in processed_dfs)
 
     return processed_dfs
@@ -1,12 +1,25 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
+
+from cache import ResultCache, content_key, derived_key, load_cached, store_cached
+from instrument import stage
+from polyfit import (PolynomialFit, cross_validate, fit_polynomials, prediction_intervals, rounding_tolerance,
+                     select_degree)
+
+# matplotlib and plotly are imported inside the plotting functions: together they take seconds to
+# import, which fitting, headless and batch runs never need. The plotted curves are evaluated from the
+# fitted models, so plotting does not need sklearn either.
+
+# Fits of recently forecast series, shared by every call that does not pass its own cache
+FORECAST_CACHE = ResultCache(maxsize=256, name='forecast')
+
+# Fill colors (red, green, blue 0-255 and opacity) of the prediction interval bands in the plots
+INTERVAL_COLORS = {'bootstrap': (128, 128, 128, 0.3), 'analytic': (65, 105, 225, 0.15)}
 
 def polynomial_regression_forecast(
     df,
@@ -19,7 +32,13 @@ def polynomial_regression_forecast(
     figsize=(12, 8),
     currency_format=True,
     yoy_analysis=True,
-    interactive=True
+    interactive=True,
+    basis='scaled',
+    selection='loo',
+    headless=False,
+    cache=None,
+    interval_level=0.95,
+    n_boot=2000
 ):
     """
     Perform polynomial regression on time series data and forecast future values
@@ -49,6 +68,20 @@ def polynomial_regression_forecast(
         Whether to create a year-over-year percentage change plot
     interactive : bool, default=True
         Whether to create interactive plots (True) or static matplotlib plots (False)
+    basis : str, default='scaled'
+        Fit on centered and scaled years ('scaled', well conditioned) or on the raw years ('raw')
+    selection : str, default='loo'
+        How the best degree is picked: lowest leave-one-out error ('loo'), lowest rolling-origin
+        one-step-ahead error ('rolling') or highest in-sample R² ('r2')
+    headless : bool, default=False
+        Compute only: no printing and no plots (interactive and the plot arguments are ignored), and
+        the results include a JSON-serializable 'record' (see forecast_record)
+    cache : cache.ResultCache or False, default=None
+        Where fits are memoized, see fit_polynomial_models
+    interval_level : float, default=0.95
+        Level of the prediction intervals around the forecasts, drawn as bands; None skips them
+    n_boot : int, default=2000
+        Resamples of the bootstrap prediction interval
 
     Returns:
     --------
@@ -59,22 +92,54 @@ def polynomial_regression_forecast(
         - 'predictions': Dictionary of predictions for each model
         - 'future_predictions': Forecasted values
         - 'equation': The equation of the best model
-        - 'metrics': Dictionary of metrics (R², MSE) for each model
+        - 'metrics': Dictionary of metrics (R², MSE and cross-validated MSE) for each model
+        - 'cv': Per-fold errors of the cross-validation (None when selection='r2')
+        - 'equation_scaled': The equation in the scaled year t, with exact coefficients
+        - 'coefficients': The best model's coefficients in the 'scaled' and 'raw' basis
+        - 'condition_number': Condition number of the design matrix for each degree
+        - 'intervals': Prediction intervals of the forecasts, see fit_polynomial_models
         - 'fig': The interactive Plotly figure (if interactive=True)
+        - 'record': Serializable summary for storing or plotting later (if headless=True)
     """
     # Extract data from dataframe
     years = df[x_column].values
     values = df[y_column].values
 
-    # Reshape the data for sklearn
-    X = years.reshape(-1, 1)
-    y = values
+    # Fit every degree and keep the best one by cross-validated error (or R²)
+    with stage('fit', y_column=y_column, degrees=list(test_degrees)) as info:
+        fit, info['cache_hit'] = _cached_fit(years, values, forecast_years, test_degrees, basis, selection, cache,
+                                             interval_level, n_boot)
+        info['rows'] = len(values)
+    models = fit['models']
+    predictions = fit['predictions']
+    metrics = fit['metrics']
+    best_degree = fit['best_degree']
+    best_model = fit['best_model']
+    future_years_pred = fit['future_years'].reshape(-1, 1)
+    future_predictions = fit['future_predictions']
+    equation = fit['equation']
+
+    results = {
+        'best_degree': best_degree,
+        'best_model': best_model,
+        'predictions': predictions,
+        'future_predictions': future_predictions,
+        'equation': equation,
+        'metrics': metrics,
+        'cv': fit['cv'],
+        'equation_scaled': fit['equation_scaled'],
+        'coefficients': fit['coefficients'],
+        'condition_number': fit['condition_number'],
+        'intervals': fit['intervals']
+    }
+    if headless:
+        # Compute only: nothing printed, no plotting library touched
+        results['record'] = forecast_record(years, values, fit, x_column, y_column, basis, selection)
+        return results
 
-    # Prepare results
-    models = {}
-    predictions = {}
-    metrics = {}
-    colors = ['blue', 'green', 'red', 'purple', 'cyan']  # More colors for more degrees
+    print(f"Best polynomial degree: {best_degree}")
+    if fit['cv'] is not None:
+        print(f"Selected by {selection} cross-validation (MSE = {metrics[best_degree]['cv_mse']:.2e})")
 
     # Get the last year in the data
     last_year = int(years[-1])
@@ -82,108 +147,411 @@ def polynomial_regression_forecast(
     # Create future years array for predictions
     future_years = np.array(range(int(years[0]), last_year + forecast_years + 1)).reshape(-1, 1)
 
-    # Try different polynomial degrees and find the best fit
-    for i, degree in enumerate(test_degrees):
-        color_idx = i % len(colors)  # Use modulo to cycle through colors if more degrees than colors
+    # Print future predictions
+    print("\nPredicted future values:")
+    prefix = '$' if currency_format else ''
+    for i, (year, pred) in enumerate(zip(future_years_pred.flatten(), future_predictions)):
+        line = f"Year {int(year)}: {prefix}{pred:,.2f}"
+        if fit['intervals'] is not None:
+            band = fit['intervals']['bootstrap']
+            line += (f" ({fit['intervals']['level']:.0%} interval {prefix}{band['lower'][i]:,.2f}"
+                     f" to {prefix}{band['upper'][i]:,.2f})")
+        print(line)
+
+    # Display the best model's equation
+    print("\nBest model equation:")
+    print(equation)
+    print(f"Condition number ({basis} basis): {fit['condition_number'][best_degree]:.2e}")
+
+    with stage('plot', y_column=y_column, interactive=interactive):
+        if interactive:
+            # Create interactive plotly figure
+            fig = create_interactive_plots(
+                years, values, models, future_years, metrics, last_year,
+                forecast_years, best_degree, future_years_pred, future_predictions,
+                x_column, y_label, title, currency_format, yoy_analysis, fit['intervals']
+            )
+            fig.show()
+
+            # Return the results with figure
+            results['fig'] = fig
+        else:
+            # Create static matplotlib figure
+            create_static_plots(
+                years, values, models, future_years, metrics, last_year,
+                forecast_years, best_degree, None,
+                x_column, y_label, title, figsize, currency_format, yoy_analysis, fit['intervals']
+            )
+    return results
 
-        # Create polynomial features
-        poly_features = PolynomialFeatures(degree=degree)
-        X_poly = poly_features.fit_transform(X)
+def forecast_record(years, values, fit, x_column, y_column, basis='scaled', selection='loo'):
+    """
+    Build a JSON-serializable summary of a forecast, enough to report on it or plot it later.
 
-        # Fit the model
-        model = LinearRegression()
-        model.fit(X_poly, y)
-        models[degree] = model
+    Parameters:
+    -----------
+    years, values : array-like
+        The series that was fitted
+    fit : dict
+        Result of fit_polynomial_models
+    x_column, y_column : str
+        Names of the year and value columns
+    basis, selection : str
+        The arguments the fit was made with
 
-        # Make predictions for the training data
-        y_pred = model.predict(X_poly)
-        predictions[degree] = y_pred
+    Returns:
+    --------
+    dict
+        Plain lists, numbers and strings only. Degrees are string keys (as JSON object keys must be)
+        of 'models', each holding the scaled-basis coefficients, forecast and metrics of that degree.
+        NaN and infinite numbers (e.g. the cv_mse of a degree with too few points) are None, so the
+        record is valid JSON.
+    """
+    center, scale = fit['best_model'].center, fit['best_model'].scale
+    cv = fit['cv']
+    intervals = fit.get('intervals')
+    return _json_safe({
+        'x_column': x_column,
+        'y_column': y_column,
+        'years': [int(year) for year in years],
+        'values': [float(value) for value in values],
+        'basis': basis,
+        'selection': selection,
+        'center': float(center),
+        'scale': float(scale),
+        'best_degree': int(fit['best_degree']),
+        'future_years': [int(year) for year in fit['future_years']],
+        'future_predictions': [float(value) for value in fit['future_predictions']],
+        'equation': fit['equation'],
+        'equation_scaled': fit['equation_scaled'],
+        'models': {
+            str(degree): {
+                'coefficients': model.coef.tolist(),
+                'forecast': [float(value) for value in fit['forecasts'][degree]],
+                'condition_number': float(fit['condition_number'][degree]),
+                **fit['metrics'][degree]
+            }
+            for degree, model in fit['models'].items()
+        },
+        'cv': None if cv is None else {
+            'method': cv['method'],
+            'held_out': [int(year) for year in cv['held_out']],
+            'errors': {str(degree): errors.tolist() for degree, errors in cv['errors'].items()}
+        },
+        'intervals': None if intervals is None else {
+            'level': intervals['level'],
+            'n_boot': intervals['n_boot'],
+            **{method: {bound: [float(value) for value in intervals[method][bound]] for bound in ('lower', 'upper')}
+               for method in ('analytic', 'bootstrap')}
+        }
+    })
+
+def _json_safe(item):
+    # NaN and inf become None: json.dump would write the non-standard NaN/Infinity tokens
+    if isinstance(item, dict):
+        return {key: _json_safe(value) for key, value in item.items()}
+    if isinstance(item, list):
+        return [_json_safe(value) for value in item]
+    if isinstance(item, float) and not np.isfinite(item):
+        return None
+    return item
 
-        # Calculate metrics
-        mse = mean_squared_error(y, y_pred)
-        r2 = r2_score(y, y_pred)
-        metrics[degree] = {'mse': mse, 'r2': r2}
+def plot_forecast_record(
+    record,
+    title="Polynomial Regression Forecast",
+    y_label="Value",
+    figsize=(12, 8),
+    currency_format=True,
+    yoy_analysis=True,
+    interactive=True,
+    show=True
+):
+    """
+    Draw the plots of polynomial_regression_forecast from a stored forecast, without refitting.
 
-    # Find the best model based on R² score
-    best_degree = max(models.keys(), key=lambda d: metrics[d]['r2'])
-    print(f"Best polynomial degree: {best_degree}")
+    Parameters:
+    -----------
+    record : dict
+        Result of forecast_record, e.g. loaded back from JSON
+    title, y_label, figsize, currency_format, yoy_analysis, interactive :
+        As in polynomial_regression_forecast
+    show : bool, default=True
+        Show the static plots; False returns them instead (see export_forecast_figures)
 
-    # Get the best model
-    best_model = models[best_degree]
+    Returns:
+    --------
+    plotly.graph_objects.Figure, list of matplotlib figures or None
+        The interactive figure (not shown), the static figures when show=False, or None after showing
+        the static plots
+    """
+    years = np.array(record['years'])
+    values = np.array(record['values'], dtype=float)
+    models = {int(degree): PolynomialFit(model['coefficients'], record['center'], record['scale'])
+              for degree, model in record['models'].items()}
+    # None is how the record stores a NaN
+    metrics = {int(degree): {name: np.nan if model[name] is None else model[name] for name in ('mse', 'r2')}
+               for degree, model in record['models'].items()}
+    best_degree = record['best_degree']
+    last_year = int(years[-1])
+    forecast_years = len(record['future_years'])
+    future_years = np.array(range(int(years[0]), last_year + forecast_years + 1)).reshape(-1, 1)
 
-    # Predict future values using the best model
-    poly_features = PolynomialFeatures(degree=best_degree)
-    poly_features.fit(X)  # Fit the transformer first
-    future_years_pred = np.array(range(last_year + 1, last_year + forecast_years + 1)).reshape(-1, 1)
-    future_poly = poly_features.transform(future_years_pred)
-    future_predictions = best_model.predict(future_poly)
+    if interactive:
+        return create_interactive_plots(
+            years, values, models, future_years, metrics, last_year,
+            forecast_years, best_degree, np.array(record['future_years']).reshape(-1, 1),
+            np.array(record['future_predictions']), record['x_column'], y_label, title, currency_format, yoy_analysis,
+            record.get('intervals')
+        )
+    figures = create_static_plots(
+        years, values, models, future_years, metrics, last_year,
+        forecast_years, best_degree, None,
+        record['x_column'], y_label, title, figsize, currency_format, yoy_analysis, record.get('intervals'), show
+    )
+    return None if show else figures
 
-    # Print future predictions
-    print("\nPredicted future values:")
-    if currency_format:
-        for year, pred in zip(future_years_pred.flatten(), future_predictions):
-            print(f"Year {int(year)}: ${pred:,.2f}")
-    else:
-        for year, pred in zip(future_years_pred.flatten(), future_predictions):
-            print(f"Year {int(year)}: {pred:,.2f}")
+def export_forecast_figures(
+    records,
+    folder,
+    formats=('html',),
+    workers=None,
+    y_label="Value",
+    title="{name} ({first}–{last})",
+    currency_format=True,
+    yoy_analysis=True
+):
+    """
+    Render stored forecasts to files, spread over a process pool, without showing anything.
 
-    # Display the best model's coefficients
-    best_poly_features = PolynomialFeatures(degree=best_degree)
-    X_best_poly = best_poly_features.fit_transform(X)
-    coefficients = best_model.coef_
-    intercept = best_model.intercept_
+    Parameters:
+    -----------
+    records : dict
+        {name: forecast_record}, e.g. the forecast_records.json of pipeline.py
+    folder : str
+        Output folder; created if missing
+    formats : list, default=('html',)
+        'html' writes the interactive Plotly figure; 'png' and 'svg' write the static matplotlib
+        figures (drawn with the Agg backend, the YoY chart to <name>_yoy.<format>)
+    workers : int, default=None
+        Worker processes; None uses one per CPU, 1 renders in this process
+    y_label, currency_format, yoy_analysis :
+        As in polynomial_regression_forecast
+    title : str, default="{name} ({first}–{last})"
+        Title of each figure, formatted with the record's name and its first and last year
 
-    print("\nBest model equation:")
-    equation = f"y = {intercept:.2e}"
-    for i, coef in enumerate(coefficients[1:], 1):
-        equation += f" + {coef:.2e}x^{i}"
-    print(equation)
+    Returns:
+    --------
+    dict
+        {name: [paths written]}
 
-    if interactive:
-        # Create interactive plotly figure
-        fig = create_interactive_plots(
-            years, values, models, future_years, metrics, last_year,
-            forecast_years, best_degree, future_years_pred, future_predictions,
-            x_column, y_label, title, currency_format, yoy_analysis
-        )
-        fig.show()
-
-        # Return the results with figure
-        return {
-            'best_degree': best_degree,
-            'best_model': best_model,
-            'predictions': predictions,
-            'future_predictions': future_predictions,
-            'equation': equation,
-            'metrics': metrics,
-            'fig': fig
-        }
+    Files are named after the letters and digits of each name ('Kennedy, JF Elementary' writes
+    Kennedy_JF_Elementary.html). Names that would share a file ('Kennedy JF Elementary' too, also
+    when only the case differs or it would be another's _yoy figure) or have no letters or digits
+    get a short hash of the name appended, so every record has files of its own.
+
+    The HTML files load plotly.js from one plotly.min.js in the folder instead of embedding a copy
+    each, so they stay a few kilobytes and work offline.
+    """
+    unknown = set(formats) - {'html', 'png', 'svg'}
+    if unknown:
+        raise ValueError(f"Unknown figure formats {sorted(unknown)}; use 'html', 'png' or 'svg'")
+    os.makedirs(folder, exist_ok=True)
+    if 'html' in formats:
+        from plotly.offline import get_plotlyjs
+        with open(os.path.join(folder, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    names = list(records)
+    args = [[records[name] for name in names],
+            [os.path.join(folder, base) for base in _file_bases(names)],
+            [title.format(name=name, first=records[name]['years'][0], last=records[name]['years'][-1])
+             for name in names]]
+    args += [[value] * len(names) for value in (list(formats), y_label, currency_format, yoy_analysis)]
+    workers = workers or os.cpu_count() or 1
+    with stage('export_figures', figures=len(names), formats=list(formats), workers=workers) as info:
+        if workers > 1 and len(names) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(names)), initializer=_use_agg) as executor:
+                paths = list(executor.map(_export_record, *args, chunksize=max(1, len(names) // (4 * workers))))
+        else:
+            paths = list(map(_export_record, *args))
+        info['rows'] = len(names)
+    return dict(zip(names, paths))
+
+def _file_bases(names):
+    # File name of each record without folder or extension, see export_forecast_figures
+    stems = [re.sub(r'[^A-Za-z0-9]+', '_', str(name)).strip('_') for name in names]
+    # Case-insensitive, for the file systems of Windows and macOS
+    taken = {}
+    for stem in stems:
+        for used in (stem.lower(), stem.lower() + '_yoy'):
+            taken[used] = taken.get(used, 0) + 1
+    return [stem if stem and taken[stem.lower()] == 1
+            else f"{stem}_{hashlib.sha1(str(name).encode()).hexdigest()[:8]}".lstrip('_')
+            for name, stem in zip(names, stems)]
+
+def _use_agg():
+    # Pool workers never show a window, whatever backend the parent uses
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _export_record(record, base, title, formats, y_label, currency_format, yoy_analysis):
+    paths = []
+    if 'html' in formats:
+        fig = plot_forecast_record(record, title=title, y_label=y_label, currency_format=currency_format,
+                                   yoy_analysis=yoy_analysis)
+        fig.write_html(base + '.html', include_plotlyjs='plotly.min.js')
+        paths.append(base + '.html')
+    static = [fmt for fmt in formats if fmt != 'html']
+    if static:
+        # Agg figures outside pyplot (see create_static_plots), also when rendering in this process
+        figures = plot_forecast_record(record, title=title, y_label=y_label, currency_format=currency_format,
+                                       yoy_analysis=yoy_analysis, interactive=False, show=False)
+        for figure, suffix in zip(figures, ('', '_yoy')):
+            for fmt in static:
+                figure.savefig(f"{base}{suffix}.{fmt}", format=fmt)
+                paths.append(f"{base}{suffix}.{fmt}")
+    return paths
+
+def fit_polynomial_models(years, values, forecast_years=2, test_degrees=[2, 3, 4], basis='scaled', selection='loo',
+                          cache=None, interval_level=0.95, n_boot=2000):
+    """
+    Fit one polynomial regression per degree and forecast with each, without printing or plotting.
+
+    Parameters:
+    -----------
+    years : array-like
+        The years (x values) of the series
+    values : array-like
+        The values to fit
+    forecast_years : int, default=2
+        The number of years to forecast after the last year
+    test_degrees : list, default=[2, 3, 4]
+        List of polynomial degrees to fit
+    basis : str, default='scaled'
+        Fitting axis, 'scaled' (centered and scaled years) or 'raw' (years as they are)
+    selection : str, default='loo'
+        'loo' or 'rolling' picks the degree with the lowest cross-validated error
+        (polyfit.cross_validate), 'r2' the one with the highest in-sample R²
+    cache : cache.ResultCache or False, default=None
+        Fits are memoized by a hash of the years, values, test_degrees, forecast_years, basis and
+        selection, so fitting an unchanged series again is a lookup. None uses the shared in-memory
+        FORECAST_CACHE, False always fits. Every call gets its own dicts, but the arrays of a
+        memoized fit are shared and read-only; copy them before changing them.
+    interval_level : float, default=0.95
+        Level of the prediction intervals of the best model's forecasts; None skips them
+    n_boot : int, default=2000
+        Resamples of the bootstrap interval (polyfit.prediction_intervals)
+
+    Returns:
+    --------
+    dict
+        - 'models': {degree: fitted polyfit.PolynomialFit}
+        - 'predictions': {degree: in-sample predictions}
+        - 'metrics': {degree: {'mse': ..., 'r2': ..., 'cv_mse': ...}}, cv_mse is None when selection='r2'
+        - 'cv': {'method', 'held_out': x value of each fold, 'errors': {degree: error per fold}}, or None
+        - 'future_years': The forecast years
+        - 'forecasts': {degree: predictions for the forecast years}
+        - 'condition_number': {degree: condition number of the design matrix}
+        - 'coefficients': Best model's coefficients in the 'scaled' and 'raw' basis (PolynomialFit.coefficients)
+        - 'intervals': {'level', 'n_boot', 'analytic': {'lower', 'upper'}, 'bootstrap': {'lower', 'upper'}},
+          bounds of the best model's forecasts for the forecast years, or None when interval_level is None.
+          The analytic interval assumes normal errors; the bootstrap one resamples the residuals.
+        - 'best_degree', 'best_model', 'future_predictions', 'equation', 'equation_scaled':
+          As in polynomial_regression_forecast
+    """
+    return _cached_fit(years, values, forecast_years, test_degrees, basis, selection, cache, interval_level, n_boot)[0]
+
+def _cached_fit(years, values, forecast_years, test_degrees, basis, selection, cache, interval_level=0.95,
+                n_boot=2000):
+    args = (years, values, forecast_years, test_degrees, basis, selection, interval_level, n_boot)
+    if cache is False:
+        return _fit_polynomial_models(*args), False
+    cache = FORECAST_CACHE if cache is None else cache
+    key = content_key(np.asarray(years), np.asarray(values, dtype=float), forecast_years=forecast_years,
+                      test_degrees=list(test_degrees), basis=basis, selection=selection,
+                      interval_level=interval_level, n_boot=n_boot)
+    fit = cache.get(key)
+    hit = fit is not None
+    if not hit:
+        fit = _fit_polynomial_models(*args)
+        cache.put(key, fit)
+    return _shared_copy(fit), hit
+
+def _shared_copy(item):
+    # Fresh dicts, lists and PolynomialFit objects around read-only arrays: a caller can change its
+    # result but not the cached fit (the arrays cannot be written to, the rest is copied)
+    if type(item) is dict:
+        return {key: _shared_copy(value) for key, value in item.items()}
+    if type(item) is list:
+        return [_shared_copy(value) for value in item]
+    if type(item) is np.ndarray:
+        item.flags.writeable = False
+    elif type(item) is PolynomialFit:
+        item.coef.flags.writeable = False
+        item = PolynomialFit(item.coef, item.center, item.scale)
+    return item
+
+def _fit_polynomial_models(years, values, forecast_years, test_degrees, basis, selection, interval_level=0.95,
+                           n_boot=2000):
+    years = np.asarray(years)
+    last_year = int(years[-1])
+    future_years = np.array(range(last_year + 1, last_year + forecast_years + 1))
+
+    # All degrees come out of one shared QR solve on the centered/scaled year axis
+    fit = fit_polynomials(years, values, test_degrees, future_years, basis=basis)
+    models = {degree: PolynomialFit(fit['coef'][degree], fit['center'], fit['scale']) for degree in test_degrees}
+    predictions = fit['fitted']
+    forecasts = fit['forecast']
+    if selection == 'r2':
+        cv = None
     else:
-        # Create static matplotlib figure
-        create_static_plots(
-            years, values, models, future_years, metrics, last_year,
-            forecast_years, best_degree, poly_features,
-            x_column, y_label, title, figsize, currency_format, yoy_analysis
-        )
+        cv = cross_validate(years, values, test_degrees, method=selection, basis=basis)
+    metrics = {degree: {'mse': float(fit['mse'][degree]), 'r2': float(fit['r2'][degree]),
+                        'cv_mse': None if cv is None else float(cv['cv_mse'][degree])} for degree in test_degrees}
 
-        # Return the results without figure
-        return {
-            'best_degree': best_degree,
-            'best_model': best_model,
-            'predictions': predictions,
-            'future_predictions': future_predictions,
-            'equation': equation,
-            'metrics': metrics
-        }
+    # Out-of-sample error picks the degree; in-sample R² always favours the highest one
+    best = select_degree(test_degrees, fit['r2'], None if cv is None else cv['cv_mse'], rounding_tolerance(values))
+    best_degree = test_degrees[int(best[0])]
+    best_model = models[best_degree]
+    if cv is not None:
+        cv = {'method': cv['method'], 'held_out': cv['held_out'], 'errors': cv['errors']}
+    intervals = None
+    if interval_level is not None:
+        intervals = {'level': interval_level, 'n_boot': n_boot}
+        for method in ('analytic', 'bootstrap'):
+            bounds = prediction_intervals(years, values, [best_degree], future_years, interval_level, method,
+                                          n_boot=n_boot, basis=basis)
+            intervals[method] = {'lower': bounds['lower'][best_degree], 'upper': bounds['upper'][best_degree]}
+
+    return {
+        'models': models,
+        'predictions': predictions,
+        'metrics': metrics,
+        'cv': cv,
+        'future_years': future_years,
+        'forecasts': forecasts,
+        'best_degree': best_degree,
+        'best_model': best_model,
+        'future_predictions': forecasts[best_degree],
+        'equation': best_model.equation('raw'),
+        'equation_scaled': best_model.equation('scaled'),
+        'condition_number': fit['condition_number'],
+        'coefficients': best_model.coefficients(),
+        'intervals': intervals
+    }
 
 def create_interactive_plots(
     years, values, models, future_years, metrics, last_year,
     forecast_years, best_degree, future_years_pred, future_predictions,
-    x_column, y_label, title, currency_format, yoy_analysis
+    x_column, y_label, title, currency_format, yoy_analysis, intervals=None
 ):
     """
     Create interactive Plotly visualizations for polynomial regression.
+    intervals (fit_polynomial_models' 'intervals') are drawn as bands around the forecasts.
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     # Colors for different polynomial degrees
     colors = ['blue', 'green', 'red', 'purple', 'cyan']
 
@@ -221,9 +589,7 @@ def create_interactive_plots(
         model = models[degree]
 
         # Calculate predictions for the expanded year range
-        poly_features = PolynomialFeatures(degree=degree)
-        future_poly = poly_features.fit_transform(future_years)
-        future_pred = model.predict(future_poly)
+        future_pred = model.predict_x(np.ravel(future_years))
 
         # Add line for this polynomial degree
         r2 = metrics[degree]['r2']
@@ -243,15 +609,6 @@ def create_interactive_plots(
             row=1, col=1
         )
 
-    # Add forecast region for best model
-    forecast_years_array = np.array(range(last_year, last_year + forecast_years + 1))
-    forecast_values = []
-
-    # Calculate forecast values using the best model
-    poly_features = PolynomialFeatures(degree=best_degree)
-    forecast_poly = poly_features.fit_transform(forecast_years_array.reshape(-1, 1))
-    forecast_values = models[best_degree].predict(forecast_poly)
-
     # Add a vertical line at the last actual data point
     fig.add_vline(
         x=last_year, line_width=2, line_dash="dash", line_color="black",
@@ -260,20 +617,21 @@ def create_interactive_plots(
         row=1, col=1
     )
 
-    # Highlight forecast region
-    fig.add_trace(
-        go.Scatter(
-            x=np.concatenate([forecast_years_array, forecast_years_array[::-1]]),
-            y=np.concatenate([forecast_values, [np.min(values)]*len(forecast_years_array)]),
-            fill='toself',
-            fillcolor='rgba(128, 128, 128, 0.2)',
-            line=dict(color='rgba(255, 255, 255, 0)'),
-            hoverinfo='skip',
-            name='Forecast Region',
-            showlegend=True
-        ),
-        row=1, col=1
-    )
+    # Prediction interval bands of the best model, widening from the last data point
+    for method, band_years, lower, upper in _interval_bands(models[best_degree], last_year, future_years_pred, intervals):
+        fig.add_trace(
+            go.Scatter(
+                x=np.concatenate([band_years, band_years[::-1]]),
+                y=np.concatenate([upper, lower[::-1]]),
+                fill='toself',
+                fillcolor='rgba({}, {}, {}, {})'.format(*INTERVAL_COLORS[method]),
+                line=dict(color='rgba(255, 255, 255, 0)'),
+                hoverinfo='skip',
+                name=f"{intervals['level']:.0%} prediction interval ({method})",
+                showlegend=True
+            ),
+            row=1, col=1
+        )
 
     # Add predicted future points with annotations
     fig.add_trace(
@@ -350,7 +708,8 @@ def create_interactive_plots(
             row=1, col=1
         )
 
-    # Add buttons to toggle polynomial degrees
+    # Add buttons to toggle polynomial degrees; traces after the fits (bands, predictions, YoY) stay visible
+    others = len(fig.data) - 1 - len(models)
     degree_buttons = []
     for degree in models.keys():
         degree_buttons.append(
@@ -359,12 +718,12 @@ def create_interactive_plots(
                 label=f'Degree {degree}',
                 args=[{'visible': [True] +
                       [deg == degree for deg in models.keys()] +
-                      [True, True]}]
+                      [True] * others}]
             )
         )
 
     # Add all models button
-    all_visible = [True] * (len(models) + 3)  # +3 for original data, forecast region, predictions
+    all_visible = [True] * len(fig.data)
     degree_buttons.append(
         dict(
             method='update',
@@ -400,23 +759,41 @@ def create_interactive_plots(
 def create_static_plots(
     years, values, models, future_years, metrics, last_year,
     forecast_years, best_degree, poly_features,
-    x_column, y_label, title, figsize, currency_format, yoy_analysis
+    x_column, y_label, title, figsize, currency_format, yoy_analysis, intervals=None, show=True
 ):
     """
     Create static matplotlib visualizations (original implementation).
+    intervals (fit_polynomial_models' 'intervals') are drawn as bands around the forecasts.
+    poly_features is no longer used: the curves are evaluated from the models.
+    With show=False nothing is shown and the figures (forecast, then YoY) are returned for saving; they
+    are drawn on their own Agg canvas outside pyplot, so whatever backend pyplot uses is never involved.
     """
+    if show:
+        import matplotlib.pyplot as plt
+        new_figure = plt.figure
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        def new_figure(figsize):
+            figure = Figure(figsize=figsize)
+            FigureCanvasAgg(figure)
+            return figure
+    from matplotlib.ticker import FuncFormatter
+
     # Colors for different polynomial degrees
     colors = ['blue', 'green', 'red', 'purple', 'cyan']
 
     # Create a figure for visualization
-    plt.figure(figsize=figsize)
+    figures = [new_figure(figsize=figsize)]
+    ax = figures[0].add_subplot()
 
     # Plot original data
-    plt.scatter(years, values, color='orange', label='Original data')
-    plt.title(title)
-    plt.xlabel(x_column)
-    plt.ylabel(y_label)
-    plt.grid(True, linestyle='--', alpha=0.7)
+    ax.scatter(years, values, color='orange', label='Original data')
+    ax.set_title(title)
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_label)
+    ax.grid(True, linestyle='--', alpha=0.7)
 
     # Plot polynomial fits
     for i, degree in enumerate(models.keys()):
@@ -424,54 +801,68 @@ def create_static_plots(
         model = models[degree]
 
         # Calculate predictions for the expanded year range
-        poly_features_deg = PolynomialFeatures(degree=degree)
-        future_poly = poly_features_deg.fit_transform(future_years)
-        future_pred = model.predict(future_poly)
+        future_pred = model.predict_x(np.ravel(future_years))
 
         # Plot the polynomial fit
         mse = metrics[degree]['mse']
         r2 = metrics[degree]['r2']
-        plt.plot(future_years, future_pred, color=colors[color_idx],
+        ax.plot(future_years, future_pred, color=colors[color_idx],
                 label=f'Degree {degree} (R² = {r2:.4f}, MSE = {mse:.2e})')
 
-    # Highlight forecast region
-    forecast_years_array = np.array(range(last_year, last_year + forecast_years + 1))
-    forecast_poly = poly_features.transform(forecast_years_array.reshape(-1, 1))
-    forecast_values = models[best_degree].predict(forecast_poly)
-    plt.fill_between(forecast_years_array, forecast_values, alpha=0.2, color='gray', label='Forecast region')
+    # Prediction interval bands of the best model, widening from the last data point
+    future_years_pred = np.arange(last_year + 1, last_year + forecast_years + 1)
+    for method, band_years, lower, upper in _interval_bands(models[best_degree], last_year, future_years_pred, intervals):
+        red, green, blue, alpha = INTERVAL_COLORS[method]
+        ax.fill_between(band_years, lower, upper, color=(red / 255, green / 255, blue / 255, alpha),
+                        label=f"{intervals['level']:.0%} prediction interval ({method})")
 
     # Add a vertical line at the last actual data point
-    plt.axvline(x=last_year, color='black', linestyle='--', alpha=0.5, label=f'Last data point ({last_year})')
+    ax.axvline(x=last_year, color='black', linestyle='--', alpha=0.5, label=f'Last data point ({last_year})')
 
     # Format y-axis with millions if currency format is enabled
     if currency_format:
-        plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f'${x/1e6:.0f}M'))
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x/1e6:.0f}M'))
 
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
+    ax.legend()
+    figures[0].tight_layout()
+    if show:
+        plt.show()
 
     # Additional analysis: Year-over-year percentage change
     if yoy_analysis and len(values) > 1:
         yoy_change = np.diff(values) / values[:-1] * 100
 
-        plt.figure(figsize=(12, 6))
-        plt.bar(years[1:], yoy_change, color='skyblue')
-        plt.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-        plt.title(f'Year-over-Year Percentage Change in {y_label}')
-        plt.xlabel(x_column)
-        plt.ylabel('Percentage Change (%)')
-        plt.grid(True, linestyle='--', alpha=0.7)
+        figures.append(new_figure(figsize=(12, 6)))
+        ax = figures[1].add_subplot()
+        ax.bar(years[1:], yoy_change, color='skyblue')
+        ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        ax.set_title(f'Year-over-Year Percentage Change in {y_label}')
+        ax.set_xlabel(x_column)
+        ax.set_ylabel('Percentage Change (%)')
+        ax.grid(True, linestyle='--', alpha=0.7)
 
         for i, value in enumerate(yoy_change):
-            plt.text(years[i+1], value + (2 if value > 0 else -5), f'{value:.1f}%', ha='center')
-
-        plt.tight_layout()
-        plt.show()
+            ax.text(years[i+1], value + (2 if value > 0 else -5), f'{value:.1f}%', ha='center')
+
+        figures[1].tight_layout()
+        if show:
+            plt.show()
+    return figures
+
+def _interval_bands(model, last_year, future_years, intervals):
+    # (method, years, lower, upper) per band, starting at the fitted value of the last data point
+    if intervals is None:
+        return []
+    years = np.concatenate([[last_year], np.ravel(future_years)])
+    start = model.predict_x([last_year])
+    # dtype=float turns the None of a stored record back into NaN
+    return [(method, years, np.concatenate([start, np.asarray(intervals[method]['lower'], dtype=float)]),
+             np.concatenate([start, np.asarray(intervals[method]['upper'], dtype=float)]))
+            for method in ('bootstrap', 'analytic')]
 
 def run_overtime_forecast(
     department_name: str,
-    dept_dfs: dict[str, pd.DataFrame],
+    dept_dfs: dict[str, pd.DataFrame] | pd.DataFrame,
     forecast_years: int = 2,
     test_degrees: list[int] = (2, 3, 4),
     x_column: str = 'YEAR',
@@ -484,10 +875,21 @@ def run_overtime_forecast(
     1. Check if the specified department exists.
     2. Call the polynomial_regression_forecast function.
     3. Print a formatted summary of the results.
+
+    dept_dfs is either a {department: DataFrame} dict or a cube from aggregate.build_cube/load_cube,
+    in which case the department's yearly sums are looked up from the cube.
+    With headless=True (passed through to polynomial_regression_forecast) nothing is printed.
     """
-    df = dept_dfs.get(department_name)
+    if isinstance(dept_dfs, pd.DataFrame):
+        # Only cubes need the ingestion side; importing it here keeps regression independent of it
+        from aggregate import department_frame
+        df = department_frame(dept_dfs, department_name)
+    else:
+        df = dept_dfs.get(department_name)
+    headless = other_kwargs.get('headless', False)
     if df is None:
-        print(f"[Error] Department '{department_name}' not found.")
+        if not headless:
+            print(f"[Error] Department '{department_name}' not found.")
         return None
 
     # If no title is provided, build a default title
@@ -506,6 +908,9 @@ def run_overtime_forecast(
         **other_kwargs
     )
 
+    if headless:
+        return results
+
     # Print a concise summary
     best = results['best_degree']
     r2 = results['metrics'][best]['r2']
@@ -515,4 +920,219 @@ def run_overtime_forecast(
     print(f"* R² score             : {r2:.4f}")
     print(f"* Model equation       : {eq}")
 
-    return results
\ No newline at end of file
+    return results
+
+def batch_forecast(
+    series,
+    forecast_years: int = 2,
+    test_degrees: list[int] = (2, 3, 4),
+    x_column: str = 'YEAR',
+    y_column: str = 'OVERTIME',
+    workers: int = None,
+    basis: str = 'scaled',
+    selection: str = 'loo',
+    folds: bool = False,
+    cache_dir: str = None,
+    intervals: str = None,
+    interval_level: float = 0.95
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fit every candidate degree for many series (e.g. every department) without plotting or printing.
+
+    Parameters:
+    -----------
+    series : dict or pandas.DataFrame
+        {name: DataFrame} like run_overtime_forecast's dept_dfs, or a cube from aggregate.build_cube
+    forecast_years : int, default=2
+        The number of years to forecast into the future
+    test_degrees : list, default=(2, 3, 4)
+        List of polynomial degrees to fit for every series
+    x_column, y_column : str
+        Year and value columns of each DataFrame
+    workers : int, default=None
+        Number of worker processes; None or 1 fits the series one after another
+    basis : str, default='scaled'
+        Fitting axis, see fit_polynomial_models
+    selection : str, default='loo'
+        How is_best is picked, see fit_polynomial_models
+    folds : bool, default=False
+        Also return the cross-validation error of every fold
+    cache_dir : str, default=None
+        Folder where the tables are kept between calls (see cache.py). Only series whose years or
+        values changed since the last call with the same settings are fitted again, e.g. after a
+        new year file was added; the rows of the other series are reused.
+    intervals : str, default=None
+        'analytic' or 'bootstrap' adds prediction interval columns (polyfit.prediction_intervals);
+        every series of a group is bootstrapped in the same batched solve
+    interval_level : float, default=0.95
+        Level of those intervals
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per (department, degree) with the columns department, degree, n_points, last_year,
+        r2, mse, cv_mse, condition_number, is_best and forecast_1 ... forecast_<forecast_years>
+        (values for last_year + 1, ...), then lower_1, upper_1 ... when intervals is given. cv_mse is
+        NaN when selection='r2'.
+        Series with fewer than two points are left out.
+    pandas.DataFrame, only when folds=True
+        One row per (department, degree, fold) with the columns department, degree, fold, year
+        (the held-out year) and error (actual minus predicted).
+    """
+    # Series with the same years share one design matrix and are solved together
+    groups = {}
+    if isinstance(series, pd.DataFrame):
+        # Cube: one (year x department) matrix, departments grouped by the years they have
+        wide = series[(y_column, 'sum')].unstack(level=0).sort_index()
+        present = wide.notna().to_numpy()
+        for order, name in enumerate(wide.columns):
+            mask = present[:, order]
+            if mask.sum() >= 2:
+                groups.setdefault(tuple(wide.index[mask].tolist()), []).append(
+                    (order, name, wide.iloc[:, order].to_numpy()[mask]))
+    else:
+        for order, (name, df) in enumerate(series.items()):
+            df = df[[x_column, y_column]].dropna().sort_values(x_column)
+            if len(df) >= 2:
+                groups.setdefault(tuple(df[x_column].tolist()), []).append(
+                    (order, name, df[y_column].to_numpy(dtype=float)))
+    reused, kept, keys = [], [], {}
+    if cache_dir:
+        groups, reused, kept, keys = _reuse_forecasts(groups, cache_dir, y_column, forecast_years, test_degrees,
+                                                basis, selection, intervals, interval_level)
+    jobs = [(np.array(years), [item[0] for item in items], [item[1] for item in items],
+             np.column_stack([item[2] for item in items])) for years, items in groups.items()]
+    args = [list(arg) for arg in zip(*jobs)] + \
+        [[forecast_years] * len(jobs), [list(test_degrees)] * len(jobs), [basis] * len(jobs), [selection] * len(jobs),
+         [intervals] * len(jobs), [interval_level] * len(jobs)]
+
+    with stage('batch_forecast', groups=len(jobs), workers=workers) as info:
+        if workers and workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_forecast_group, *args))
+        elif jobs:
+            results = list(map(_forecast_group, *args))
+        else:
+            results = []
+        info['rows'] = sum(len(job[1]) for job in jobs)
+
+    columns = ['department', 'degree', 'n_points', 'last_year', 'r2', 'mse', 'cv_mse', 'condition_number', 'is_best'] + \
+        [f'forecast_{step}' for step in range(1, forecast_years + 1)]
+    if intervals:
+        columns += [f'{bound}_{step}' for step in range(1, forecast_years + 1) for bound in ('lower', 'upper')]
+    fold_columns = ['department', 'degree', 'fold', 'year', 'error']
+    table_parts, fold_parts = [part[0] for part in results], [part[1] for part in results]
+    if cache_dir:
+        table, fold_table = _store_forecasts(table_parts, fold_parts, reused, kept, keys, cache_dir, y_column,
+                                             forecast_years, test_degrees, basis, selection, intervals,
+                                             interval_level, columns, fold_columns)
+    else:
+        table, fold_table = _stack_parts(table_parts, columns), _stack_parts(fold_parts, fold_columns)
+    if not folds:
+        return table
+    return table, fold_table
+
+def _forecast_cache_name(y_column, forecast_years, test_degrees, basis, selection, intervals, interval_level):
+    name = f"batch_forecast_{y_column}"
+    key = derived_key(name, [], forecast_years=forecast_years, test_degrees=list(test_degrees), basis=basis,
+                      selection=selection, intervals=intervals, interval_level=interval_level)
+    return name, key
+
+def _reuse_forecasts(groups, cache_dir, y_column, forecast_years, test_degrees, basis, selection, intervals,
+                     interval_level):
+    # Key every series by its name, years and values; stored rows with the same key are still valid
+    name, key = _forecast_cache_name(y_column, forecast_years, test_degrees, basis, selection, intervals,
+                                     interval_level)
+    keys = {order: derived_key(str(series_name), [list(years), values.tolist()])
+            for years, items in groups.items() for order, series_name, values in items}
+    orders = {series_key: order for order, series_key in keys.items()}
+    names = {series_name for items in groups.values() for _, series_name, _ in items}
+    reused, kept = [], []
+    for suffix in ('', '_folds'):
+        stored = load_cached(cache_dir, name + suffix, key)
+        if stored is None:
+            return groups, [], [], keys
+        # Rows of series this call does not have are stored again untouched; older versions of its
+        # series (same name, other values) are dropped
+        current = stored['_series_key'].isin(orders)
+        kept.append(stored[~current & ~stored['department'].isin(names)])
+        stored = stored[current]
+        degree_index = {degree: i for i, degree in enumerate(test_degrees)}
+        part = {col: stored[col].to_numpy() for col in stored.columns}
+        part['_order'] = stored['_series_key'].map(orders).to_numpy()
+        part['_degree'] = stored['degree'].map(degree_index).to_numpy()
+        reused.append(part)
+    done = set(reused[0]['_order'].tolist())
+    groups = {years: [item for item in items if item[0] not in done] for years, items in groups.items()}
+    return {years: items for years, items in groups.items() if items}, reused, kept, keys
+
+def _store_forecasts(table_parts, fold_parts, reused, kept, keys, cache_dir, y_column, forecast_years, test_degrees,
+                     basis, selection, intervals, interval_level, columns, fold_columns):
+    name, key = _forecast_cache_name(y_column, forecast_years, test_degrees, basis, selection, intervals,
+                                     interval_level)
+    tables = []
+    for suffix, parts, cols, old, other in (('', table_parts, columns, reused[:1], kept[:1]),
+                                            ('_folds', fold_parts, fold_columns, reused[1:], kept[1:])):
+        for part in parts:
+            part['_series_key'] = np.array([keys[order] for order in part['_order']], dtype=object)
+        table = _stack_parts(parts + old, cols + ['_series_key'])
+        store_cached(cache_dir, name + suffix, key, pd.concat([table] + other, ignore_index=True) if other else table)
+        tables.append(table[cols])
+    return tables
+
+def _stack_parts(parts, columns):
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    table = pd.DataFrame({col: np.concatenate([part[col] for part in parts]) for col in ['_order', '_degree'] + columns})
+    # Back to the order the series were given in, degrees in test_degrees order
+    table = table.sort_values(['_order', '_degree'], kind='stable')
+    return table[columns].reset_index(drop=True)
+
+def _forecast_group(years, orders, names, Y, forecast_years, test_degrees, basis='scaled', selection='loo',
+                    intervals=None, interval_level=0.95):
+    last_year = int(years[-1])
+    future_years = np.arange(last_year + 1, last_year + forecast_years + 1)
+    fit = fit_polynomials(years, Y, test_degrees, future_years, basis=basis)
+    m, n_degrees = len(names), len(test_degrees)
+    if selection == 'r2':
+        cv = {'held_out': np.empty(0), 'errors': {degree: np.empty((0, m)) for degree in test_degrees},
+              'cv_mse': {degree: np.full(m, np.nan) for degree in test_degrees}}
+        best = select_degree(test_degrees, fit['r2'])
+    else:
+        cv = cross_validate(years, Y, test_degrees, method=selection, basis=basis)
+        best = select_degree(test_degrees, fit['r2'], cv['cv_mse'], rounding_tolerance(Y))
+
+    # Columns of this group's rows, degree-major
+    columns = {
+        '_order': np.tile(orders, n_degrees),
+        '_degree': np.repeat(np.arange(n_degrees), m),
+        'department': np.tile(np.array(names, dtype=object), n_degrees),
+        'degree': np.repeat(test_degrees, m),
+        'n_points': np.full(m * n_degrees, len(years)),
+        'last_year': np.full(m * n_degrees, last_year),
+        'r2': np.concatenate([fit['r2'][degree] for degree in test_degrees]),
+        'mse': np.concatenate([fit['mse'][degree] for degree in test_degrees]),
+        'cv_mse': np.concatenate([cv['cv_mse'][degree] for degree in test_degrees]),
+        'condition_number': np.repeat([fit['condition_number'][degree] for degree in test_degrees], m),
+        'is_best': np.concatenate([best == i for i in range(n_degrees)])
+    }
+    for step in range(forecast_years):
+        columns[f'forecast_{step + 1}'] = np.concatenate([fit['forecast'][degree][step] for degree in test_degrees])
+    if intervals:
+        bounds = prediction_intervals(years, Y, test_degrees, future_years, interval_level, intervals, basis=basis)
+        for step in range(forecast_years):
+            for bound in ('lower', 'upper'):
+                columns[f'{bound}_{step + 1}'] = np.concatenate([bounds[bound][degree][step] for degree in test_degrees])
+
+    # Fold rows, degree-major then fold-major
+    n_folds = len(cv['held_out'])
+    fold_columns = {
+        '_order': np.tile(orders, n_degrees * n_folds),
+        '_degree': np.repeat(np.arange(n_degrees), m * n_folds),
+        'department': np.tile(np.array(names, dtype=object), n_degrees * n_folds),
+        'degree': np.repeat(test_degrees, m * n_folds),
+        'fold': np.tile(np.repeat(np.arange(n_folds), m), n_degrees),
+        'year': np.tile(np.repeat(cv['held_out'].astype(int), m), n_degrees),
+        'error': np.concatenate([cv['errors'][degree].ravel() for degree in test_degrees])
+    }
+    return columns, fold_columns
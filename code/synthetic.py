@@ -0,0 +1,276 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from process import EARNINGS_SCHEMA, clean_currency_column, resolve_schema
+
+# A currency amount inside a raw cell; the rest of the cell ('$', ' $(', ')', padding) is its template
+CURRENCY_NUMBER = re.compile(r'\d[\d,]*(?:\.\d*)?')
+# Marks where the amount goes in a template
+PLACEHOLDER = '\x00'
+# Most frequent values kept for the free-text columns (names, postal codes, unknown columns)
+TOP_VALUES = 5000
+
+
+# Learn what the yearly files look like: formats, distributions, missing values and cardinalities
+def learn_profile(folder_path, file_name, years, encoding, schema=EARNINGS_SCHEMA, quantiles=256) -> dict:
+    """
+    folder_path: str: Path to the folder containing the yearly files.
+    file_name: str: Base name of the files (without year), as for read_data.
+    years: list: Years to learn from; missing files are skipped.
+    encoding: str: Encoding of the files.
+    schema: dict: Column schema used to recognise the columns ('object' columns are currency, plus
+        _ID, NAME, DEPARTMENT_NAME and TITLE); other columns are sampled from their observed values.
+    quantiles: int: Number of quantiles kept of every currency column's amounts.
+
+    Returns {year: profile}, plain lists, dicts and numbers only, so it can be stored as JSON (with
+    the year keys turned into strings).
+    """
+    profile = {}
+    for year in years:
+        path = os.path.join(folder_path, f"{year}_{file_name}")
+        if os.path.exists(path):
+            profile[year] = _learn_year(path, year, encoding, schema, quantiles)
+    return profile
+
+
+# Write synthetic yearly files in the learned formats, readable by read_data
+def write_synthetic(profile, folder_path, file_name, years=None, scale=1.0, rows=None, encoding='ISO-8859-1',
+                    departments=None, seed=0, chunk_rows=200_000) -> list:
+    """
+    profile: dict: Result of learn_profile.
+    folder_path: str: Folder to write {year}_{file_name} to.
+    file_name: str: Base name of the files (without year).
+    years: list: Years to write. Years missing from the profile use the nearest learned year, so
+        any span of history can be written. None writes the learned years.
+    scale: float: Rows per year relative to the learned file. Ignored when rows is given.
+    rows: int: Rows per year.
+    encoding: str: Encoding of the written files.
+    departments: int: Number of departments to spread the rows over. Departments beyond the learned
+        ones copy the title mix of a learned department under a new name. None keeps the learned ones.
+    seed: int: Seed of the generator; the same arguments always write the same files.
+    chunk_rows: int: Rows generated and written at a time, which bounds memory whatever the size.
+
+    Returns the paths written.
+    """
+    profile = {int(year): year_profile for year, year_profile in profile.items()}
+    learned = sorted(profile)
+    paths = []
+    os.makedirs(folder_path, exist_ok=True)
+    for year in (learned if years is None else years):
+        year_profile = profile[min(learned, key=lambda known: (abs(known - year), known))]
+        rng = np.random.default_rng([seed, year])
+        total = rows if rows is not None else int(round(year_profile['rows'] * scale))
+
+        path = os.path.join(folder_path, f"{year}_{file_name}")
+        with open(path + '.tmp', 'w', encoding=encoding, newline='') as f:
+            pd.DataFrame(columns=year_profile['header']).to_csv(f, index=False, lineterminator='\n')
+            for start in range(0, total, chunk_rows):
+                chunk = generate_rows(year_profile, min(chunk_rows, total - start), rng, departments, start + 1)
+                chunk.to_csv(f, header=False, index=False, lineterminator='\n')
+        os.replace(path + '.tmp', path)
+        paths.append(path)
+    return paths
+
+
+# Generate rows of one year as the raw strings the file would contain
+def generate_rows(year_profile, rows, rng, departments=None, start_id=1) -> pd.DataFrame:
+    """
+    year_profile: dict: One year of learn_profile's result.
+    rows: int: Number of rows.
+    rng: np.random.Generator: Source of randomness.
+    departments: int: Number of departments, see write_synthetic.
+    start_id: int: First value of the ID column, if the year has one.
+    """
+    out = {}
+    if year_profile['id_column']:
+        out[year_profile['id_column']] = np.arange(start_id, start_id + rows).astype(str)
+
+    # Department first, then a title from that department's mix
+    dept = year_profile['departments']
+    dept_names = np.array(dept['values'], dtype=object)
+    picks = _sample(rng, dept['p'], rows)
+    department = dept_names[picks]
+    if departments and departments > len(dept_names):
+        # Extra departments: a learned department's title mix under a new, numbered name
+        extra = rng.integers(0, departments, rows) >= len(dept_names)
+        copies = -(-(departments - len(dept_names)) // len(dept_names))
+        suffix = rng.integers(2, copies + 2, rows).astype(str)
+        department = np.where(extra, department + ' ' + suffix, department)
+    title = np.empty(rows, dtype=object)
+    for i in np.unique(picks):
+        titles = year_profile['titles'][i]
+        at = picks == i
+        title[at] = np.array(titles['values'], dtype=object)[_sample(rng, titles['p'], at.sum())]
+    if year_profile['department_column']:
+        out[year_profile['department_column']] = department
+    if year_profile['title_column']:
+        out[year_profile['title_column']] = title
+
+    if year_profile['name_column']:
+        names = year_profile['name']
+        last = np.array(names['last']['values'], dtype=object)[_sample(rng, names['last']['p'], rows)]
+        first = np.array(names['first']['values'], dtype=object)[_sample(rng, names['first']['p'], rows)]
+        out[year_profile['name_column']] = last + ',' + first
+
+    out.update(_generate_currency(year_profile, rows, rng))
+
+    for col, values in year_profile['categorical'].items():
+        out[col] = np.array(values['values'], dtype=object)[_sample(rng, values['p'], rows)]
+    return pd.DataFrame({col: out[col] for col in year_profile['header']})
+
+
+def _learn_year(path, year, encoding, schema, quantiles):
+    # Raw cells as written: empty cells stay '' so the missing-value tokens are learned too
+    raw = pd.read_csv(path, encoding=encoding, dtype=str, keep_default_na=False)
+    header = list(raw.columns)
+    usecols, dtype, rename = resolve_schema(schema, year, header)
+    canonical = {col: rename.get(col, col) for col in usecols}
+    role = {name: col for col, name in canonical.items()}
+    currency = [col for col in usecols if dtype[col] == 'object']
+
+    year_profile = {
+        'rows': len(raw),
+        'header': header,
+        'id_column': role.get('_ID'),
+        'name_column': role.get('NAME'),
+        'department_column': role.get('DEPARTMENT_NAME'),
+        'title_column': role.get('TITLE'),
+        'currency': {col: _learn_currency(raw[col], quantiles) for col in currency},
+    }
+
+    # Which currency cells are blank or a zero token ('-') rather than an amount, as joint patterns,
+    # so columns that are blank together (no overtime, no injury pay, no detail) stay that way
+    numeric = np.column_stack([_is_amount(raw[col]) for col in currency]) if currency else np.empty((len(raw), 0))
+    patterns, counts = np.unique(numeric, axis=0, return_counts=True)
+    year_profile['patterns'] = {'values': patterns.astype(int).tolist(), 'p': (counts / counts.sum()).tolist()}
+
+    # TOTAL_GROSS is the sum of the other amounts in practice; keep it that way
+    total = role.get('TOTAL_GROSS')
+    parts = [col for col in currency if col != total]
+    year_profile['total'] = None
+    if total in currency and parts:
+        amounts = {col: clean_currency_column(raw[col].replace('', None), as_float=True).fillna(0).to_numpy()
+                   for col in currency}
+        matches = np.abs(sum(amounts[col] for col in parts) - amounts[total]) < 0.015
+        if matches.mean() > 0.99:
+            year_profile['total'] = {'column': total, 'parts': parts}
+
+    dept_col, title_col = year_profile['department_column'], year_profile['title_column']
+    departments = raw[dept_col] if dept_col else pd.Series([''] * len(raw))
+    titles = raw[title_col] if title_col else pd.Series([''] * len(raw))
+    dept_counts = departments.value_counts()
+    year_profile['departments'] = _frequencies(dept_counts)
+    pairs = pd.DataFrame({'department': departments, 'title': titles}).groupby('department')['title']
+    year_profile['titles'] = [_frequencies(pairs.get_group(name).value_counts()) for name in dept_counts.index]
+
+    if year_profile['name_column']:
+        parts_of_name = raw[year_profile['name_column']].str.partition(',')
+        year_profile['name'] = {
+            'last': _frequencies(parts_of_name[0].value_counts().head(TOP_VALUES)),
+            'first': _frequencies(parts_of_name[2].value_counts().head(TOP_VALUES)),
+        }
+
+    known = {year_profile['id_column'], year_profile['name_column'], dept_col, title_col, *currency}
+    year_profile['categorical'] = {col: _frequencies(raw[col].value_counts().head(TOP_VALUES))
+                                   for col in header if col not in known}
+    return year_profile
+
+
+def _learn_currency(values, quantiles):
+    templates = values.str.replace(CURRENCY_NUMBER, PLACEHOLDER, regex=True)
+    # Cells holding more than one number are too odd to reproduce
+    template_counts = templates[templates.str.count(PLACEHOLDER) <= 1].value_counts()
+    numbers = values.str.extract(f'({CURRENCY_NUMBER.pattern})', expand=False).dropna()
+    amounts = numbers.str.replace(',', '', regex=False).astype(float)
+    decimals = numbers.str.partition('.')[2].str.len()
+    positive = amounts[amounts > 0]
+    return {
+        'templates': template_counts.index.tolist(),
+        'p': (template_counts / template_counts.sum()).tolist(),
+        'thousands': bool(numbers.str.contains(',', regex=False).any()),
+        'decimals': int(decimals.mode().iloc[0]) if len(decimals) else 2,
+        'zero_share': float((amounts == 0).mean()) if len(amounts) else 0.0,
+        # Amounts span cents to millions: quantiles of log10 keep the tails
+        'log_quantiles': np.quantile(np.log10(positive), np.linspace(0, 1, quantiles)).tolist()
+        if len(positive) else [],
+    }
+
+
+def _generate_currency(year_profile, rows, rng):
+    currency = year_profile['currency']
+    columns = list(currency)
+    if not columns:
+        return {}
+    patterns = np.array(year_profile['patterns']['values'], dtype=bool).reshape(-1, len(columns))
+    is_amount = patterns[_sample(rng, year_profile['patterns']['p'], rows)]
+
+    out, amounts = {}, {}
+    total = year_profile['total']
+    for j, col in enumerate(columns):
+        spec = currency[col]
+        has_amount = np.array([PLACEHOLDER in t for t in spec['templates']])
+        negative = np.array([PLACEHOLDER in t and ('-' in t or '(' in t) for t in spec['templates']])
+
+        # Blank and token cells ('', '  -   ') come from the templates without an amount
+        pick = np.zeros(rows, dtype=int)
+        for wanted, at in ((False, ~is_amount[:, j]), (True, is_amount[:, j])):
+            choices = np.flatnonzero(has_amount == wanted)
+            if not at.any():
+                continue
+            if not len(choices):
+                # This column never has that kind of cell; use the other kind
+                choices = np.flatnonzero(has_amount != wanted)
+            p = np.array(spec['p'])[choices]
+            pick[at] = choices[_sample(rng, p, at.sum())]
+
+        filled = has_amount[pick]
+        values = np.zeros(rows)
+        if spec['log_quantiles']:
+            draws = np.interp(rng.random(filled.sum()), np.linspace(0, 1, len(spec['log_quantiles'])),
+                              spec['log_quantiles'])
+            values[filled] = np.where(rng.random(filled.sum()) < spec['zero_share'], 0.0, 10 ** draws)
+        values = np.round(values, spec['decimals'])
+        amounts[col] = np.where(negative[pick], -values, values)
+        if not total or col != total['column']:
+            out[col] = _fill(spec['templates'], pick, values, spec)
+
+    if total:
+        # Derived from the parts so every row adds up, in the column's usual format
+        col, spec = total['column'], currency[total['column']]
+        value = sum(amounts[part] for part in total['parts'])
+        templates = [t for t in spec['templates'] if PLACEHOLDER in t] or [PLACEHOLDER]
+        plain = [t for t in templates if '-' not in t and '(' not in t] or [PLACEHOLDER]
+        minus = [t for t in templates if '-' in t or '(' in t] or ['-' + plain[0]]
+        out[col] = _fill([plain[0], minus[0]], (value < 0).astype(int), np.abs(value), spec)
+    return out
+
+
+def _fill(templates, pick, values, spec):
+    fmt = f"{{:{',' if spec['thousands'] else ''}.{spec['decimals']}f}}".format
+    cells = np.empty(len(pick), dtype=object)
+    for i, template in enumerate(templates):
+        at = np.flatnonzero(pick == i)
+        if not len(at):
+            continue
+        if PLACEHOLDER not in template:
+            cells[at] = template
+            continue
+        prefix, suffix = template.split(PLACEHOLDER)
+        cells[at] = [prefix + fmt(value) + suffix for value in values[at]]
+    return cells
+
+
+def _is_amount(values):
+    return values.str.contains(r'\d', regex=True).to_numpy(dtype=bool)
+
+
+def _frequencies(counts):
+    return {'values': counts.index.tolist(), 'p': (counts / counts.sum()).tolist()}
+
+
+def _sample(rng, p, size):
+    p = np.asarray(p, dtype=float)
+    return rng.choice(len(p), size=size, p=p / p.sum())
@@ -0,0 +1,176 @@
+import fnmatch
+import os
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from cache import cache_key, load_cached, store_cached
+from instrument import finish, new_record, stage, submit
+
+# Excel and LibreOffice leave these next to an open workbook (~$2014_Details.xlsx, .~2013_Details.xlsx,
+# .~lock.2013_Details.xlsx#); they are not workbooks and openpyxl fails on them
+LOCK_PREFIXES = ('~$', '.~')
+
+
+# Check whether a file is an editor lock file rather than a workbook
+def is_lock_file(path) -> bool:
+    """
+    path: str: Path or name of the file.
+    """
+    return os.path.basename(path).startswith(LOCK_PREFIXES)
+
+
+# List the workbooks of a folder, leaving out lock files
+def list_workbooks(folder_path, pattern='*.xlsx') -> list:
+    """
+    folder_path: str: Folder holding the workbooks.
+    pattern: str: File name pattern, e.g. '*_Details.xlsx' or 'Court_Overtime_*.xlsx'.
+
+    Returns the matching paths sorted by name.
+    """
+    names = sorted(name for name in os.listdir(folder_path)
+                   if fnmatch.fnmatch(name, pattern) and not is_lock_file(name))
+    return [os.path.join(folder_path, name) for name in names]
+
+
+# Names of the sheets of a workbook, in workbook order
+def sheet_names(path, cache_dir=None) -> list:
+    """
+    path: str: Path of the workbook.
+    cache_dir: str: Folder for cached conversions (see read_sheets). None always opens the workbook.
+    """
+    if cache_dir:
+        key = cache_key(path, workbook='sheet_names')
+        cached = load_cached(cache_dir, path, key)
+        if cached is not None:
+            return cached['SHEET'].tolist()
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        names = workbook.sheetnames
+    finally:
+        workbook.close()
+
+    if cache_dir:
+        store_cached(cache_dir, path, key, pd.DataFrame({'SHEET': names}))
+    return names
+
+
+# Read sheets of a workbook into DataFrames, converting each sheet only once when a cache is given
+def read_sheets(path, sheets=None, usecols=None, cache_dir=None) -> dict:
+    """
+    path: str: Path of the workbook.
+    sheets: list: Sheet names or positions to read. None reads every sheet.
+    usecols: list: Header names of the columns to keep, in this order; names a sheet lacks are left
+        out. None keeps every column.
+    cache_dir: str: Folder for cached conversions. Each sheet is stored once per version of the
+        workbook (path, mtime, size) and selection of columns; later calls read the stored copy and
+        never parse the workbook again. None disables the cache.
+
+    Returns {sheet name: DataFrame} in the requested order, the same as pd.read_excel gives: the first
+    row of a sheet is its header (a blank header is 'Unnamed: <position>', a repeated one gets '.1',
+    '.2', ...), column types are inferred from the cells (numbers stored as text become numbers),
+    and trailing empty rows are dropped. Cells are read in openpyxl's read-only streaming mode, as
+    values (formula results).
+    """
+    if sheets is None or any(isinstance(sheet, int) for sheet in sheets):
+        names = sheet_names(path, cache_dir)
+        sheets = names if sheets is None else [names[sheet] if isinstance(sheet, int) else sheet
+                                               for sheet in sheets]
+    usecols = list(usecols) if usecols is not None else None
+
+    frames, keys = {}, {}
+    for sheet in sheets:
+        if cache_dir:
+            info = new_record('read_sheet', path=path, sheet=sheet)
+            keys[sheet] = cache_key(path, workbook='sheet', sheet=sheet, usecols=usecols)
+            frames[sheet] = load_cached(cache_dir, path, keys[sheet])
+            # Misses are recorded once the sheet has been parsed
+            if frames[sheet] is not None:
+                info.update(rows=len(frames[sheet]), cache_hit=True)
+                submit(finish(info))
+
+    missing = [sheet for sheet in sheets if frames.get(sheet) is None]
+    if missing:
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+        try:
+            for sheet in missing:
+                with stage('read_sheet', path=path, sheet=sheet) as info:
+                    frames[sheet] = _read_worksheet(workbook[sheet], usecols)
+                    info.update(rows=len(frames[sheet]), cache_hit=False if cache_dir else None)
+                    if cache_dir:
+                        store_cached(cache_dir, path, keys[sheet], frames[sheet])
+        finally:
+            workbook.close()
+    return {sheet: frames[sheet] for sheet in sheets}
+
+
+# Read one sheet of a workbook, the first one by default
+def read_sheet(path, sheet=0, usecols=None, cache_dir=None) -> pd.DataFrame:
+    """
+    path: str: Path of the workbook.
+    sheet: str or int: Sheet name or position.
+    usecols, cache_dir: Same as read_sheets.
+    """
+    return next(iter(read_sheets(path, [sheet], usecols, cache_dir).values()))
+
+
+# Read the sheets of every workbook in a folder into one DataFrame
+def read_workbooks(folder_path, pattern='*.xlsx', sheets=None, usecols=None, cache_dir=None) -> pd.DataFrame:
+    """
+    folder_path, pattern: Same as list_workbooks; lock files are skipped.
+    sheets, usecols, cache_dir: Same as read_sheets, applied to every workbook.
+
+    Returns the rows of all sheets with SOURCE (workbook file name) and SHEET columns added, e.g. the
+    Court_Overtime workbooks, which hold one sheet per year.
+    """
+    frames = []
+    for path in list_workbooks(folder_path, pattern):
+        for sheet, df in read_sheets(path, sheets, usecols, cache_dir).items():
+            frames.append(df.assign(SOURCE=os.path.basename(path), SHEET=sheet))
+    if not frames:
+        return pd.DataFrame(columns=(usecols or []) + ['SOURCE', 'SHEET'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _read_worksheet(worksheet, usecols):
+    # The dimension stored in a file can be wrong (files written by other tools); scan the real extent
+    worksheet.reset_dimensions()
+    header = next(worksheet.iter_rows(max_row=1, values_only=True), None)
+    if header is None:
+        return pd.DataFrame(columns=usecols or [])
+    header = list(header)
+    while header and header[-1] is None:
+        header.pop()
+    # pd.read_excel's parser names the columns, so blank and repeated headers come out the same
+    header = list(TextParser([[_excel_cell(value) for value in header]], header=0).read().columns)
+    if usecols is None:
+        positions = list(range(len(header)))
+    else:
+        positions = [header.index(col) for col in usecols if col in header]
+    columns = [header[i] for i in positions]
+    if not positions:
+        return pd.DataFrame(columns=columns)
+
+    # Trailing rows are dropped when the whole row is empty, not just its selected cells, as pd.read_excel does
+    data, last = [], 0
+    for row in worksheet.iter_rows(min_row=2, values_only=True):
+        data.append([row[i] if i < len(row) else None for i in positions])
+        if any(value is not None for value in row):
+            last = len(data)
+    del data[last:]
+    if not data:
+        return pd.DataFrame(columns=columns)
+    # Cells converted and types inferred as pd.read_excel does (e.g. an ID column stored as text is int64)
+    return TextParser([[_excel_cell(value) for value in row] for row in data], header=None, names=columns).read()
+
+
+def _excel_cell(value):
+    # pandas' openpyxl reader: empty cells are '', whole floats are ints
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
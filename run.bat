@@ -1,20 +1,8 @@
 @echo off
-REM Save as convert_to_html.bat
+REM Run every analysis of the notebooks and write the results to output\
+REM Extra arguments are passed on, e.g. run.bat --figures --format csv parquet (see python code\pipeline.py --help)
 
-REM Convert q1.ipynb
-jupyter nbconvert --to html --execute "code/q1.ipynb" --output "../output/q1.html"
-echo Converted notebook saved to: ../output/q1.html
-
-REM Convert q2_4.ipynb
-jupyter nbconvert --to html --execute "code/q2_4.ipynb" --output "../output/q2_4.html"
-echo Converted notebook saved to: ../output/q2_4.html
-
-REM Convert q3_5.ipynb
-jupyter nbconvert --to html --execute "code/q3_5.ipynb" --output "../output/q3_5.html"
-echo Converted notebook saved to: ../output/q3_5.html
-
-REM Convert q6_7.ipynb
-jupyter nbconvert --to html --execute "code/q6_7.ipynb" --output "../output/q6_7.html"
-echo Converted notebook saved to: ../output/q6_7.html
+cd /d "%~dp0"
+python code\pipeline.py --output output %*
 
 pause
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the modules in code/ importable the same way the notebooks import them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code'))
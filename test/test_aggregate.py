@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from aggregate import aggregate_chunks, build_cube, department_frame, department_frames, load_cube
+
+
+def make_chunk(year, depts, overtime):
+    return pd.DataFrame({'DEPARTMENT_NAME': depts, 'YEAR': year, 'OVERTIME': overtime,
+                         'REGULAR': [100.0] * len(depts)})
+
+
+def test_aggregate_chunks_matches_groupby():
+    chunks = [
+        make_chunk(2020, ['Police', 'Fire', 'Police'], [10.0, np.nan, 5.0]),
+        make_chunk(2020, ['Police', 'Parks'], [1.0, 2.0]),
+        make_chunk(2021, ['Fire'], [np.nan]),
+    ]
+    result = aggregate_chunks(iter(chunks), columns=['OVERTIME', 'REGULAR', 'DETAIL'])
+    expected = pd.concat(chunks).groupby(['DEPARTMENT_NAME', 'YEAR'])[['OVERTIME', 'REGULAR']] \
+        .agg(['sum', 'count', 'mean'])
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+    assert result.loc[('Police', 2020), ('OVERTIME', 'count')] == 3
+
+
+def test_aggregate_chunks_empty():
+    assert aggregate_chunks([]).empty
+
+
+def test_cube_lookups():
+    chunks = [make_chunk(2020, ['Police', 'Fire'], [10.0, 3.0]), make_chunk(2021, ['Police'], [12.0])]
+    cube = build_cube(chunks, columns=['OVERTIME'])
+
+    police = department_frame(cube, 'Police')
+    assert list(police.columns) == ['YEAR', 'OVERTIME']
+    assert police['OVERTIME'].tolist() == [10.0, 12.0]
+    assert department_frame(cube, 'Parks') is None
+    assert department_frame(cube, 'Fire', stat='count')['OVERTIME'].tolist() == [1]
+
+    frames = department_frames(cube)
+    assert list(frames) == ['Fire', 'Police']
+    pd.testing.assert_frame_equal(frames['Police'], police)
+    assert list(department_frames(cube, departments=['Police', 'Parks'])) == ['Police']
+
+
+def test_load_cube_uses_cache(tmp_path, capsys):
+    pd.DataFrame({'DEPARTMENT_NAME': ['Police', 'Fire'], 'OVERTIME': ['$1,000.00', '-']}) \
+        .to_csv(tmp_path / '2020_earnings.csv', index=False)
+    args = (str(tmp_path), 'earnings.csv', [2020], 'utf-8', ['OVERTIME'], [])
+
+    first = load_cube(*args, cache_dir=str(tmp_path / 'cache'), columns=['OVERTIME'])
+    second = load_cube(*args, cache_dir=str(tmp_path / 'cache'), columns=['OVERTIME'])
+
+    assert "Read cached cube for:" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(first, second)
+    assert second.loc[('Police', 2020), ('OVERTIME', 'sum')] == 1000.0
+
+
+def test_load_cube_reads_only_new_years(tmp_path, capsys):
+    for year, overtime in ((2020, '$1,000.00'), (2021, '$2,000.00')):
+        pd.DataFrame({'DEPARTMENT_NAME': ['Police', 'Fire'], 'OVERTIME': [overtime, '$5.00']}) \
+            .to_csv(tmp_path / f"{year}_earnings.csv", index=False)
+    args = (str(tmp_path), 'earnings.csv')
+    kwargs = dict(encoding='utf-8', target_col=['OVERTIME'], drop_col=[], cache_dir=str(tmp_path / 'cache'),
+                  columns=['OVERTIME'])
+    load_cube(*args, [2020, 2021], **kwargs)
+    capsys.readouterr()
+
+    pd.DataFrame({'DEPARTMENT_NAME': ['Police', 'Parks'], 'OVERTIME': ['$3,000.00', '$7.00']}) \
+        .to_csv(tmp_path / '2022_earnings.csv', index=False)
+    cube = load_cube(*args, [2020, 2021, 2022], **kwargs)
+
+    out = capsys.readouterr().out
+    assert "2022_earnings.csv" in out
+    assert "2020_earnings.csv" not in out and "2021_earnings.csv" not in out
+    rebuilt = load_cube(*args, [2020, 2021, 2022], **{**kwargs, 'cache_dir': None})
+    pd.testing.assert_frame_equal(cube, rebuilt, check_index_type=False)
+    assert cube.loc[('Parks', 2022), ('OVERTIME', 'sum')] == 7.0
+
+
+def test_load_cube_does_not_cache_failed_year(tmp_path, capsys):
+    (tmp_path / '2020_earnings.csv').write_bytes(b'DEPARTMENT_NAME,OVERTIME\nPolice,$1.00\nFire\xff\xfe,$2.00\n')
+    args = (str(tmp_path), 'earnings.csv', [2020], 'utf-8', ['OVERTIME'], [])
+    kwargs = dict(cache_dir=str(tmp_path / 'cache'), columns=['OVERTIME'], chunksize=1)
+
+    assert load_cube(*args, **kwargs).empty
+    assert "Error processing" in capsys.readouterr().out
+    load_cube(*args, **kwargs)
+
+    out = capsys.readouterr().out
+    assert "Error processing" in out and "Read cached cube for:" not in out
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from aggregate import build_cube
+from budget import budget_vs_actual, department_index, department_key, load_budget, match_departments
+
+
+@pytest.fixture
+def budget_file(tmp_path):
+    path = tmp_path / 'budget.csv'
+    pd.DataFrame({
+        'Cabinet': ['Public Safety', 'Public Safety', 'Education', 'Operations'],
+        'Dept': ['Police Department', 'Police Department', 'Boston Public Schools', 'Library Department'],
+        'Program': ['A', 'B', 'C', 'D'],
+        'Expense Category': ['Personnel Services', 'Overtime', 'Personnel Services', 'Personnel Services'],
+        'FY22 Actual Expense': ['100', '5', '1,000', '#Missing'],
+        'FY23 Budget': ['110', '6', '1,100', '50'],
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_load_budget_is_long(budget_file):
+    budget = load_budget(str(budget_file))
+
+    assert len(budget) == 8
+    assert budget['FISCAL_YEAR'].unique().tolist() == [2022, 2023]
+    assert budget['KIND'].astype(str).unique().tolist() == ['actual expense', 'budget']
+    library = budget[budget['DEPT'] == 'Library Department']['AMOUNT'].tolist()
+    assert pd.isna(library[0]) and library[1] == 50
+    assert budget.loc[2, 'AMOUNT'] == 1000
+
+
+def test_department_key():
+    assert department_key('Boston Police Department') == department_key('POLICE DEPT') == 'POLICE'
+    assert department_key('Dpt of Innovation & Technology') == department_key('Department of Innovation and Technology')
+    assert department_key('Mayor\'s Office ofWorkforce') == 'MAYORS OFFICE WORKFORCE'
+
+
+def test_match_departments(budget_file):
+    index = department_index(load_budget(str(budget_file))['DEPT'].astype(str).unique())
+    names = pd.Series(['Boston Police Department', 'Boston Public Library', 'Mattapan EEC', 'Parks Department',
+                       'Boston Police Department'], index=[5, 6, 7, 8, 9])
+
+    matched = match_departments(names, index)
+
+    assert matched.index.tolist() == [5, 6, 7, 8, 9]
+    assert matched.tolist()[:3] == ['Police Department', 'Library Department', 'Boston Public Schools']
+    assert pd.isna(matched[8])
+    assert matched[9] == 'Police Department'
+
+
+def test_budget_vs_actual(budget_file):
+    earnings = pd.DataFrame({
+        'DEPARTMENT_NAME': ['Boston Police Department', 'Mattapan EEC', 'Quincy Upper School', 'Boston Police Department'],
+        'YEAR': [2022, 2022, 2022, 2022],
+        'TOTAL_GROSS': [60.0, 300.0, 400.0, 30.0],
+    })
+    cube = build_cube(earnings, columns=['TOTAL_GROSS'])
+    forecasts = pd.DataFrame({
+        'department': ['Boston Police Department', 'Boston Police Department', 'Mattapan EEC', 'Closed School'],
+        'last_year': [2022, 2022, 2022, 2020],
+        'is_best': [True, False, True, True],
+        'forecast_1': [120.0, 999.0, 500.0, 999.0],
+    })
+
+    table = budget_vs_actual(cube, load_budget(str(budget_file)), forecasts).set_index(['DEPT', 'YEAR'])
+
+    police = table.loc[('Police Department', 2022)]
+    assert police['BUDGET'] == 100 and police['ACTUAL'] == 90 and police['ACTUAL_TO_BUDGET'] == 0.9
+    schools = table.loc[('Boston Public Schools', 2022)]
+    assert schools['ACTUAL'] == 700 and schools['DEPARTMENTS'] == 2
+    assert table.loc[('Police Department', 2023), 'FORECAST'] == 120
+    assert table.loc[('Boston Public Schools', 2023), 'FORECAST_TO_BUDGET'] == pytest.approx(500 / 1100)
+    assert pd.isna(table.loc[('Library Department', 2022), 'ACTUAL'])
+    assert table.loc[('Library Department', 2022), 'DEPARTMENTS'] == 0
@@ -1,3 +1,9 @@
+import numpy as np
+import pandas as pd
+
+from process import clean_currency_column
+
+
 def clean_currency(val):
     if isinstance(val, str):
         val = val.replace('$', '').replace(',', '').replace('(', '').replace(')', '').strip()
@@ -70,4 +76,42 @@ class TestCleanCurrency:
         assert clean_currency("$0.00") is None
         assert clean_currency("0") == 0.0
         assert clean_currency("$0") == 0.0
-        assert clean_currency("$0.01") == 0.01
\ No newline at end of file
+        assert clean_currency("$0.01") == 0.01
+
+
+class TestCleanCurrencyColumn:
+    values = ["$100", "1,000,000", "($123,456.78)", " $ 1,234.56 ", "-", " 0.00 ", "$0.00",
+              "   -   ", "-$1,000.50", "$-123.45", "0", "$0.01", np.nan]
+
+    def test_matches_clean_currency(self):
+        """Test the column parser agrees with clean_currency cell by cell"""
+        for dtype in (object, "str"):
+            series = pd.Series(self.values, dtype=dtype)
+            result = clean_currency_column(series)
+            for got, val in zip(result, series):
+                expected = clean_currency(val)
+                if expected is None:
+                    assert got is None
+                elif isinstance(expected, float) and np.isnan(expected):
+                    assert np.isnan(got)
+                else:
+                    assert got == expected
+
+    def test_as_float(self):
+        """Test the float64 mode fills NaN where clean_currency gives None"""
+        result = clean_currency_column(pd.Series(self.values), as_float=True)
+        expected = pd.Series(self.values).apply(clean_currency).astype("float64")
+        assert result.dtype == np.float64
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+    def test_non_string_values_kept(self):
+        """Test non-string cells pass through unchanged"""
+        result = clean_currency_column(pd.Series([100, None, "$5", [1, 2]], dtype=object))
+        assert result.tolist() == [100, None, 5.0, [1, 2]]
+        assert clean_currency_column(pd.Series([1.5, 2.0])).tolist() == [1.5, 2.0]
+
+    def test_string_dtype_with_missing(self):
+        """Test a 'string' dtype column with pd.NA gives NaN there in float64 mode"""
+        series = pd.Series(["$1,000.00", pd.NA, "-", "(5)"], dtype="string")
+        result = clean_currency_column(series, as_float=True)
+        np.testing.assert_array_equal(result.to_numpy(), [1000.0, np.nan, np.nan, 5.0])
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from employees import build_employee_index, injury_prevalence, name_key, pay_growth, postal_key
+
+
+@pytest.fixture
+def earnings():
+    return pd.DataFrame({
+        'NAME': ['Doe,Jane', 'Smith,John', 'Smith,John', 'Roe,Rick',
+                 'Smith,John', 'Doe,Jane ', 'Smith,John', 'Roe,Rick',
+                 'SMITH, JOHN', 'Doe,Jane'],
+        'DEPARTMENT_NAME': ['Boston Police Department', 'Library', 'Boston Police Department', 'Fire',
+                            'Boston Police Department', 'Boston Police Department', 'Library', 'Fire',
+                            'Boston Police Department', 'Auditing'],
+        'TITLE': ['Police Officer', 'Librarian', 'Police Officer', 'Fire Fighter',
+                  'Police Sergeant', 'Police Officer', 'Librarian', 'Fire Fighter',
+                  'Police Sergeant', 'Auditor'],
+        'POSTAL': ['02128', '02130', '02131-1234', '2124', '2131', '02128', '02130', '02124', '02131', '02128'],
+        'YEAR': [2020] * 4 + [2021] * 4 + [2022] * 2,
+        'TOTAL_GROSS': [100.0, 50.0, 80.0, 90.0, 88.0, 110.0, 55.0, 90.0, 96.0, 60.0],
+        'INJURED': [10.0, np.nan, 0.0, np.nan, 5.0, 1.0, np.nan, np.nan, np.nan, np.nan],
+    })
+
+
+def test_keys():
+    assert name_key(['Adams,Ann E.', 'ADAMS, ANN  E', None]).tolist() == ['ADAMS,ANN E', 'ADAMS,ANN E', '']
+    assert postal_key(['02118-3126', '2118', None]).tolist()[:2] == ['02118', '02118']
+
+
+def test_index_follows_people(earnings):
+    index = build_employee_index(earnings)
+
+    jane, rick = index.find('Doe,Jane')[0], index.find('roe, rick')[0]
+    librarian, officer = index.find('Smith,John')
+    assert len(index) == 4
+    assert index.history(jane, earnings['DEPARTMENT_NAME']).to_dict() == {
+        2020: 'Boston Police Department', 2021: 'Boston Police Department', 2022: 'Auditing'}
+    # Two John Smiths: the one who stays in the police department keeps his ID through a promotion
+    assert index.employee_rows(officer).tolist() == [2, 4, 8]
+    assert index.employee_rows(librarian).tolist() == [1, 6]
+    assert index.year_rows(2021).tolist() == [4, 5, 6, 7]
+    assert index.year_rows(2019).tolist() == []
+    assert index.counts().tolist() == [4, 4, 2]
+
+    pay = index.matrix(earnings['TOTAL_GROSS'])
+    assert pay.shape == (4, 3)
+    assert pay[rick].tolist()[:2] == [90.0, 90.0] and np.isnan(pay[rick, 2])
+
+
+def test_index_splits_namesakes_who_never_overlap():
+    earnings = pd.DataFrame({
+        'NAME': ['Lee,Ann', 'Lee,Ann', 'Lee,Ann', 'Kim,Bo', 'Kim,Bo'],
+        'DEPARTMENT_NAME': ['Library', 'Library', 'Boston Police Department', 'Fire', 'Library'],
+        'TITLE': ['Librarian', 'Librarian', 'Police Officer', 'Fire Fighter', 'Librarian'],
+        'POSTAL': ['02130', '02130', '02124', '2118', '02118-4000'],
+        'YEAR': [2013, 2014, 2018, 2013, 2018],
+    })
+    index = build_employee_index(earnings)
+
+    # The Ann Lee who joins the police in 2018 agrees with the librarian on nothing
+    assert [index.employee_rows(e).tolist() for e in index.find('Lee,Ann')] == [[0, 1], [2]]
+    # Bo Kim changed department and title but not ZIP code, however it is spelled
+    assert [index.employee_rows(e).tolist() for e in index.find('Kim,Bo')] == [[3, 4]]
+    assert len(index) == 3
+
+
+def test_injury_prevalence_and_growth(earnings):
+    index = build_employee_index(earnings)
+
+    injury = injury_prevalence(earnings, index)
+    assert injury['EMPLOYEES'].tolist() == [2, 2, 1]
+    assert injury['INJURED'].tolist() == [1, 2, 0]
+    assert injury['INJURED_PERCENTAGE'].tolist() == [50.0, 100.0, 0.0]
+    assert injury['REPEAT'].tolist() == [0, 1, 0]
+    assert injury['RETURNING'].tolist() == [0, 1, 0]
+
+    growth = pay_growth(earnings, index, department='POLICE')
+    assert growth['EMPLOYEES'].tolist() == [2, 1]
+    assert growth['MEDIAN_GROWTH'].tolist() == pytest.approx([10.0, 96 / 88 * 100 - 100])
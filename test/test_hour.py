@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from process import correct_hours_array, process_hours_columns
+
 
 def correct_hours_worked(val):
     if pd.isna(val):
@@ -38,3 +41,22 @@ def test_correct_hours_worked_with_pytest():
     assert correct_hours_worked(24) is None
     assert correct_hours_worked(100) == 1.0
     assert correct_hours_worked(2400) == 24.0
+
+
+def test_correct_hours_array_matches_scalar():
+    values = [8.5, 0, 23.99, 1230, 2345, -5, 25, 3000, float('nan'), 24, 100, 2400, 630.0, 1230.7, np.inf]
+    expected = [correct_hours_worked(v) for v in values]
+    expected = np.array([np.nan if v is None else v for v in expected])
+
+    np.testing.assert_array_equal(correct_hours_array(np.array(values, dtype=float)), expected)
+    np.testing.assert_array_equal(correct_hours_array(np.array(values + [pd.NA, "1230"], dtype=object)),
+                                  np.append(expected, [np.nan, np.nan]))
+
+
+def test_process_hours_columns_several_columns():
+    df = pd.DataFrame({"Hours Worked": [8.5, 1230, 25], "Hours Paid": [2400, np.nan, 4.0], "Rank": ["a", "b", "c"]})
+    processed = process_hours_columns([df], hours_worked_col=["Hours Worked", "Hours Paid", "Missing"])[0]
+
+    np.testing.assert_array_equal(processed["Hours Worked"].to_numpy(), [8.5, 12.5, np.nan])
+    np.testing.assert_array_equal(processed["Hours Paid"].to_numpy(), [24.0, np.nan, 4.0])
+    assert processed["Rank"].tolist() == ["a", "b", "c"]
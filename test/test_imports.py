@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+CODE_DIR = os.path.join(os.path.dirname(__file__), '..', 'code')
+
+# Modules importing process or regression must not load; they used to add about 2s to regression's
+# import (its time is measured by bench/benchmarks.py's import cases)
+LIGHT_MODULES = ('process', 'regression')
+HEAVY_MODULES = ('matplotlib', 'plotly', 'sklearn')
+
+
+def run_fresh(code):
+    # A new interpreter, so nothing imported by other tests is already cached
+    out = subprocess.run([sys.executable, '-c', code], cwd=CODE_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', LIGHT_MODULES)
+def test_import_skips_heavy_modules(module):
+    result = run_fresh(f"""
+import json, sys
+import {module}
+print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}} & {set(HEAVY_MODULES)!r})))
+""")
+    assert result == []
+
+
+def test_headless_forecast_does_not_import_plotting():
+    result = run_fresh(f"""
+import json, sys
+import numpy as np, pandas as pd
+from regression import batch_forecast, polynomial_regression_forecast
+df = pd.DataFrame({{'YEAR': np.arange(2011, 2025), 'OVERTIME': np.arange(14.0) ** 2}})
+polynomial_regression_forecast(df, 'YEAR', 'OVERTIME', headless=True)
+batch_forecast({{'A': df}})
+print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}} & {set(HEAVY_MODULES)!r})))
+""")
+    assert result == []
+
+
+def test_regression_does_not_import_ingestion():
+    result = run_fresh("""
+import json, sys
+import regression
+print(json.dumps(sorted({'aggregate', 'process', 'workbook'} & set(sys.modules))))
+""")
+    assert result == []
@@ -0,0 +1,84 @@
+import json
+
+import pandas as pd
+import pytest
+
+from instrument import profile, stage
+from process import read_data, read_data_chunks
+
+TARGET_COL = ['REGULAR', 'OVERTIME']
+
+
+@pytest.fixture
+def earnings_folder(tmp_path):
+    for year, rows in ((2020, 3), (2021, 5)):
+        pd.DataFrame({
+            'NAME': [f"Doe,Jane {i}" for i in range(rows)],
+            'DEPARTMENT_NAME': ['Boston Police Department'] * rows,
+            'REGULAR': [f"${1000 * (i + 1):,}.50" for i in range(rows)],
+            'OVERTIME': ['$10.00'] * rows,
+        }).to_csv(tmp_path / f"{year}_earnings.csv", index=False)
+    return tmp_path
+
+
+def test_stage_is_noop_without_profiler():
+    with stage('idle') as info:
+        info['rows'] = 1
+    with profile() as profiler:
+        pass
+    assert profiler.records == []
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_read_data_records_years(earnings_folder, workers, tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp('cache'))
+    read_data(str(earnings_folder), 'earnings.csv', [2020, 2021], 'utf-8', TARGET_COL, [],
+              workers=workers, cache_dir=cache_dir)
+
+    seen = []
+    with profile(callback=seen.append) as profiler:
+        read_data(str(earnings_folder), 'earnings.csv', [2020, 2021, 2019], 'utf-8', TARGET_COL, [],
+                  workers=workers, cache_dir=cache_dir)
+
+    assert seen == profiler.records
+    years = [record for record in profiler.records if record['name'] == 'read_year']
+    assert [record['args']['year'] for record in years] == [2020, 2021, 2019]
+    assert [record['rows'] for record in years] == [3, 5, None]
+    assert [record['cache_hit'] for record in years] == [True, True, None]
+    assert years[0]['bytes'] == (earnings_folder / '2020_earnings.csv').stat().st_size
+
+    totals = profiler.totals()
+    assert totals['read_data'] == {'count': 1, 'seconds': pytest.approx(totals['read_data']['seconds']),
+                                   'rows': 8, 'bytes': 0, 'cache_hits': 0}
+    assert totals['read_year']['cache_hits'] == 2
+
+
+def test_chunks_and_exports(earnings_folder, tmp_path):
+    with profile() as profiler:
+        chunks = list(read_data_chunks(str(earnings_folder), 'earnings.csv', [2020, 2021], 'utf-8',
+                                       TARGET_COL, [], chunksize=2))
+    assert [record['rows'] for record in profiler.records] == [len(chunk) for chunk in chunks] == [2, 1, 2, 2, 1]
+
+    document = profiler.to_json(tmp_path / 'stages.json')
+    assert json.loads((tmp_path / 'stages.json').read_text())['totals']['read_chunk']['rows'] == 8
+    assert all(stage['start'] >= 0 for stage in document['stages'])
+
+    trace = profiler.to_chrome_trace(tmp_path / 'trace.json')
+    assert json.loads((tmp_path / 'trace.json').read_text()) == json.loads(json.dumps(trace))
+    event = trace['traceEvents'][0]
+    assert event['ph'] == 'X' and event['name'] == 'read_chunk'
+    assert event['args']['rows'] == 2 and event['args']['year'] == 2020
+    assert event['dur'] >= 0
+
+
+def test_stage_memory_fields():
+    with profile() as profiler:
+        with stage('allocate'):
+            block = bytearray(64 * 2**20)
+            block[::4096] = b'x' * len(block[::4096])
+    record = profiler.records[0]
+    assert record['process_max_rss_mb'] > 0 and 'max_rss_mb' not in record
+    if record['rss_start_mb'] is not None:
+        # The 64 MB touched inside the stage are still resident at its end
+        assert record['rss_delta_mb'] > 32
+    assert 'process_max_rss_mb' in profiler.to_json()
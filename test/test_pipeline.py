@@ -0,0 +1,94 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pipeline import consistent_departments, load_earnings, main, run_pipeline
+
+DEPARTMENTS = ['Boston Police Department', 'Boston Fire Department', 'Library']
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'earning').mkdir()
+    for year in range(2018, 2023):
+        step = year - 2017
+        pd.DataFrame({
+            'NAME': ['Doe,Jane', 'Roe,Rick', 'Poe,Pam', 'Moe,Max'],
+            'DEPARTMENT_NAME': DEPARTMENTS + ['Boston Police Department'],
+            'TITLE': ['Police Officer', 'Fire Fighter', 'Librarian', 'Police Officer'],
+            'REGULAR': ['$90,000.00', '$80,000.00', '$50,000.00', '$70,000.00'],
+            'OVERTIME': [f"${1000 * step ** 2:,}.00", f"${500 * step:,}.00", '$10.00', '$1,000.00'],
+            'INJURED': [f"${100 * step}.00", '', '', ''],
+            'TOTAL_GROSS': ['$100,000.00', '$90,000.00', '$50,010.00', '$71,000.00'],
+            'POSTAL': ['02128', '02130', '02131', '02128'],
+        }).to_csv(tmp_path / 'earning' / f"{year}_earnings.csv", index=False)
+    (tmp_path / 'budget').mkdir()
+    pd.DataFrame({
+        'Cabinet': ['Public Safety'] * 3, 'Dept': ['Police', 'Police', 'Fire'], 'Program': ['A', 'B', 'C'],
+        'Expense Category': ['Personnel Services', 'Overtime', 'Personnel Services'],
+        'FY22 Actual Expense': [1, 2, 3], 'FY23 Actual Expense': [4, 5, '#Missing'],
+        'FY24 Appropriation': [7, 8, 9], 'FY25 Budget': [10, 11, 12],
+    }).to_csv(tmp_path / 'budget' / 'fy25-adopted-operating-budget.csv', index=False)
+    return tmp_path
+
+
+def test_consistent_departments(data_dir):
+    data = load_earnings(str(data_dir), range(2018, 2023))
+
+    assert len(data['earnings']) == 20
+    assert consistent_departments(data['cube'], 'OVERTIME', 2) == DEPARTMENTS[:2]
+    assert consistent_departments(data['cube'], 'OVERTIME', 3) == DEPARTMENTS
+
+
+def test_run_pipeline_writes_tables(data_dir, tmp_path):
+    output = tmp_path / 'output'
+    summary = run_pipeline(str(data_dir), str(output), years=range(2018, 2023), formats=['csv', 'parquet'],
+                           workers=2, degrees=[1, 2], top_overtime=2)
+
+    assert summary['errors'] == {}
+    assert set(summary['earnings_memory_mb']) == {'before', 'after'}
+    assert json.loads((output / 'summary.json').read_text())['outputs'] == summary['outputs']
+    assert summary['outputs']['top_overtime'] == [str(output / 'top_overtime.csv'), str(output / 'top_overtime.parquet')]
+
+    top = pd.read_parquet(output / 'top_overtime.parquet')
+    assert top[top['YEAR'] == 2022][['RANK', 'DEPARTMENT_NAME']].values.tolist() == [
+        [1, 'Boston Police Department'], [2, 'Boston Fire Department']]
+
+    injury = pd.read_csv(output / 'police_injury_pay.csv')
+    assert injury['INJURED_COUNT'].tolist() == [1] * 5
+    assert injury['INJURED_PERCENTAGE'].tolist() == [50.0] * 5
+    # Only the police's own postal codes, not every code of the shared POSTAL categories
+    postal = pd.read_csv(output / 'police_postal_overtime.csv', dtype={'POSTAL': str})
+    assert postal['POSTAL'].tolist() == ['02128']
+
+    budget = pd.read_csv(output / 'budget_by_category.csv').set_index('Expense Category')
+    assert budget.loc['Personnel Services', 'FY22 Actual Expense'] == 4
+    assert budget.loc['Personnel Services', 'FY23 Actual Expense'] == 4
+
+    versus = pd.read_csv(output / 'budget_vs_actual.csv').set_index(['DEPT', 'YEAR'])
+    assert versus.loc[('Police', 2022), 'BUDGET'] == 1
+    assert versus.loc[('Police', 2022), 'ACTUAL'] == 171000
+    assert versus.loc[('Fire', 2023), 'FORECAST'] == pytest.approx(90000)
+
+    records = json.loads((output / 'forecast_records.json').read_text())
+    assert list(records) == DEPARTMENTS[:2]
+    forecasts = pd.read_csv(output / 'overtime_forecasts.csv')
+    police = forecasts[forecasts['DEPARTMENT_NAME'] == 'Boston Police Department']
+    # Police overtime is 1000 * step^2 + 1000, which the degree-2 fit extends exactly
+    assert police['YEAR'].tolist() == [2023, 2024]
+    assert police['OVERTIME_FORECAST'].tolist() == pytest.approx([37000, 50000])
+    assert summary['outputs']['overtime_hours'] == [str(output / 'overtime_hours.csv'), str(output / 'overtime_hours.parquet')]
+
+
+def test_main_reports_failed_analysis(data_dir, tmp_path):
+    (data_dir / 'budget' / 'fy25-adopted-operating-budget.csv').unlink()
+    output = tmp_path / 'output'
+
+    code = main(['--data-dir', str(data_dir), '--output', str(output), '--analyses', 'budget', 'department_pay',
+                 '--years', '2018', '2019', '--no-cache'])
+
+    summary = json.loads((output / 'summary.json').read_text())
+    assert code == 1
+    assert list(summary['errors']) == ['budget']
+    assert (output / 'department_pay.csv').exists()
@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from polyfit import (PolynomialFit, cross_validate, fit_polynomials, prediction_intervals, select_degree,
+                     to_raw_coefficients)
+
+YEARS = np.arange(2011, 2025)
+
+
+def test_recovers_quadratic_on_raw_years():
+    y = np.polyval([3.0, -2.0, 1000.0], YEARS - 2011.0)
+    fit = fit_polynomials(YEARS, y, [2, 3, 4], forecast_x=[2025, 2026])
+
+    for degree in (2, 3, 4):
+        np.testing.assert_allclose(fit['forecast'][degree], [1560.0, 1645.0], rtol=1e-9)
+        assert fit['r2'][degree] == pytest.approx(1.0)
+
+
+def test_each_degree_matches_its_own_least_squares_fit():
+    rng = np.random.default_rng(0)
+    y = 1e6 + 5e4 * rng.standard_normal(len(YEARS))
+    fit = fit_polynomials(YEARS, y, [1, 2, 3, 4])
+
+    for degree in (1, 2, 3, 4):
+        expected = np.polynomial.Polynomial.fit(YEARS, y, degree)(YEARS)
+        np.testing.assert_allclose(fit['fitted'][degree], expected, rtol=1e-9)
+        assert fit['mse'][degree] == pytest.approx(np.mean((y - expected) ** 2))
+
+
+def test_batched_series_match_single_fits():
+    rng = np.random.default_rng(1)
+    Y = rng.standard_normal((len(YEARS), 5)) * 1e5 + 1e6
+    Y[:, 4] = 7.0
+    batched = fit_polynomials(YEARS, Y, [2, 3], forecast_x=[2025])
+
+    for j in range(4):
+        single = fit_polynomials(YEARS, Y[:, j], [2, 3], forecast_x=[2025])
+        for degree in (2, 3):
+            np.testing.assert_allclose(batched['forecast'][degree][:, j], single['forecast'][degree])
+            assert batched['r2'][degree][j] == pytest.approx(single['r2'][degree])
+    # Constant series: perfect fit scores 1.0 like sklearn's r2_score
+    assert batched['r2'][2][4] == 1.0
+
+
+def test_raw_coefficients_and_model_surface():
+    coef = np.array([2.0, -1.0, 0.5])
+    raw = to_raw_coefficients(coef, center=2017.5, scale=6.5)
+    t = (YEARS - 2017.5) / 6.5
+    np.testing.assert_allclose(np.polynomial.polynomial.polyval(YEARS, raw),
+                               np.polynomial.polynomial.polyval(t, coef), rtol=1e-6)
+
+    model = PolynomialFit(coef, 2017.5, 6.5)
+    np.testing.assert_allclose(model.predict_x(YEARS), np.polynomial.polynomial.polyval(t, coef))
+    assert model.coef_[0] == 0.0 and model.intercept_ == pytest.approx(raw[0])
+
+
+def test_scaled_basis_is_well_conditioned():
+    y = np.polyval([3.0, -2.0, 1000.0], YEARS - 2011.0)
+    scaled = fit_polynomials(YEARS, y, [2, 4], basis='scaled')
+    raw = fit_polynomials(YEARS, y, [2, 4], basis='raw')
+
+    assert scaled['condition_number'][4] < 1e3
+    assert raw['condition_number'][4] > 1e12
+    with pytest.raises(ValueError):
+        fit_polynomials(YEARS, y, [2], basis='log')
+
+
+def test_coefficients_in_both_bases():
+    y = np.polyval([3.0, -2.0, 1000.0], YEARS - 2011.0)
+    fit = fit_polynomials(YEARS, y, [2])
+    model = PolynomialFit(fit['coef'][2], fit['center'], fit['scale'])
+    coefficients = model.coefficients()
+
+    assert coefficients['center'] == 2017.5 and coefficients['scale'] == 6.5
+    np.testing.assert_allclose(np.polynomial.polynomial.polyval(2025.0, coefficients['raw']), 1560.0, rtol=1e-6)
+    np.testing.assert_allclose(np.polynomial.polynomial.polyval((2025 - 2017.5) / 6.5, coefficients['scaled']), 1560.0)
+    assert model.equation('raw').startswith("y = ") and model.equation('scaled').endswith("t = (x - 2017.5) / 6.5")
+
+
+@pytest.mark.parametrize('method', ['loo', 'rolling'])
+def test_cross_validation_matches_refitting(method):
+    rng = np.random.default_rng(2)
+    Y = rng.standard_normal((len(YEARS), 3)) * 1e4 + 1e6
+    cv = cross_validate(YEARS, Y, [1, 2, 3], method=method)
+
+    held_out = range(len(YEARS)) if method == 'loo' else range(5, len(YEARS))
+    assert cv['held_out'].tolist() == [YEARS[i] for i in held_out]
+    for degree in (1, 2, 3):
+        expected = []
+        for i in held_out:
+            train = np.arange(len(YEARS)) != i if method == 'loo' else np.arange(i)
+            expected.append([Y[i, j] - np.polynomial.Polynomial.fit(YEARS[train], Y[train, j], degree)(YEARS[i])
+                             for j in range(3)])
+        np.testing.assert_allclose(cv['errors'][degree], expected, rtol=1e-7)
+        np.testing.assert_allclose(cv['cv_mse'][degree], np.mean(np.square(expected), axis=0))
+
+
+def test_analytic_interval_matches_textbook_formula():
+    rng = np.random.default_rng(3)
+    y = 1e6 + 2e4 * (YEARS - 2011) + 3e4 * rng.standard_normal(len(YEARS))
+    bounds = prediction_intervals(YEARS, y, [1], [2025, 2026], level=0.9)
+
+    X = np.column_stack([np.ones(len(YEARS)), YEARS - 2011.0])
+    beta, rss = np.linalg.lstsq(X, y, rcond=None)[:2]
+    x0 = np.array([[1.0, 14.0], [1.0, 15.0]])
+    se = np.sqrt(rss[0] / (len(YEARS) - 2) * (1 + np.einsum('ij,jk,ik->i', x0, np.linalg.inv(X.T @ X), x0)))
+    # Student-t 95% quantile with 12 degrees of freedom
+    np.testing.assert_allclose(bounds['upper'][1], x0 @ beta + 1.782288 * se, rtol=1e-6)
+    np.testing.assert_allclose(bounds['lower'][1], x0 @ beta - 1.782288 * se, rtol=1e-6)
+
+
+def test_bootstrap_interval_covers_new_values():
+    rng = np.random.default_rng(4)
+    trend = 1e6 + 2e4 * (YEARS - 2011)
+    Y = trend[:, None] + 3e4 * rng.standard_normal((len(YEARS), 300))
+    new = 1e6 + 2e4 * 14 + 3e4 * rng.standard_normal(300)
+    bounds = prediction_intervals(YEARS, Y, [1, 2], [2025], method='bootstrap', n_boot=500)
+    analytic = prediction_intervals(YEARS, Y, [1, 2], [2025])
+
+    for degree in (1, 2):
+        assert bounds['lower'][degree].shape == (1, 300)
+        covered = (bounds['lower'][degree][0] <= new) & (new <= bounds['upper'][degree][0])
+        # The residual bootstrap runs a little narrow on 14 points
+        assert 0.85 < covered.mean() < 0.99
+        width = bounds['upper'][degree] - bounds['lower'][degree]
+        assert np.median(width / (analytic['upper'][degree] - analytic['lower'][degree])) == pytest.approx(1, abs=0.15)
+    # Same seed, same interval; single series come back one-dimensional
+    single = prediction_intervals(YEARS, Y[:, 0], [1], [2025], method='bootstrap', n_boot=500)
+    np.testing.assert_allclose(single['lower'][1], bounds['lower'][1][:, 0])
+    assert np.isnan(prediction_intervals(YEARS[:3], Y[:3, 0], [2], [2025])['upper'][2]).all()
+
+
+def test_select_degree_falls_back_to_r2():
+    r2 = {1: np.array([0.5, 0.9]), 2: np.array([0.8, 1.0])}
+    cv_mse = {1: np.array([1.0, np.inf]), 2: np.array([2.0, np.inf])}
+
+    assert select_degree([1, 2], r2).tolist() == [1, 1]
+    assert select_degree([1, 2], r2, cv_mse).tolist() == [0, 1]
+    # Too few points for any degree: leave-one-out cannot score them
+    assert np.isinf(cross_validate(YEARS[:2], [1.0, 2.0], [1, 2])['cv_mse'][1])
+
+
+def test_repeated_year_falls_back_to_least_squares():
+    # Two distinct years cannot pin down a quadratic
+    x = np.array([2011.0, 2011.0, 2012.0])
+    y = np.array([10.0, 12.0, 20.0])
+    fit = fit_polynomials(x, y, [1, 2], forecast_x=[2013.0])
+
+    np.testing.assert_allclose(fit['forecast'][1], [29.0])
+    np.testing.assert_allclose(fit['fitted'][2], [11.0, 11.0, 20.0])
+    np.testing.assert_allclose(fit['coef'][2], np.linalg.lstsq(np.vander((x - fit['center']) / fit['scale'], 3,
+                                                                         increasing=True), y, rcond=None)[0])
+    assert np.isinf(cross_validate(x, y, [2])['cv_mse'][2])
+    assert np.isnan(prediction_intervals(x, y, [2], [2013.0])['lower'][2]).all()
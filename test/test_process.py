@@ -0,0 +1,155 @@
+import pandas as pd
+import pytest
+
+from process import EARNINGS_SCHEMA, compact_frame, memory_report, read_data, resolve_schema
+
+TARGET_COL = ['REGULAR', 'OVERTIME', 'TOTAL_GROSS']
+
+
+def write_year(folder, year, rows=3):
+    df = pd.DataFrame({
+        '_ID': range(rows),
+        'NAME': [f"Doe,Jane {i}" for i in range(rows)],
+        'DEPARTMENT_NAME': ['Boston Police Department'] * rows,
+        'REGULAR': [f"${1000 * (i + 1):,}.50" for i in range(rows)],
+        'OVERTIME': ['-'] + [f"({i},000.00)" for i in range(1, rows)],
+        'TOTAL_GROSS': ['$0.00'] * rows,
+    })
+    df.to_csv(folder / f"{year}_earnings.csv", index=False)
+    return df
+
+
+@pytest.fixture
+def earnings_folder(tmp_path):
+    for year in (2020, 2021, 2022):
+        write_year(tmp_path, year, rows=year - 2017)
+    return tmp_path
+
+
+def test_read_data_cleans_and_drops(earnings_folder):
+    dfs = read_data(str(earnings_folder), 'earnings.csv', [2020, 2021], 'utf-8', TARGET_COL, ['_ID'])
+
+    assert [df['YEAR'].iloc[0] for df in dfs] == [2020, 2021]
+    assert '_ID' not in dfs[0].columns
+    assert dfs[0]['REGULAR'].tolist() == [1000.5, 2000.5, 3000.5]
+    assert dfs[0]['OVERTIME'].isna().tolist() == [True, False, False]
+    assert dfs[0]['TOTAL_GROSS'].isna().all()
+
+
+def test_read_data_workers_keeps_year_order(earnings_folder, capsys):
+    years = [2022, 2020, 2019, 2021]
+    serial = read_data(str(earnings_folder), 'earnings.csv', years, 'utf-8', TARGET_COL, ['_ID'])
+    pooled = read_data(str(earnings_folder), 'earnings.csv', years, 'utf-8', TARGET_COL, ['_ID'], workers=3)
+
+    assert [len(df) for df in pooled] == [5, 3, 4]
+    for left, right in zip(serial, pooled):
+        pd.testing.assert_frame_equal(left, right)
+    assert "File for year 2019 does not exist." in capsys.readouterr().out
+
+
+def test_read_data_xlsx_process_pool(tmp_path):
+    pytest.importorskip('openpyxl')
+    for year in (2013, 2014):
+        pd.DataFrame({'Name': ['A', 'B'], 'Amount': ['$1,000.00', '-'], 'Hours Worked': [8, 1230]}) \
+            .to_excel(tmp_path / f"{year}_Details.xlsx", index=False)
+
+    dfs = read_data(str(tmp_path), 'Details.xlsx', [2013, 2014], None, ['Amount'], [], file_type='xlsx', workers=2)
+
+    assert [df['YEAR'].iloc[0] for df in dfs] == [2013, 2014]
+    assert dfs[1]['Amount'].iloc[0] == 1000.0
+
+
+def test_read_data_cache_rebuilds_only_changed_years(earnings_folder, tmp_path, capsys):
+    cache_dir = str(tmp_path / 'cache')
+    args = (str(earnings_folder), 'earnings.csv', [2020, 2021], 'utf-8', TARGET_COL, ['_ID'])
+    first = read_data(*args, cache_dir=cache_dir)
+    capsys.readouterr()
+
+    cached = read_data(*args, cache_dir=cache_dir)
+    assert capsys.readouterr().out.count("Read cached data for:") == 2
+    for left, right in zip(first, cached):
+        pd.testing.assert_frame_equal(left, right, check_dtype=False)
+
+    write_year(earnings_folder, 2021, rows=6)
+    refreshed = read_data(*args, cache_dir=cache_dir)
+    out = capsys.readouterr().out
+    assert "Read cached data for:" in out and "Read data from:" in out
+    assert len(refreshed[1]) == 6
+
+    read_data(*args[:-1], [], cache_dir=cache_dir)
+    assert "Read cached data for:" not in capsys.readouterr().out
+
+
+def test_resolve_schema_projects_and_renames():
+    header = ['_ID', 'NAME', 'Department', 'QUINN / EDUCATION INCENTIVE', 'POSTAL', 'NOTES']
+    usecols, dtype, rename = resolve_schema(EARNINGS_SCHEMA, 2025, header, drop_col=['_ID'])
+
+    assert usecols == ['NAME', 'Department', 'QUINN / EDUCATION INCENTIVE', 'POSTAL']
+    assert rename == {'Department': 'DEPARTMENT_NAME', 'QUINN / EDUCATION INCENTIVE': 'QUINN_EDUCATION'}
+    assert dtype['Department'] == 'category' and dtype['POSTAL'] == 'str'
+
+
+def test_read_data_with_schema(earnings_folder):
+    df = pd.read_csv(earnings_folder / "2020_earnings.csv")
+    df['POSTAL'] = ['02118', '02132-1234', '02136']
+    df.to_csv(earnings_folder / "2020_earnings.csv", index=False)
+
+    plain = read_data(str(earnings_folder), 'earnings.csv', [2020], 'utf-8', TARGET_COL, ['_ID'])[0]
+    typed = read_data(str(earnings_folder), 'earnings.csv', [2020], 'utf-8', TARGET_COL, ['_ID'],
+                      schema=EARNINGS_SCHEMA)[0]
+
+    assert '_ID' not in typed.columns
+    assert isinstance(typed['DEPARTMENT_NAME'].dtype, pd.CategoricalDtype)
+    assert typed['POSTAL'].tolist() == ['02118', '02132-1234', '02136']
+    pd.testing.assert_frame_equal(typed[TARGET_COL], plain[TARGET_COL])
+
+
+def test_read_data_chunksize_yields_bounded_chunks(earnings_folder):
+    whole = read_data(str(earnings_folder), 'earnings.csv', [2020, 2022], 'utf-8', TARGET_COL, ['_ID'])
+    chunks = list(read_data(str(earnings_folder), 'earnings.csv', [2020, 2022], 'utf-8', TARGET_COL, ['_ID'],
+                            chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1, 2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), pd.concat(whole, ignore_index=True))
+
+
+def test_compact_frame_shares_categories_across_years(earnings_folder):
+    dfs = read_data(str(earnings_folder), 'earnings.csv', [2020, 2021], 'utf-8', TARGET_COL, ['_ID'],
+                    schema=EARNINGS_SCHEMA)
+    dfs[1]['TITLE'] = ['Clerk', 'Police Officer', None, 'Clerk']
+    compact = compact_frame(dfs)
+
+    assert len(compact) == 7 and compact.index.equals(pd.RangeIndex(7))
+    assert compact['YEAR'].dtype == 'int16' and compact['YEAR'].tolist() == [2020] * 3 + [2021] * 4
+    assert compact['NAME'].cat.categories.tolist() == sorted(f"Doe,Jane {i}" for i in range(4))
+    assert compact['DEPARTMENT_NAME'].cat.categories.tolist() == ['Boston Police Department']
+    # TITLE is only in 2021; 2020 rows are missing, not a category
+    assert compact['TITLE'].cat.categories.tolist() == ['Clerk', 'Police Officer']
+    assert compact['TITLE'].isna().tolist() == [True] * 3 + [False, False, True, False]
+    assert compact['OVERTIME'].isna().tolist() == [True, False, False, True, False, False, False]
+    pd.testing.assert_frame_equal(compact[TARGET_COL], pd.concat(dfs, ignore_index=True)[TARGET_COL])
+
+    small = compact_frame(dfs, float_dtype='float32')
+    assert (small[TARGET_COL].dtypes == 'float32').all()
+    assert small['REGULAR'].iloc[0] == 1000.5
+
+    report = memory_report(dfs, small)
+    assert report['COLUMN'].tolist() == list(compact.columns) + ['TOTAL']
+    assert report.set_index('COLUMN').loc['YEAR', ['BEFORE_DTYPE', 'AFTER_DTYPE']].tolist() == ['int64', 'int16']
+    assert report['AFTER_MB'].iloc[-1] == pytest.approx(report['AFTER_MB'].iloc[:-1].sum())
+    assert report.set_index('COLUMN').loc['REGULAR', 'AFTER_MB'] * 2 == report.set_index('COLUMN').loc['REGULAR', 'BEFORE_MB']
+
+
+def test_compact_frame_mixed_text_dtypes():
+    # Without a schema one year's POSTAL can parse as numbers while another's is text
+    dfs = [pd.DataFrame({'POSTAL': ['02118', None], 'TITLE': pd.Categorical(['Clerk', 'Clerk']), 'YEAR': 2018}),
+           pd.DataFrame({'POSTAL': [2131, 2118], 'TITLE': pd.Categorical([7, None]), 'YEAR': 2019}),
+           pd.DataFrame({'POSTAL': [2131.0, None], 'TITLE': pd.Series(['Clerk', 3], dtype=object), 'YEAR': 2020})]
+    compact = compact_frame(dfs)
+
+    # 2131 and 2131.0 are one ZIP code, and 2118 is the 02118 another year spelled as text
+    assert compact['POSTAL'].cat.categories.tolist() == ['02118', '02131']
+    assert compact['POSTAL'].astype(object).where(compact['POSTAL'].notna(), None).tolist() == [
+        '02118', None, '02131', '02118', '02131', None]
+    assert compact['TITLE'].cat.categories.tolist() == ['3', '7', 'Clerk']
+    assert compact['TITLE'].isna().tolist() == [False, False, False, True, False, False]
@@ -0,0 +1,252 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regression import batch_forecast, fit_polynomial_models
+
+
+def make_series(coefs, years=range(2011, 2025)):
+    years = np.array(list(years))
+    x = years - 2011
+    return pd.DataFrame({'YEAR': years, 'OVERTIME': np.polyval(coefs, x).astype(float)})
+
+
+def test_fit_polynomial_models_recovers_line():
+    df = make_series([-2.0, 1000.0])
+    fit = fit_polynomial_models(df['YEAR'].values, df['OVERTIME'].values, forecast_years=2, test_degrees=[1, 2])
+
+    assert list(fit['future_years']) == [2025, 2026]
+    np.testing.assert_allclose(fit['forecasts'][1], np.polyval([-2.0, 1000.0], [14, 15]), rtol=1e-6)
+    assert fit['metrics'][1]['r2'] == pytest.approx(1.0)
+    np.testing.assert_allclose(fit['future_predictions'], fit['forecasts'][fit['best_degree']])
+
+
+def test_batch_forecast_table():
+    series = {
+        'Police': make_series([5.0, 0.0, 100.0]),
+        'Fire': make_series([1.0, 50.0], years=range(2015, 2023)),
+        'Tiny': make_series([1.0], years=[2020]),
+    }
+    table = batch_forecast(series, forecast_years=2, test_degrees=[1, 2])
+
+    assert list(table.columns) == ['department', 'degree', 'n_points', 'last_year', 'r2', 'mse', 'cv_mse', 'condition_number',
+                                   'is_best', 'forecast_1', 'forecast_2']
+    assert table['department'].tolist() == ['Police', 'Police', 'Fire', 'Fire']
+    assert table.groupby('department')['is_best'].sum().tolist() == [1, 1]
+    fire = table[(table['department'] == 'Fire') & (table['degree'] == 1)].iloc[0]
+    assert fire['last_year'] == 2022
+    assert fire['forecast_1'] == pytest.approx(1.0 * 12 + 50.0)
+
+    pooled = batch_forecast(series, forecast_years=2, test_degrees=[1, 2], workers=2)
+    pd.testing.assert_frame_equal(table, pooled)
+
+
+def test_batch_forecast_intervals():
+    rng = np.random.default_rng(5)
+    series = {name: make_series([100.0, 1000.0]) for name in ('Police', 'Fire')}
+    for df in series.values():
+        df['OVERTIME'] += 50 * rng.standard_normal(len(df))
+
+    table = batch_forecast(series, forecast_years=2, test_degrees=[1, 2], intervals='bootstrap')
+    assert list(table.columns[-4:]) == ['lower_1', 'upper_1', 'lower_2', 'upper_2']
+    assert (table['lower_1'] < table['forecast_1']).all() and (table['forecast_1'] < table['upper_1']).all()
+    # Intervals widen further out
+    assert ((table['upper_2'] - table['lower_2']) > (table['upper_1'] - table['lower_1'])).all()
+
+    police = fit_polynomial_models(series['Police']['YEAR'].values, series['Police']['OVERTIME'].values,
+                                   test_degrees=[1, 2], cache=False)
+    row = table[(table['department'] == 'Police') & table['is_best']].iloc[0]
+    assert row['degree'] == police['best_degree']
+    np.testing.assert_allclose(row[['lower_1', 'lower_2']].to_numpy(dtype=float),
+                               police['intervals']['bootstrap']['lower'])
+
+
+def test_batch_forecast_refits_only_changed_series(tmp_path):
+    from instrument import profile
+
+    series = {'Police': make_series([5.0, 0.0, 100.0], years=range(2011, 2024)),
+              'Fire': make_series([1.0, 50.0], years=range(2015, 2023)),
+              'Parks': make_series([2.0, 10.0], years=range(2011, 2024))}
+    cache_dir = str(tmp_path / 'cache')
+    batch_forecast(series, test_degrees=[1, 2], folds=True, cache_dir=cache_dir)
+
+    # A new year for Police and Parks; Fire's series is unchanged
+    series['Police'] = make_series([5.0, 0.0, 100.0])
+    series['Parks'] = make_series([2.0, 10.0])
+    with profile() as profiler:
+        table, folds = batch_forecast(series, test_degrees=[1, 2], folds=True, cache_dir=cache_dir)
+
+    assert profiler.totals()['batch_forecast']['rows'] == 2
+    expected, expected_folds = batch_forecast(series, test_degrees=[1, 2], folds=True)
+    pd.testing.assert_frame_equal(table, expected)
+    pd.testing.assert_frame_equal(folds, expected_folds)
+
+
+def test_batch_forecast_subset_keeps_other_series_cached(tmp_path):
+    from instrument import profile
+
+    series = {'Police': make_series([5.0, 0.0, 100.0]), 'Fire': make_series([1.0, 50.0]),
+              'Parks': make_series([2.0, 10.0], years=range(2015, 2025))}
+    cache_dir = str(tmp_path / 'cache')
+    batch_forecast(series, test_degrees=[1, 2], folds=True, cache_dir=cache_dir)
+    subset = batch_forecast({'Fire': series['Fire']}, test_degrees=[1, 2], cache_dir=cache_dir)
+    assert subset['department'].unique().tolist() == ['Fire']
+
+    with profile() as profiler:
+        table, folds = batch_forecast(series, test_degrees=[1, 2], folds=True, cache_dir=cache_dir)
+    assert profiler.totals()['batch_forecast']['rows'] == 0
+    expected, expected_folds = batch_forecast(series, test_degrees=[1, 2], folds=True)
+    pd.testing.assert_frame_equal(table, expected)
+    pd.testing.assert_frame_equal(folds, expected_folds)
+
+
+def test_forecasts_are_memoized(tmp_path):
+    from cache import ResultCache
+    from instrument import profile
+    from regression import run_overtime_forecast
+
+    series = {'Police': make_series([5.0, 0.0, 100.0]), 'Fire': make_series([1.0, 50.0])}
+    cache = ResultCache(maxsize=1, cache_dir=str(tmp_path))
+    with profile() as profiler:
+        first = run_overtime_forecast('Police', series, test_degrees=[1, 2], headless=True, cache=cache)
+        again = run_overtime_forecast('Police', series, test_degrees=[1, 2], headless=True, cache=cache)
+        # Nothing a caller can reach changes the cached fit
+        with pytest.raises(ValueError):
+            again['future_predictions'][0] = 0.0
+        with pytest.raises(ValueError):
+            again['best_model'].coef[0] = 0.0
+        again['best_model'].center = 0.0
+        again['coefficients']['scaled'].append(0.0)
+        third = run_overtime_forecast('Police', series, test_degrees=[1, 2], headless=True, cache=cache)
+        run_overtime_forecast('Police', series, test_degrees=[1, 2, 3], headless=True, cache=cache)
+    assert [record['cache_hit'] for record in profiler.records if record['name'] == 'fit'] == [False, True, True, False]
+    assert again['record'] == first['record']
+    assert third['coefficients'] == first['coefficients'] and third['record'] == first['record']
+
+    # Only the newest fit stays in memory; the older one comes back from disk
+    assert len(cache) == 1
+    fresh = ResultCache(cache_dir=str(tmp_path))
+    assert fit_polynomial_models(series['Police']['YEAR'], series['Police']['OVERTIME'], test_degrees=[1, 2],
+                                 cache=fresh)['equation'] == first['equation']
+    assert fresh.info() == {'hits': 1, 'misses': 0, 'size': 1, 'maxsize': 256}
+
+
+def test_cross_validation_picks_low_degree_for_noisy_line():
+    rng = np.random.default_rng(3)
+    df = make_series([-2.0, 1000.0])
+    values = df['OVERTIME'].values + rng.normal(0, 5, len(df))
+    by_r2 = fit_polynomial_models(df['YEAR'].values, values, test_degrees=[1, 2, 3, 4], selection='r2')
+    by_cv = fit_polynomial_models(df['YEAR'].values, values, test_degrees=[1, 2, 3, 4], selection='loo')
+
+    assert by_r2['best_degree'] == 4 and by_r2['cv'] is None
+    assert by_cv['best_degree'] == 1
+    assert by_cv['metrics'][1]['cv_mse'] == pytest.approx(np.mean(by_cv['cv']['errors'][1] ** 2))
+
+
+def test_batch_forecast_folds():
+    series = {'Police': make_series([5.0, 0.0, 100.0]), 'Fire': make_series([1.0, 50.0], years=range(2015, 2023))}
+    table, folds = batch_forecast(series, test_degrees=[1, 2], selection='rolling', folds=True)
+
+    assert list(folds.columns) == ['department', 'degree', 'fold', 'year', 'error']
+    fire = folds[(folds['department'] == 'Fire') & (folds['degree'] == 1)]
+    assert fire['year'].tolist() == [2019, 2020, 2021, 2022]
+    np.testing.assert_allclose(fire['error'], 0.0, atol=1e-9)
+    means = folds.groupby(['department', 'degree'], sort=False)['error'].apply(lambda e: np.mean(e ** 2))
+    np.testing.assert_allclose(table['cv_mse'], means.to_numpy(), rtol=1e-9, atol=1e-12)
+    # Exact quadratic: degree 1 has out-of-sample error, degree 2 none
+    assert table.loc[table['department'] == 'Police', 'is_best'].tolist() == [False, True]
+
+
+def test_headless_forecast_is_silent_and_serializable(capsys, monkeypatch):
+    import json
+    import regression
+
+    def no_plots(*args, **kwargs):
+        raise AssertionError("plotting called in headless mode")
+    monkeypatch.setattr(regression, 'create_interactive_plots', no_plots)
+    monkeypatch.setattr(regression, 'create_static_plots', no_plots)
+
+    df = make_series([5.0, 0.0, 100.0])
+    results = regression.run_overtime_forecast('Police', {'Police': df}, test_degrees=[1, 2], headless=True)
+    assert capsys.readouterr().out == ''
+
+    record = json.loads(json.dumps(results['record']))
+    assert record['best_degree'] == results['best_degree'] == 2
+    assert record['future_years'] == [2025, 2026]
+    np.testing.assert_allclose(record['future_predictions'], np.polyval([5.0, 0.0, 100.0], [14, 15]), rtol=1e-9)
+    assert set(record['models']) == {'1', '2'} and len(record['cv']['held_out']) == len(df)
+    # An exact fit leaves no doubt about the forecast
+    assert record['intervals']['level'] == 0.95
+    np.testing.assert_allclose(record['intervals']['analytic']['lower'], record['future_predictions'], rtol=1e-9)
+    np.testing.assert_allclose(record['intervals']['bootstrap']['upper'], record['future_predictions'], rtol=1e-9)
+
+
+def test_export_forecast_figures(tmp_path):
+    import regression
+
+    records = {}
+    for name, coefs in (('Police Dept', [5.0, 0.0, 100.0]), ('Fire', [1.0, 50.0])):
+        df = make_series(coefs)
+        records[name] = regression.run_overtime_forecast(name, {name: df}, test_degrees=[1, 2], headless=True)['record']
+
+    written = regression.export_forecast_figures(records, str(tmp_path), formats=['html', 'svg'], workers=2,
+                                                 title="{name} overtime ({first}–{last})")
+
+    assert written['Police Dept'] == [str(tmp_path / 'Police_Dept.html'), str(tmp_path / 'Police_Dept.svg'),
+                                      str(tmp_path / 'Police_Dept_yoy.svg')]
+    html = (tmp_path / 'Fire.html').read_text()
+    # plotly.js is shared, not embedded in every file
+    assert 'src="plotly.min.js"' in html and len(html) < 100_000
+    assert (tmp_path / 'plotly.min.js').stat().st_size > 1_000_000
+    assert 'Fire overtime (2011–2024)' in html and 'prediction interval (bootstrap)' in html
+    assert (tmp_path / 'Fire.svg').read_text().lstrip().startswith('<?xml')
+    with pytest.raises(ValueError):
+        regression.export_forecast_figures(records, str(tmp_path), formats=['pdf'])
+
+
+def test_export_forecast_figures_names_colliding_files_apart(tmp_path):
+    import regression
+
+    record = regression.run_overtime_forecast('Fire', {'Fire': make_series([1.0, 50.0])}, test_degrees=[1, 2],
+                                              headless=True)['record']
+    names = ['Kennedy JF Elementary', 'Kennedy, JF Elementary', 'KENNEDY JF ELEMENTARY', '* * *', 'Fire',
+             'Fire yoy']
+    written = regression.export_forecast_figures({name: record for name in names}, str(tmp_path),
+                                                 formats=['html'], workers=2)
+
+    paths = [path for name in names for path in written[name]]
+    assert len(set(path.lower() for path in paths)) == len(names)
+    assert all(os.path.exists(path) and not os.path.basename(path).startswith('.') for path in paths)
+    assert written['Fire'] == [str(tmp_path / 'Fire.html')]
+    assert os.path.basename(written['Kennedy, JF Elementary'][0]).startswith('Kennedy_JF_Elementary_')
+
+
+def test_export_forecast_figures_in_process_bypasses_pyplot(tmp_path):
+    import matplotlib.pyplot as plt
+    import regression
+
+    record = regression.run_overtime_forecast('Fire', {'Fire': make_series([1.0, 50.0])}, test_degrees=[1, 2],
+                                              headless=True)['record']
+    backend = plt.get_backend()
+    written = regression.export_forecast_figures({'Fire': record}, str(tmp_path), formats=['png'], workers=1)
+
+    assert written['Fire'] == [str(tmp_path / 'Fire.png'), str(tmp_path / 'Fire_yoy.png')]
+    assert (tmp_path / 'Fire.png').read_bytes().startswith(b'\x89PNG')
+    # Nothing went through pyplot, so an interactive backend would never open a window
+    assert plt.get_fignums() == [] and plt.get_backend() == backend
+
+
+def test_forecast_record_is_strict_json():
+    import json
+    from regression import plot_forecast_record, run_overtime_forecast
+
+    df = pd.DataFrame({'YEAR': [2022, 2023, 2024], 'OVERTIME': [1.0, 3.0, 2.0]})
+    record = run_overtime_forecast('Small', {'Small': df}, test_degrees=[2], headless=True)['record']
+
+    # Degree 2 interpolates three points: no held-out error and no interval
+    assert record['models']['2']['cv_mse'] is None
+    assert record['intervals']['analytic']['lower'] == [None, None]
+    loaded = json.loads(json.dumps(record, allow_nan=False))
+    assert len(plot_forecast_record(loaded, interactive=False, show=False)) == 2
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from process import read_data
+from synthetic import learn_profile, write_synthetic
+
+TARGET_COL = ['REGULAR', 'OVERTIME', 'TOTAL_GROSS']
+
+
+@pytest.fixture
+def source_folder(tmp_path):
+    rng = np.random.default_rng(0)
+    regular = rng.uniform(20_000, 150_000, 200).round(2)
+    overtime = np.where(rng.random(200) < 0.6, 0.0, rng.uniform(100, 40_000, 200).round(2))
+    departments = rng.choice(['Boston Police Department', 'Parks Department', 'Library'], 200, p=[0.6, 0.3, 0.1])
+    # 2011 style: $33065.38 everywhere, zeros as $0.00
+    pd.DataFrame({
+        '_ID': range(1, 201), 'NAME': [f"Doe,Jane {i}" for i in range(200)], 'DEPARTMENT_NAME': departments,
+        'TITLE': np.where(departments == 'Library', 'Librarian', 'Officer'),
+        'REGULAR': [f"${v:.2f}" for v in regular], 'OVERTIME': [f"${v:.2f}" for v in overtime],
+        'TOTAL_GROSS': [f"${v:.2f}" for v in regular + overtime], 'POSTAL': '02118-3126',
+    }).to_csv(tmp_path / '2011_earnings.csv', index=False)
+    # 2024 style: "161,306.48", blank when zero, different column order
+    pd.DataFrame({
+        'NAME': [f"Roe,John {i}" for i in range(200)], 'TITLE': 'Officer', 'DEPARTMENT_NAME': departments,
+        'REGULAR': [f"{v:,.2f}" for v in regular], 'OVERTIME': [f"{v:,.2f}" if v else '' for v in overtime],
+        'TOTAL_GROSS': [f"{v:,.2f}" for v in regular + overtime], 'POSTAL': '02052',
+    }).to_csv(tmp_path / '2024_earnings.csv', index=False)
+    return tmp_path
+
+
+def test_synthetic_files_keep_each_years_format(source_folder, tmp_path):
+    profile = learn_profile(str(source_folder), 'earnings.csv', [2011, 2024], 'utf-8')
+    # The profile survives a JSON round trip
+    profile = json.loads(json.dumps({str(year): value for year, value in profile.items()}))
+    out = tmp_path / 'synthetic'
+    paths = write_synthetic(profile, str(out), 'earnings.csv', years=[2011, 2024, 2030], scale=5, chunk_rows=300)
+
+    assert [p.split('/')[-1] for p in paths] == ['2011_earnings.csv', '2024_earnings.csv', '2030_earnings.csv']
+    old = pd.read_csv(out / '2011_earnings.csv', dtype=str, keep_default_na=False)
+    new = pd.read_csv(out / '2024_earnings.csv', dtype=str, keep_default_na=False)
+    assert list(old.columns) == ['_ID', 'NAME', 'DEPARTMENT_NAME', 'TITLE', 'REGULAR', 'OVERTIME', 'TOTAL_GROSS', 'POSTAL']
+    assert list(new.columns) == ['NAME', 'TITLE', 'DEPARTMENT_NAME', 'REGULAR', 'OVERTIME', 'TOTAL_GROSS', 'POSTAL']
+    assert len(old) == 1000 and old['_ID'].tolist() == [str(i) for i in range(1, 1001)]
+    assert old['REGULAR'].str.fullmatch(r'\$\d+\.\d\d').all()
+    assert (old['OVERTIME'] == '$0.00').mean() == pytest.approx(0.6, abs=0.1)
+    assert new['REGULAR'].str.fullmatch(r'\d{1,3}(,\d{3})*\.\d\d').all()
+    assert (new['OVERTIME'] == '').mean() == pytest.approx(0.6, abs=0.1)
+    assert set(new['DEPARTMENT_NAME']) == {'Boston Police Department', 'Parks Department', 'Library'}
+    assert set(new['POSTAL']) == {'02052'}
+
+
+def test_synthetic_files_read_back(source_folder, tmp_path):
+    profile = learn_profile(str(source_folder), 'earnings.csv', [2011, 2024], 'utf-8')
+    write_synthetic(profile, str(tmp_path / 'synthetic'), 'earnings.csv', rows=500, departments=12, seed=1)
+    dfs = read_data(str(tmp_path / 'synthetic'), 'earnings.csv', [2011, 2024], 'utf-8', TARGET_COL, ['_ID'])
+
+    assert [len(df) for df in dfs] == [500, 500]
+    for df in dfs:
+        # Totals are derived from the parts, so rows add up
+        np.testing.assert_allclose(df['REGULAR'].fillna(0) + df['OVERTIME'].fillna(0), df['TOTAL_GROSS'], atol=0.011)
+        assert df['REGULAR'].between(20_000, 150_000).all()
+        assert 6 < df['DEPARTMENT_NAME'].nunique() <= 15
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from workbook import is_lock_file, list_workbooks, read_sheet, read_sheets, read_workbooks
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def make_workbook(path, sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        worksheet = workbook.create_sheet(name)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+
+
+@pytest.fixture
+def overtime_folder(tmp_path):
+    header = ['ID', 'NAME', 'STARTTIME', 'OTHOURS']
+    make_workbook(tmp_path / 'Court_Overtime_2018_-_2019.xlsx', {
+        '2018': [header, ['009033', 'A', '0830', 4], ['050308', 'B', '1000', 1.5]],
+        '2019': [header, ['108602', 'C', '0900', 2.5], [None, None, None, None]],
+    })
+    # Lock files left behind by Excel and LibreOffice
+    (tmp_path / '~$Court_Overtime_2018_-_2019.xlsx').write_bytes(b'lock')
+    (tmp_path / '.~Court_Overtime_2018_-_2019.xlsx').write_bytes(b'lock')
+    return tmp_path
+
+
+def test_lock_files_are_skipped(overtime_folder):
+    assert is_lock_file('~$2014_Details.xlsx') and is_lock_file('data/.~2013_Details.xlsx')
+    assert not is_lock_file('2014_Details.xlsx')
+    assert [p.split('/')[-1] for p in list_workbooks(str(overtime_folder))] == ['Court_Overtime_2018_-_2019.xlsx']
+
+
+def test_read_sheets_selects_sheets_and_columns(overtime_folder):
+    path = str(overtime_folder / 'Court_Overtime_2018_-_2019.xlsx')
+    sheets = read_sheets(path, usecols=['OTHOURS', 'ID', 'MISSING'])
+
+    assert list(sheets) == ['2018', '2019']
+    assert list(sheets['2018'].columns) == ['OTHOURS', 'ID']
+    # Numbers stored as text are numbers, as with pd.read_excel, and the trailing empty row is dropped
+    assert sheets['2018']['ID'].tolist() == [9033, 50308]
+    assert sheets['2018']['OTHOURS'].tolist() == [4, 1.5]
+    assert len(sheets['2019']) == 1
+    assert read_sheet(path, 1)['NAME'].tolist() == ['C']
+
+
+def test_cached_sheets_skip_openpyxl(overtime_folder, monkeypatch):
+    cache_dir = str(overtime_folder / 'cache')
+    first = read_workbooks(str(overtime_folder), cache_dir=cache_dir)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("workbook parsed again")
+    monkeypatch.setattr(openpyxl, 'load_workbook', fail)
+    second = read_workbooks(str(overtime_folder), cache_dir=cache_dir)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert second['SHEET'].tolist() == ['2018', '2018', '2019']
+    assert set(second['SOURCE']) == {'Court_Overtime_2018_-_2019.xlsx'}
+
+
+def test_read_sheet_matches_read_excel(tmp_path):
+    path = tmp_path / 'mixed.xlsx'
+    make_workbook(path, {'Sheet1': [
+        ['ID', 'NAME', None, 'HOURS', 'HOURS', 'CODE', 'NOTE'],
+        ['011120', 'A', 1, 4.0, '2.5', '0930', None],
+        ['144460', 'B', 2, 1.5, '8', 'X1', 'late'],
+        [None, 'C', None, 3.0, None, '1000', None],
+    ]})
+    expected = pd.read_excel(path)
+    sheet = read_sheet(str(path))
+
+    pd.testing.assert_frame_equal(sheet, expected)
+    assert list(sheet.columns) == ['ID', 'NAME', 'Unnamed: 2', 'HOURS', 'HOURS.1', 'CODE', 'NOTE']
+    pd.testing.assert_frame_equal(read_sheet(str(path), usecols=['HOURS.1', 'Unnamed: 2']),
+                                  expected[['HOURS.1', 'Unnamed: 2']])